@@ -0,0 +1,195 @@
+"""
+Persistent Annotation Cache
+updated_gene_annotations.json을 한 번만 파싱해 binary cache로 저장하고,
+섹션별로 지연 로드하며 원본 파일이 바뀌면 자동으로 다시 빌드한다
+"""
+
+import hashlib
+import json
+import marshal
+import os
+import pickle
+
+from annotation_table import AnnotationTable
+
+CACHE_FORMAT_VERSION = 1
+CACHE_SUFFIX = '.cache.pkl'
+
+
+def _file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def section_fingerprint(value):
+    """섹션 값 (dict / list)의 내용 hash - 제자리 수정도 감지하도록 직렬화 결과 기준
+
+    JSON 형태의 값은 pickle보다 몇 배 빠른 marshal로 직렬화하고, marshal이 지원하지
+    않는 값 (numpy scalar 등)이 있으면 pickle을 사용한다.
+    """
+    try:
+        payload = marshal.dumps(value)
+    except ValueError:
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def compile_annotation_sections(raw):
+    """JSON 원본을 analyzer가 사용하는 섹션 형태로 변환"""
+    gene_annotations = raw.get('gene_annotations', {})
+
+    pathway_info = {}
+    pathway_descriptions = {}
+    for pathway, entry in raw.get('pathway_info', {}).items():
+        if isinstance(entry, dict):
+            pathway_info[pathway] = list(entry.get('genes', []))
+            pathway_descriptions[pathway] = entry.get('description', '')
+        else:
+            pathway_info[pathway] = list(entry)
+
+    thresholds = {
+        key: value for key, value in raw.get('expression_thresholds', {}).items()
+        if key != 'updated_date'
+    }
+
+    housekeeping = raw.get('housekeeping_genes', {})
+    if isinstance(housekeeping, dict):
+        housekeeping = housekeeping.get('genes', [])
+
+    return {
+        'gene_annotations': gene_annotations,
+        'annotation_table': AnnotationTable.from_dict(gene_annotations),
+        'pathway_info': pathway_info,
+        'pathway_descriptions': pathway_descriptions,
+        'expression_thresholds': thresholds,
+        'housekeeping_genes': list(housekeeping)
+    }
+
+
+class AnnotationProvider:
+    """annotation JSON의 binary cache 기반 provider
+
+    cache는 (mtime, size)로 먼저 확인하고, 달라졌을 때만 내용 hash를
+    비교한다. 섹션은 처음 접근할 때 unpickle된다.
+    """
+
+    def __init__(self, source_path, cache_path=None):
+        self.source_path = source_path
+        self.cache_path = cache_path or f"{source_path}{CACHE_SUFFIX}"
+        self._stamp = None
+        self._blobs = None
+        self._sections = {}
+
+    def _source_stamp(self):
+        stat = os.stat(self.source_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_cache(self):
+        try:
+            with open(self.cache_path, 'rb') as f:
+                cache = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        if not isinstance(cache, dict) or cache.get('version') != CACHE_FORMAT_VERSION:
+            return None
+        return cache
+
+    def _write_cache(self, cache):
+        tmp_path = f"{self.cache_path}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            # 읽기 전용 위치에서는 메모리 cache만 사용
+            pass
+
+    def _load(self, stamp):
+        cache = self._read_cache()
+        if cache is not None and tuple(cache['stamp']) == stamp:
+            return cache['sections']
+
+        source_hash = _file_sha256(self.source_path)
+        if cache is not None and cache.get('sha256') == source_hash:
+            # 내용은 같고 mtime만 바뀐 경우 stamp만 갱신
+            cache['stamp'] = stamp
+            self._write_cache(cache)
+            return cache['sections']
+
+        with open(self.source_path, 'r') as f:
+            raw = json.load(f)
+
+        sections = {
+            name: pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            for name, value in compile_annotation_sections(raw).items()
+        }
+        self._write_cache({
+            'version': CACHE_FORMAT_VERSION,
+            'stamp': stamp,
+            'sha256': source_hash,
+            'sections': sections
+        })
+        return sections
+
+    def refresh(self):
+        """원본이 바뀌었으면 cache를 다시 로드하고 True 반환"""
+        stamp = self._source_stamp()
+        if stamp == self._stamp:
+            return False
+
+        self._blobs = self._load(stamp)
+        self._sections = {}
+        self._stamp = stamp
+        return True
+
+    def get(self, name):
+        """섹션 조회 (필요할 때만 unpickle)"""
+        self.refresh()
+        if name not in self._sections:
+            self._sections[name] = pickle.loads(self._blobs[name])
+        return self._sections[name]
+
+    @property
+    def gene_annotations(self):
+        return self.get('gene_annotations')
+
+    @property
+    def annotation_table(self):
+        return self.get('annotation_table')
+
+    @property
+    def pathway_info(self):
+        return self.get('pathway_info')
+
+    @property
+    def pathway_descriptions(self):
+        return self.get('pathway_descriptions')
+
+    @property
+    def expression_thresholds(self):
+        return self.get('expression_thresholds')
+
+    @property
+    def housekeeping_genes(self):
+        return self.get('housekeeping_genes')
+
+
+class AnnotationSection:
+    """annotation_provider가 있으면 provider 섹션을, 없으면 인스턴스 기본값을 반환"""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        provider = obj.__dict__.get('annotation_provider')
+        if provider is not None:
+            return provider.get(self.name)
+        return obj.__dict__[f"_{self.name}"]
+
+    def __set__(self, obj, value):
+        obj.__dict__[f"_{self.name}"] = value
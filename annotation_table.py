@@ -0,0 +1,93 @@
+"""
+Compiled Gene Annotation Table
+gene annotation dict/JSON을 categorical 컬럼의 indexed table로 한 번 컴파일하고
+index join으로 어노테이션을 붙인다
+"""
+
+import json
+
+import pandas as pd
+
+UNKNOWN = 'Unknown'
+
+CATEGORICAL_FIELDS = ('symbol', 'biotype', 'chromosome', 'strand')
+INTEGER_FIELDS = ('start', 'end')
+
+# annotate_genes 출력 컬럼명 -> table 필드
+DEFAULT_ANNOTATION_COLUMNS = {
+    'gene_symbol': 'symbol',
+    'biotype': 'biotype',
+    'chromosome': 'chromosome'
+}
+
+
+def load_annotation_json(file_path):
+    """updated_gene_annotations.json 형식 파일 로드"""
+    with open(file_path, 'r') as f:
+        return json.load(f)
+
+
+class AnnotationTable:
+    """gene_id로 index된 어노테이션 table"""
+
+    def __init__(self, table):
+        self.table = table
+
+    @classmethod
+    def from_dict(cls, gene_annotations):
+        """{gene_id: {field: value}} dict를 table로 컴파일"""
+        table = pd.DataFrame.from_dict(gene_annotations, orient='index')
+        table.index.name = 'gene_id'
+
+        for field in table.columns:
+            if field in CATEGORICAL_FIELDS:
+                column = table[field].astype('category')
+                if UNKNOWN not in column.cat.categories:
+                    column = column.cat.add_categories([UNKNOWN])
+                table[field] = column
+            elif field in INTEGER_FIELDS:
+                table[field] = table[field].astype('Int64')
+
+        return cls(table)
+
+    @classmethod
+    def from_json(cls, file_path):
+        """updated_gene_annotations.json의 gene_annotations 섹션으로 table 생성"""
+        return cls.from_dict(load_annotation_json(file_path)['gene_annotations'])
+
+    def __len__(self):
+        return len(self.table)
+
+    def lookup(self, gene_ids, fields=None):
+        """gene_ids 순서대로 어노테이션 조회 (없는 유전자는 'Unknown' / NA)"""
+        fields = list(self.table.columns) if fields is None else list(fields)
+        gene_ids = pd.Index(gene_ids)
+        indexer = self.table.index.get_indexer(gene_ids)
+        missing = indexer < 0
+
+        columns = {}
+        for field in fields:
+            column = self.table[field]
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                # category code만 take하여 문자열 복사 없이 join
+                codes = column.cat.codes.to_numpy()[indexer]
+                codes[missing] = column.cat.categories.get_loc(UNKNOWN)
+                columns[field] = pd.Categorical.from_codes(codes, dtype=column.dtype)
+            else:
+                columns[field] = column.reindex(gene_ids).to_numpy()
+
+        return pd.DataFrame(columns, index=gene_ids)
+
+    def annotate(self, expression_data, columns=None):
+        """expression 값을 복사하지 않고 어노테이션 컬럼만 추가
+
+        assign은 pandas < 3 (copy-on-write 이전)에서 전체 frame을 deep copy하므로
+        shallow copy에 컬럼을 붙인다.
+        """
+        columns = DEFAULT_ANNOTATION_COLUMNS if columns is None else columns
+        annotations = self.lookup(expression_data.index, fields=columns.values())
+
+        annotated = expression_data.copy(deep=False)
+        for name, field in columns.items():
+            annotated[name] = annotations[field].array
+        return annotated
@@ -0,0 +1,219 @@
+"""
+Batch Effect Correction
+ComBat (parametric empirical Bayes location / scale 보정)을 모든 유전자에 대해 행렬 연산으로 수행
+(MODERN_PIPELINE_STRUCTURE["normalization"] - "Batch effect correction" 참조)
+"""
+
+import numpy as np
+import pandas as pd
+
+from dimensionality_reduction import _GeneMatrix
+
+
+def _batch_labels(batches, samples):
+    """batch label (Series는 샘플 이름으로 정렬, 그 외는 샘플 순서) -> (codes, batch 이름)"""
+    if isinstance(batches, pd.Series):
+        missing = pd.Index(samples).difference(batches.index)
+        if len(missing):
+            raise ValueError(f"Batch labels are missing for samples: {list(missing[:5])}")
+        batches = batches.reindex(samples)
+    batches = np.asarray(batches)
+    if len(batches) != len(samples):
+        raise ValueError(f"Expected {len(samples)} batch labels, got {len(batches)}")
+    codes, names = pd.factorize(batches, sort=True)
+    return codes, pd.Index(names)
+
+
+def _covariate_design(covariates, samples):
+    """보존할 covariate (생물학적 조건 등) -> (샘플 x c) float design (범주형은 drop_first dummy)"""
+    if covariates is None:
+        return np.empty((len(samples), 0))
+    if isinstance(covariates, pd.Series):
+        covariates = covariates.to_frame()
+    covariates = covariates.reindex(pd.Index(samples))
+    if covariates.isna().any().any():
+        raise ValueError("Covariates are missing for some samples")
+    design = pd.get_dummies(covariates, drop_first=True, dtype=np.float64)
+    return design.to_numpy(dtype=np.float64)
+
+
+class ComBat:
+    """ComBat batch 보정
+
+    유전자별 선형모형 (batch indicator + 보존할 covariate)으로 표준화한 뒤 batch별
+    location(gamma) / scale(delta)을 추정하고, 유전자 전체에 걸친 normal / inverse-gamma
+    prior로 shrink한다. EB 반복은 유전자별 충분통계량 (batch별 합, 제곱합)만 쓰므로
+    (유전자 x batch) 배열 연산으로 모든 유전자를 한 번에 갱신한다.
+
+    chunk_rows를 주면 fit / transform 모두 유전자 블록 단위로 matrix를 두 번 순회하며,
+    DataFrame / SparseExpressionMatrix / count store 경로를 받는다.
+
+    Args:
+        mean_only: scale 보정 없이 location만 보정 (batch에 샘플이 1개인 경우 필요)
+        chunk_rows: 블록 크기 (None이면 전체를 한 블록으로 처리)
+    """
+
+    def __init__(self, mean_only=False, chunk_rows=None, max_iter=100, tol=1e-4):
+        self.mean_only = mean_only
+        self.chunk_rows = chunk_rows
+        self.max_iter = max_iter
+        self.tol = tol
+
+    def _blocks(self, matrix):
+        return matrix.blocks(self.chunk_rows or max(matrix.shape[0], 1))
+
+    def fit(self, data, batches, covariates=None):
+        matrix = _GeneMatrix(data)
+        n_genes, n_samples = matrix.shape
+        codes, names = _batch_labels(batches, matrix.sample_names)
+        n_batches = len(names)
+        if n_batches < 2:
+            raise ValueError("Batch correction requires at least two batches")
+
+        batch_design = np.zeros((n_samples, n_batches))
+        batch_design[np.arange(n_samples), codes] = 1.0
+        batch_sizes = batch_design.sum(axis=0)
+        if not self.mean_only and (batch_sizes < 2).any():
+            raise ValueError("Every batch needs at least two samples unless mean_only=True")
+
+        design = np.hstack([batch_design, _covariate_design(covariates, matrix.sample_names)])
+        if np.linalg.matrix_rank(design) < design.shape[1]:
+            raise ValueError("Covariates are confounded with batch")
+        # 유전자별 최소제곱 B = Y X (X^T X)^-1 를 모든 유전자에 대해 한 번에 계산
+        projection = np.linalg.solve(design.T @ design, design.T).T
+
+        coef = np.empty((n_genes, design.shape[1]))
+        pooled_var = np.empty(n_genes)
+        batch_sums = np.empty((n_genes, n_batches))
+        batch_squares = np.empty((n_genes, n_batches))
+        valid = np.empty(n_genes, dtype=bool)
+        for rows, block in self._blocks(matrix):
+            coef[rows] = block @ projection
+            residual = block - coef[rows] @ design.T
+            pooled_var[rows] = np.einsum('ij,ij->i', residual, residual) / n_samples
+            # 잔차 분산이 0 (반올림 오차 수준)인 유전자는 보정하지 않고 prior 추정에서도 제외
+            mean_square = np.einsum('ij,ij->i', block, block) / n_samples
+            valid[rows] = pooled_var[rows] > np.finfo(np.float64).eps * mean_square
+            pooled_var[rows][~valid[rows]] = 0.0
+            standardized = self._standardize(block, coef[rows], pooled_var[rows], design, batch_sizes)
+            batch_sums[rows] = standardized @ batch_design
+            batch_squares[rows] = (standardized * standardized) @ batch_design
+
+        self.batches_ = names
+        self.gene_ids_ = matrix.gene_ids
+        self.sample_names_ = matrix.sample_names
+        self.batch_sizes_ = batch_sizes
+        self.design_ = design
+        self.coef_ = coef
+        self.pooled_var_ = pooled_var
+        self.valid_genes_ = valid
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.gamma_hat_ = batch_sums / batch_sizes
+            self.delta_hat_ = (batch_squares - batch_sizes * self.gamma_hat_ ** 2) / (batch_sizes - 1)
+        self._estimate_priors()
+        self.gamma_star_, self.delta_star_ = self._shrink(batch_sums, batch_squares)
+        return self
+
+    def _standardize(self, block, coef, pooled_var, design, batch_sizes):
+        """(Y - 표준 평균) / pooled sd (표준 평균 = batch 가중 평균 + covariate 효과)"""
+        n_batches = len(batch_sizes)
+        grand_mean = coef[:, :n_batches] @ (batch_sizes / batch_sizes.sum())
+        standard_mean = grand_mean[:, None] + coef[:, n_batches:] @ design[:, n_batches:].T
+        scale = np.sqrt(np.where(pooled_var > 0, pooled_var, 1.0))
+        standardized = block - standard_mean
+        standardized /= scale[:, None]
+        return standardized
+
+    def _estimate_priors(self):
+        """batch별 gamma ~ N(gamma_bar, tau2), delta ~ InvGamma(a, b) (method of moments)"""
+        gamma_hat = self.gamma_hat_[self.valid_genes_]
+        self.gamma_bar_ = gamma_hat.mean(axis=0)
+        self.tau2_ = gamma_hat.var(axis=0, ddof=1)
+
+        if self.mean_only:
+            self.a_prior_ = self.b_prior_ = None
+            return
+        delta_hat = self.delta_hat_[self.valid_genes_]
+        mean = delta_hat.mean(axis=0)
+        var = delta_hat.var(axis=0, ddof=1)
+        self.a_prior_ = (2 * var + mean ** 2) / var
+        self.b_prior_ = (mean * var + mean ** 3) / var
+
+    def _shrink(self, batch_sums, batch_squares):
+        """모든 유전자 / batch의 사후 gamma*, delta*를 동시에 반복 추정"""
+        n = self.batch_sizes_
+        gamma_hat, tau2, gamma_bar = self.gamma_hat_, self.tau2_, self.gamma_bar_
+
+        if self.mean_only:
+            gamma_star = (n * tau2 * gamma_hat + gamma_bar) / (n * tau2 + 1.0)
+            delta_star = np.ones_like(gamma_star)
+        else:
+            delta_old = self.delta_hat_.copy()
+            gamma_old = gamma_hat.copy()
+            a, b = self.a_prior_, self.b_prior_
+            self.n_iter_ = self.max_iter
+            for iteration in range(self.max_iter):
+                gamma_star = (n * tau2 * gamma_hat + delta_old * gamma_bar) / (n * tau2 + delta_old)
+                # sum((s - gamma)^2)를 batch별 합 / 제곱합으로 계산 (데이터 재순회 없음)
+                residual_ss = batch_squares - 2 * gamma_star * batch_sums + n * gamma_star ** 2
+                delta_star = (0.5 * residual_ss + b) / (n / 2.0 + a - 1.0)
+
+                valid = self.valid_genes_
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    change = max(
+                        np.nanmax(np.abs(gamma_star[valid] - gamma_old[valid]) / np.abs(gamma_old[valid])),
+                        np.nanmax(np.abs(delta_star[valid] - delta_old[valid]) / delta_old[valid])
+                    )
+                gamma_old, delta_old = gamma_star, delta_star
+                if change < self.tol:
+                    self.n_iter_ = iteration + 1
+                    break
+
+        gamma_star = np.where(self.valid_genes_[:, None], gamma_star, 0.0)
+        delta_star = np.where(self.valid_genes_[:, None], delta_star, 1.0)
+        return gamma_star, delta_star
+
+    def transform(self, data):
+        """fit한 matrix (같은 유전자 / 샘플)의 batch 보정 결과 DataFrame"""
+        matrix = _GeneMatrix(data)
+        if not matrix.gene_ids.equals(self.gene_ids_) or not matrix.sample_names.equals(self.sample_names_):
+            raise ValueError("ComBat.transform requires the genes and samples used in fit")
+
+        codes = self.design_[:, :len(self.batches_)].argmax(axis=1)
+        scale = np.sqrt(np.where(self.valid_genes_, self.pooled_var_, 1.0))
+        corrected = np.empty(matrix.shape)
+        for rows, block in self._blocks(matrix):
+            standardized = self._standardize(block, self.coef_[rows], self.pooled_var_[rows],
+                                             self.design_, self.batch_sizes_)
+            # 표준화 값에서 batch 효과를 빼고 원래 척도 (pooled sd, 표준 평균)로 되돌림
+            adjusted = (standardized - self.gamma_star_[rows][:, codes]) / np.sqrt(self.delta_star_[rows][:, codes])
+            adjusted = block + (adjusted - standardized) * scale[rows, None]
+            corrected[rows] = np.where(self.valid_genes_[rows, None], adjusted, block)
+
+        return pd.DataFrame(corrected, index=matrix.gene_ids, columns=matrix.sample_names, copy=False)
+
+    def fit_transform(self, data, batches, covariates=None):
+        return self.fit(data, batches, covariates).transform(data)
+
+
+def batch_variance_explained(scores, explained_variance_ratio, batches):
+    """PC별 batch 설명력 (batch 일원분산분석 R^2)과 전체 분산 중 batch로 설명되는 비율
+
+    Returns:
+        (PC별 DataFrame [explained_variance, batch_r2], sum(explained_variance * batch_r2))
+    """
+    codes, _ = _batch_labels(batches, scores.index)
+    values = scores.to_numpy(dtype=np.float64)
+    centered = values - values.mean(axis=0)
+
+    counts = np.bincount(codes)
+    group_means = np.stack([np.bincount(codes, weights=column) for column in centered.T], axis=1) / counts[:, None]
+    between = (counts[:, None] * group_means ** 2).sum(axis=0)
+    total = (centered ** 2).sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        batch_r2 = np.where(total > 0, between / total, 0.0)
+
+    ratio = np.asarray(explained_variance_ratio, dtype=np.float64)[:values.shape[1]]
+    report = pd.DataFrame({'explained_variance': ratio, 'batch_r2': batch_r2}, index=scores.columns)
+    return report, float((ratio * batch_r2).sum())
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Pipeline Benchmark
+negative binomial 합성 cohort로 stage별 시간 / 처리량 / 메모리를 측정하고
+저장된 baseline JSON과 비교하여 성능 회귀를 찾는다
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from gene_annotation_analysis import GeneExpressionAnalyzer
+from instrumentation import Instrumentation
+from legacy_rna_pipeline import LegacyRNAAnalysisPipeline
+
+BENCHMARK_FORMAT_VERSION = 1
+
+GENE_COUNTS = (1000, 20000, 60000)
+SAMPLE_COUNTS = (8, 100, 1000)
+
+BENCHMARK_STAGES = (
+    'load_count_matrix', 'filter', 'normalize', 'qc', 'pca',
+    'de_t_test', 'de_nb_glm', 'de_analyzer', 'annotate_genes', 'identify_pathway_genes'
+)
+
+# 기본 grid에서 너무 오래 걸리는 stage의 원소 수 (유전자 x 샘플) 상한 - None이면 제한 없음
+DEFAULT_STAGE_ELEMENT_LIMITS = {'de_nb_glm': 20_000_000}
+
+# baseline 대비 wall time이 이 비율 이상 늘면 회귀로 판정
+DEFAULT_REGRESSION_TOLERANCE = 0.25
+
+# 이보다 짧은 stage는 측정 잡음이 커서 회귀 판정에서 제외
+MIN_COMPARABLE_SECONDS = 0.05
+
+
+class SyntheticCohort:
+    """합성 count matrix와 정답 정보
+
+    Attributes:
+        counts: 유전자 x 샘플 count DataFrame (int64)
+        group1, group2: 샘플 이름 목록 (group1에 DE가 심어짐)
+        de_genes: 심어진 DE 유전자 ID
+        log2_fold_changes: de_genes별 실제 log2 fold change
+        gene_annotations: {gene_id: {'symbol', 'biotype', 'chromosome'}}
+        pathway_info: {pathway: [gene_id]}
+    """
+
+    def __init__(self, counts, group1, group2, de_genes, log2_fold_changes, gene_annotations, pathway_info):
+        self.counts = counts
+        self.group1 = group1
+        self.group2 = group2
+        self.de_genes = de_genes
+        self.log2_fold_changes = log2_fold_changes
+        self.gene_annotations = gene_annotations
+        self.pathway_info = pathway_info
+
+
+def synthetic_cohort(n_genes, n_samples, sparsity=0.0, de_fraction=0.05, log2_fold_change=1.0,
+                     n_pathways=200, seed=0):
+    """negative binomial 합성 RNA-seq cohort 생성
+
+    유전자별 평균은 log-normal, dispersion은 평균에 대한 감소 trend(0.05 + 1/mean)에
+    log-normal 잡음을 더해 정하고, 샘플별 library size factor를 곱한다. group1 샘플에서
+    de_fraction 비율의 유전자 평균을 +-log2_fold_change만큼 바꾸고, sparsity만큼
+    원소를 0으로 만든다 (dropout). mitochondrial / ribosomal symbol과 pathway도 함께 만든다.
+    """
+    if n_samples < 4:
+        raise ValueError("Synthetic cohort requires at least 4 samples")
+    if not 0.0 <= sparsity < 1.0:
+        raise ValueError(f"sparsity must be in [0, 1): {sparsity}")
+
+    rng = np.random.default_rng(seed)
+    gene_ids = pd.Index([f'ENSG{i:011d}' for i in range(n_genes)], name='gene_id')
+    samples = pd.Index([f'Sample_{i + 1}' for i in range(n_samples)])
+    group1 = list(samples[:n_samples // 2])
+    group2 = list(samples[n_samples // 2:])
+
+    base_mean = rng.lognormal(mean=3.0, sigma=2.0, size=n_genes)
+    dispersion = (0.05 + 1.0 / base_mean) * rng.lognormal(mean=0.0, sigma=0.5, size=n_genes)
+    size_factors = rng.lognormal(mean=0.0, sigma=0.2, size=n_samples)
+
+    n_de = int(round(n_genes * de_fraction))
+    de_rows = np.sort(rng.choice(n_genes, size=n_de, replace=False))
+    fold_changes = np.where(rng.random(n_de) < 0.5, -log2_fold_change, log2_fold_change)
+    gene_fold = np.zeros(n_genes)
+    gene_fold[de_rows] = fold_changes
+
+    # 샘플 block 단위로 생성하여 중간 배열 크기를 제한
+    counts = np.empty((n_genes, n_samples), dtype=np.int64)
+    in_group1 = np.zeros(n_samples, dtype=bool)
+    in_group1[:n_samples // 2] = True
+    shape = 1.0 / dispersion
+    block = max(1, 2_000_000 // max(n_genes, 1))
+    for start in range(0, n_samples, block):
+        stop = min(start + block, n_samples)
+        mean = base_mean[:, None] * size_factors[None, start:stop]
+        mean = mean * np.exp2(gene_fold[:, None] * in_group1[None, start:stop])
+        # gamma-Poisson mixture = negative binomial(mean, dispersion)
+        rate = rng.gamma(shape[:, None], mean / shape[:, None])
+        values = rng.poisson(rate)
+        if sparsity > 0:
+            values[rng.random(values.shape) < sparsity] = 0
+        counts[:, start:stop] = values
+
+    symbols = np.array([f'GENE{i}' for i in range(n_genes)], dtype=object)
+    n_mito = min(13, n_genes)
+    symbols[:n_mito] = [f'MT-G{i}' for i in range(n_mito)]
+    n_ribo = min(80, n_genes - n_mito)
+    symbols[n_mito:n_mito + n_ribo] = [f'RP{"SL"[i % 2]}{i}' for i in range(n_ribo)]
+    chromosomes = rng.choice([str(c) for c in range(1, 23)] + ['X', 'Y'], size=n_genes).astype(object)
+    chromosomes[:n_mito] = 'MT'
+    gene_annotations = {
+        gene_id: {'symbol': symbol, 'biotype': 'protein_coding', 'chromosome': chromosome}
+        for gene_id, symbol, chromosome in zip(gene_ids, symbols, chromosomes)
+    }
+
+    pathway_sizes = rng.integers(10, min(300, n_genes) + 1, size=n_pathways)
+    pathway_info = {
+        f'PATHWAY_{i:04d}': list(gene_ids[rng.choice(n_genes, size=size, replace=False)])
+        for i, size in enumerate(pathway_sizes)
+    }
+
+    return SyntheticCohort(
+        pd.DataFrame(counts, index=gene_ids, columns=samples, copy=False),
+        group1, group2, list(gene_ids[de_rows]),
+        pd.Series(fold_changes, index=gene_ids[de_rows]),
+        gene_annotations, pathway_info
+    )
+
+
+def _stage_plan(cohort, count_path):
+    """stage -> 측정 함수 dict - 각 함수는 앞 stage 결과를 담은 state dict를 받는다"""
+    pipeline = LegacyRNAAnalysisPipeline()
+    nb_glm_pipeline = LegacyRNAAnalysisPipeline()
+    nb_glm_pipeline.statistical_test = 'nb_glm'
+    analyzer = GeneExpressionAnalyzer()
+    analyzer.gene_annotations = cohort.gene_annotations
+    analyzer.pathway_info = cohort.pathway_info
+    pipeline.annotation_table = analyzer.annotation_table
+
+    def dense(matrix):
+        return matrix.to_frame() if hasattr(matrix, 'to_frame') else matrix
+
+    def significant_genes(state):
+        de = state.get('de') if state.get('de') is not None else state.get('de_nb_glm')
+        if de is None:
+            return list(cohort.de_genes)
+        return list(de.loc[de['significant'], 'gene_id'])
+
+    return {
+        'load_count_matrix': lambda state: pipeline.load_count_matrix(count_path),
+        'filter': lambda state: pipeline.filter_low_expression_genes(state['counts']),
+        'normalize': lambda state: pipeline.normalize_expression(state['filtered']),
+        'qc': lambda state: pipeline.quality_control_analysis(state['normalized'], state['filtered']),
+        'pca': lambda state: pipeline.perform_pca_analysis(state['normalized']),
+        'de_t_test': lambda state: pipeline.differential_expression_legacy(
+            state['normalized'], cohort.group1, cohort.group2),
+        'de_nb_glm': lambda state: nb_glm_pipeline.differential_expression_legacy(
+            state['normalized'], cohort.group1, cohort.group2, count_matrix=state['filtered']),
+        'de_analyzer': lambda state: analyzer.differential_expression_analysis(
+            cohort.group2, cohort.group1, dense(state['normalized'])),
+        'annotate_genes': lambda state: analyzer.annotate_genes(dense(state['normalized'])),
+        'identify_pathway_genes': lambda state: analyzer.identify_pathway_genes(significant_genes(state))
+    }
+
+
+# stage 결과를 다음 stage에 넘길 state 이름
+_STATE_NAMES = {
+    'load_count_matrix': 'counts', 'filter': 'filtered', 'normalize': 'normalized',
+    'de_t_test': 'de', 'de_nb_glm': 'de_nb_glm'
+}
+
+
+def run_benchmark(n_genes, n_samples, stages=BENCHMARK_STAGES, sparsity=0.0, repeats=1, seed=0,
+                  trace_memory=True, stage_element_limits=None, work_dir=None):
+    """한 (유전자 수, 샘플 수) 조합의 stage별 측정 결과 목록
+
+    load_count_matrix는 cohort를 TSV로 쓴 뒤 다시 읽는 시간을 잰다. 측정하지 않는
+    선행 stage도 뒤 stage 입력을 만들기 위해 실행한다. 측정 stage는 warm-up 1회 후
+    tracemalloc 없이 repeats번 실행해 가장 빠른 wall time의 측정값을 남기고,
+    trace_memory이면 heap peak는 별도 1회 실행에서 잰다. 원소 수가 stage_element_limits를 넘는 stage는 status='skipped'로 기록한다.
+    """
+    if stage_element_limits is None:
+        stage_element_limits = DEFAULT_STAGE_ELEMENT_LIMITS
+    unknown = set(stages) - set(BENCHMARK_STAGES)
+    if unknown:
+        raise ValueError(f"Unknown benchmark stages: {sorted(unknown)}")
+
+    cohort = synthetic_cohort(n_genes, n_samples, sparsity=sparsity, seed=seed)
+    n_elements = n_genes * n_samples
+    records = []
+
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp_dir:
+        count_path = os.path.join(tmp_dir, 'counts.tsv')
+        cohort.counts.to_csv(count_path, sep='\t')
+        state = {'counts': cohort.counts}
+
+        for stage in BENCHMARK_STAGES:
+            measured = stage in stages
+            limit = stage_element_limits.get(stage)
+            needed = stage in ('filter', 'normalize') or (stage == 'de_t_test' and 'identify_pathway_genes' in stages)
+            if limit is not None and n_elements > limit:
+                if measured:
+                    records.append(_record(n_genes, n_samples, sparsity, stage, status='skipped'))
+                continue
+            if not measured and not needed:
+                continue
+
+            # 측정 전 warm-up (lazy import, 첫 호출 비용 제외) - 결과는 뒤 stage 입력으로 사용
+            result = _stage_plan(cohort, count_path)[stage](state)
+            if stage in _STATE_NAMES:
+                state[_STATE_NAMES[stage]] = result
+            if not measured:
+                continue
+
+            # 시간은 tracemalloc 없이 측정하고, heap peak는 별도 실행에서 측정
+            best = min((_measure_stage(cohort, count_path, stage, state, False) for _ in range(repeats)),
+                       key=lambda summary: summary['wall_s'])
+            if trace_memory:
+                memory = _measure_stage(cohort, count_path, stage, state, True)
+                best = dict(best, tracemalloc_peak_delta_mb=memory['tracemalloc_peak_delta_mb'])
+            records.append(_record(n_genes, n_samples, sparsity, stage, best))
+
+    return records
+
+
+def _measure_stage(cohort, count_path, stage, state, trace_memory):
+    """stage 1회 실행의 Instrumentation 측정값"""
+    # 실행마다 새 pipeline / analyzer를 만들어 PCA / pathway index cache 재사용을 막음
+    plan = _stage_plan(cohort, count_path)
+    instrumentation = Instrumentation(trace_memory=trace_memory, capture_logs=False)
+    try:
+        instrumentation.run(stage, plan[stage], (state,), {})
+    finally:
+        instrumentation.close()
+    return instrumentation.stage_summary()[-1]
+
+
+def _record(n_genes, n_samples, sparsity, stage, summary=None, status='ok'):
+    record = {
+        'n_genes': n_genes, 'n_samples': n_samples, 'sparsity': sparsity,
+        'stage': stage, 'status': status
+    }
+    if summary is not None:
+        wall = summary['wall_s']
+        record.update(
+            wall_s=wall,
+            cpu_s=summary['cpu_s'],
+            genes_per_s=n_genes / wall if wall > 0 else None,
+            elements_per_s=n_genes * n_samples / wall if wall > 0 else None,
+            peak_memory_mb=summary.get('tracemalloc_peak_delta_mb'),
+            peak_rss_mb=summary.get('peak_rss_mb')
+        )
+    return record
+
+
+def run_benchmark_grid(gene_counts=GENE_COUNTS, sample_counts=SAMPLE_COUNTS, **options):
+    """gene_counts x sample_counts grid 측정 결과 (metadata 포함 dict)"""
+    records = []
+    for n_genes in gene_counts:
+        for n_samples in sample_counts:
+            records.extend(run_benchmark(n_genes, n_samples, **options))
+    return {
+        'version': BENCHMARK_FORMAT_VERSION,
+        'metadata': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'results': records
+    }
+
+
+def results_frame(results):
+    """결과 dict -> stage별 행 DataFrame"""
+    return pd.DataFrame(results['results'])
+
+
+def compare_to_baseline(results, baseline, tolerance=DEFAULT_REGRESSION_TOLERANCE):
+    """baseline 대비 wall time 비율과 회귀 여부
+
+    같은 (n_genes, n_samples, sparsity, stage) 행끼리 비교하며, 양쪽 모두 측정되었고
+    baseline이 MIN_COMPARABLE_SECONDS 이상인 행만 회귀 판정 대상이다.
+    """
+    keys = ['n_genes', 'n_samples', 'sparsity', 'stage']
+    current = results_frame(results)
+    reference = results_frame(baseline)
+    if current.empty or reference.empty:
+        return pd.DataFrame(columns=keys + ['wall_s', 'baseline_wall_s', 'ratio', 'regression'])
+
+    merged = current[keys + ['wall_s']].merge(
+        reference[keys + ['wall_s']].rename(columns={'wall_s': 'baseline_wall_s'}),
+        on=keys, how='left'
+    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        merged['ratio'] = merged['wall_s'] / merged['baseline_wall_s']
+    comparable = merged['baseline_wall_s'] >= MIN_COMPARABLE_SECONDS
+    merged['regression'] = comparable & (merged['ratio'] > 1.0 + tolerance)
+    return merged
+
+
+def load_results(path):
+    with open(path, 'r') as f:
+        results = json.load(f)
+    if results.get('version') != BENCHMARK_FORMAT_VERSION:
+        raise ValueError(f"Unsupported benchmark format in {path}: {results.get('version')}")
+    return results
+
+
+def save_results(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="RNA pipeline stage benchmark")
+    parser.add_argument('--genes', type=int, nargs='+', default=list(GENE_COUNTS))
+    parser.add_argument('--samples', type=int, nargs='+', default=list(SAMPLE_COUNTS))
+    parser.add_argument('--stages', nargs='+', default=list(BENCHMARK_STAGES), choices=BENCHMARK_STAGES)
+    parser.add_argument('--sparsity', type=float, default=0.0)
+    parser.add_argument('--repeats', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-trace-memory', action='store_true', help="heap peak 측정용 tracemalloc 실행 생략")
+    parser.add_argument('--no-limits', action='store_true', help="stage별 원소 수 상한 해제")
+    parser.add_argument('--output', help="결과 JSON 저장 경로")
+    parser.add_argument('--baseline', help="비교할 baseline JSON")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_REGRESSION_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    results = run_benchmark_grid(
+        args.genes, args.samples, stages=args.stages, sparsity=args.sparsity, repeats=args.repeats,
+        seed=args.seed, trace_memory=not args.no_trace_memory,
+        stage_element_limits={} if args.no_limits else None
+    )
+
+    columns = ['n_genes', 'n_samples', 'stage', 'status', 'wall_s', 'elements_per_s', 'peak_memory_mb']
+    frame = results_frame(results).reindex(columns=columns)
+    print(frame.to_string(index=False, float_format=lambda value: f'{value:.4g}'))
+
+    if args.output:
+        save_results(results, args.output)
+        print(f"\nResults saved to {args.output}")
+
+    if args.baseline:
+        comparison = compare_to_baseline(results, load_results(args.baseline), args.tolerance)
+        print("\nBaseline comparison:")
+        print(comparison.to_string(index=False, float_format=lambda value: f'{value:.3g}'))
+        regressions = comparison[comparison['regression']]
+        if len(regressions):
+            print(f"\n{len(regressions)} stage(s) slower than baseline by more than {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
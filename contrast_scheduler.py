@@ -0,0 +1,141 @@
+"""
+Multi-Contrast DE Scheduler
+한 번 전처리한 matrix를 shared memory에 올리고 contrast들을 process pool에 분배
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from sparse_backend import SparseExpressionMatrix
+
+# worker process별 상태 (initializer로 한 번만 전달)
+_WORKER_STATE = {}
+
+
+def normalize_contrasts(contrasts):
+    """{name: (group1, group2)} 또는 (name, group1, group2) 목록 -> [(name, group1, group2)]"""
+    if isinstance(contrasts, dict):
+        items = [(name, groups[0], groups[1]) for name, groups in contrasts.items()]
+    else:
+        items = [(name, group1, group2) for name, group1, group2 in contrasts]
+
+    names = [name for name, _, _ in items]
+    if len(set(names)) != len(names):
+        raise ValueError("Contrast names must be unique")
+    return [(name, list(group1), list(group2)) for name, group1, group2 in items]
+
+
+class SharedArrays:
+    """ndarray들을 shared memory 블록으로 복사하고 worker에서 복사 없이 다시 여는 helper"""
+
+    def __init__(self):
+        self.blocks = []
+
+    def share(self, array):
+        """array를 shared memory에 복사하고 (name, shape, dtype) spec 반환"""
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        self.blocks.append(block)
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        return block.name, array.shape, array.dtype.str
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+def _attach(spec, handles):
+    name, shape, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    handles.append(block)
+    array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    array.flags.writeable = False
+    return array
+
+
+def share_matrix(shared, matrix):
+    """DataFrame / SparseExpressionMatrix -> worker에 넘길 spec (값은 shared memory, label만 pickle)"""
+    if matrix is None:
+        return None
+    if isinstance(matrix, SparseExpressionMatrix):
+        csr = matrix.matrix
+        return {
+            'kind': 'sparse',
+            'arrays': [shared.share(csr.data), shared.share(csr.indices), shared.share(csr.indptr)],
+            'index': matrix.index,
+            'columns': matrix.columns
+        }
+    return {
+        'kind': 'dense',
+        'arrays': [shared.share(matrix.to_numpy())],
+        'index': matrix.index,
+        'columns': matrix.columns
+    }
+
+
+def attach_matrix(spec, handles):
+    """share_matrix spec -> shared memory 위의 DataFrame / SparseExpressionMatrix"""
+    if spec is None:
+        return None
+    arrays = [_attach(array_spec, handles) for array_spec in spec['arrays']]
+    if spec['kind'] == 'sparse':
+        csr = sparse.csr_matrix((arrays[0], arrays[1], arrays[2]),
+                                shape=(len(spec['index']), len(spec['columns'])), copy=False)
+        return SparseExpressionMatrix(csr, spec['index'], spec['columns'])
+    return pd.DataFrame(arrays[0], index=spec['index'], columns=spec['columns'], copy=False)
+
+
+def _init_worker(pipeline_class, settings, normalized_spec, count_spec):
+    handles = []
+    pipeline = pipeline_class()
+    pipeline.__dict__.update(settings)
+    _WORKER_STATE.clear()
+    _WORKER_STATE.update(
+        pipeline=pipeline,
+        normalized=attach_matrix(normalized_spec, handles),
+        counts=attach_matrix(count_spec, handles),
+        handles=handles
+    )
+
+
+def _run_contrast(group1, group2):
+    state = _WORKER_STATE
+    return state['pipeline'].contrast_statistics(state['normalized'], group1, group2, state['counts'])
+
+
+def run_contrast_pool(pipeline, normalized_matrix, contrasts, count_matrix=None, n_workers=None):
+    """contrast별 DE 통계량 계산 (n_workers > 1이면 shared memory + process pool)
+
+    worker에는 matrix 값 대신 shared memory 블록 이름과 pipeline 설정만 전달되며,
+    결과는 contrast 순서대로 반환된다.
+
+    Returns:
+        [(name, DE DataFrame)]
+    """
+    contrasts = normalize_contrasts(contrasts)
+    n_workers = min(n_workers or os.cpu_count(), len(contrasts)) or 1
+
+    if n_workers == 1:
+        return [
+            (name, pipeline.contrast_statistics(normalized_matrix, group1, group2, count_matrix))
+            for name, group1, group2 in contrasts
+        ]
+
+    shared = SharedArrays()
+    try:
+        normalized_spec = share_matrix(shared, normalized_matrix)
+        count_spec = share_matrix(shared, count_matrix)
+        initargs = (type(pipeline), pipeline.contrast_settings(), normalized_spec, count_spec)
+
+        with ProcessPoolExecutor(n_workers, initializer=_init_worker, initargs=initargs) as pool:
+            futures = [pool.submit(_run_contrast, group1, group2) for _, group1, group2 in contrasts]
+            return [(name, future.result()) for (name, _, _), future in zip(contrasts, futures)]
+    finally:
+        shared.close()
@@ -0,0 +1,279 @@
+"""
+Streaming Count Matrix Loader
+TSV(.gz 포함) count matrix를 고정 크기 블록 단위로 읽어 typed NumPy 배열로 변환하고,
+반복 로딩을 위한 memmap binary store(.npy + index sidecar)를 제공
+
+numpy / pandas는 CLI의 가벼운 명령(헤더 / shape 조회)이 import 비용을 내지 않도록
+실제로 배열을 다루는 함수 안에서 import한다.
+"""
+
+import gzip
+import itertools
+import json
+import os
+
+DEFAULT_CHUNK_ROWS = 10000
+DEFAULT_COUNT_DTYPE = 'float32'
+
+_GZIP_MAGIC = b'\x1f\x8b'
+
+
+def open_count_file(file_path):
+    """count 파일 열기 (gzip 자동 감지)"""
+    with open(file_path, 'rb') as f:
+        is_gzip = f.read(2) == _GZIP_MAGIC
+
+    if is_gzip:
+        return gzip.open(file_path, 'rt')
+    return open(file_path, 'r')
+
+
+def _parse_header(header_line):
+    header = header_line.rstrip('\r\n').split('\t')
+    return header[0], header[1:]
+
+
+def _parse_block(lines, n_samples, dtype):
+    """TSV 라인 블록을 (gene_ids, values)로 변환"""
+    import numpy as np
+
+    gene_ids = []
+    value_lines = []
+    for line in lines:
+        if not line.strip():
+            continue
+        gene_id, _, values = line.rstrip('\r\n').partition('\t')
+        gene_ids.append(gene_id)
+        value_lines.append(values)
+
+    if not gene_ids:
+        return gene_ids, np.empty((0, n_samples), dtype=dtype)
+
+    values = np.loadtxt(value_lines, delimiter='\t', dtype=dtype, ndmin=2)
+    if values.shape[1] != n_samples:
+        raise ValueError(f"Expected {n_samples} sample columns, found {values.shape[1]}")
+    return gene_ids, values
+
+
+def read_count_header(file_path):
+    """헤더에서 index 이름과 샘플 이름 목록 반환"""
+    if is_count_store(file_path):
+        sidecar = _read_sidecar(file_path)
+        return sidecar.get('index_name') or None, list(sidecar['sample_names'])
+
+    with open_count_file(file_path) as f:
+        return _parse_header(f.readline())
+
+
+def count_matrix_shape(file_path):
+    """(유전자 수, 샘플 수) - 값을 파싱하지 않고 헤더 / 라인 수 (store는 sidecar)로 계산"""
+    if is_count_store(file_path):
+        sidecar = _read_sidecar(file_path)
+        return len(sidecar['gene_ids']), len(sidecar['sample_names'])
+
+    _, sample_names = read_count_header(file_path)
+    return _count_data_rows(file_path), len(sample_names)
+
+
+def iter_count_blocks(file_path, chunk_rows=DEFAULT_CHUNK_ROWS, dtype=DEFAULT_COUNT_DTYPE):
+    """count matrix를 chunk_rows 유전자 단위 블록으로 순회
+
+    각 블록은 (gene_ids, values) 튜플이며 values는 (유전자 수, 샘플 수)
+    크기의 dtype 배열이다. 한 번에 최대 chunk_rows 라인만 메모리에 올린다.
+    binary count store가 주어지면 memmap에서 같은 형식의 블록을 읽는다.
+    """
+    if is_count_store(file_path):
+        for gene_ids, values in open_count_store(file_path).iter_blocks(chunk_rows):
+            yield gene_ids, values.astype(dtype, copy=False)
+        return
+
+    with open_count_file(file_path) as f:
+        _, sample_names = _parse_header(f.readline())
+        n_samples = len(sample_names)
+
+        while True:
+            lines = list(itertools.islice(f, chunk_rows))
+            if not lines:
+                break
+            gene_ids, values = _parse_block(lines, n_samples, dtype)
+            if gene_ids:
+                yield gene_ids, values
+
+
+def load_count_matrix(file_path, chunk_rows=DEFAULT_CHUNK_ROWS, dtype=DEFAULT_COUNT_DTYPE):
+    """count matrix 전체를 typed DataFrame으로 로드
+
+    블록을 미리 할당한 배열에 바로 채우고, 용량이 부족할 때만 배열을
+    제자리에서 확장한다. binary count store(.npy)가 주어지면 저장된
+    dtype 그대로 memmap 위의 DataFrame을 복사 없이 반환한다.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if is_count_store(file_path):
+        return open_count_store(file_path).to_frame()
+
+    index_name, sample_names = read_count_header(file_path)
+    n_samples = len(sample_names)
+
+    matrix = np.empty((chunk_rows, n_samples), dtype=dtype)
+    gene_ids = []
+    n_rows = 0
+
+    for block_ids, block_values in iter_count_blocks(file_path, chunk_rows, dtype):
+        n_block = len(block_ids)
+        if n_rows + n_block > matrix.shape[0]:
+            capacity = max(matrix.shape[0] * 2, n_rows + n_block)
+            matrix.resize((capacity, n_samples), refcheck=False)
+        matrix[n_rows:n_rows + n_block] = block_values
+        gene_ids.extend(block_ids)
+        n_rows += n_block
+
+    matrix.resize((n_rows, n_samples), refcheck=False)
+
+    index = pd.Index(gene_ids, name=index_name or None)
+    return pd.DataFrame(matrix, index=index, columns=sample_names, copy=False)
+
+
+# ---------------------------------------------------------------------------
+# Memory-mapped binary count store (.npy + index sidecar)
+# ---------------------------------------------------------------------------
+
+STORE_SIDECAR_SUFFIX = '.index.json'
+
+
+def _sidecar_path(store_path):
+    return f"{store_path}{STORE_SIDECAR_SUFFIX}"
+
+
+def _read_sidecar(store_path):
+    with open(_sidecar_path(store_path), 'r') as f:
+        return json.load(f)
+
+
+def is_count_store(file_path):
+    """binary count store(.npy + sidecar) 여부 확인"""
+    return str(file_path).endswith('.npy') and os.path.exists(_sidecar_path(file_path))
+
+
+def _count_data_rows(file_path):
+    with open_count_file(file_path) as f:
+        f.readline()
+        return sum(1 for line in f if line.strip())
+
+
+def write_count_store(store_path, blocks, n_rows, sample_names, index_name=None,
+                      dtype=DEFAULT_COUNT_DTYPE, source=None):
+    """(gene_ids, values) 블록 iterator를 .npy memmap + index sidecar로 기록"""
+    import numpy as np
+
+    values = np.lib.format.open_memmap(
+        store_path, mode='w+', dtype=dtype, shape=(n_rows, len(sample_names))
+    )
+    gene_ids = []
+    for block_ids, block_values in blocks:
+        start = len(gene_ids)
+        values[start:start + len(block_ids)] = block_values
+        gene_ids.extend(block_ids)
+    values.flush()
+    del values
+
+    if len(gene_ids) != n_rows:
+        raise ValueError(f"Expected {n_rows} rows, wrote {len(gene_ids)}")
+
+    with open(_sidecar_path(store_path), 'w') as f:
+        json.dump({
+            'index_name': index_name,
+            'gene_ids': gene_ids,
+            'sample_names': list(sample_names),
+            'source': os.path.abspath(source) if source else None
+        }, f)
+
+    return store_path
+
+
+def convert_tsv_to_store(tsv_path, store_path, chunk_rows=DEFAULT_CHUNK_ROWS, dtype=DEFAULT_COUNT_DTYPE):
+    """TSV count matrix를 memmap 가능한 .npy + index sidecar로 1회 변환
+
+    블록 단위로 .npy memmap에 직접 기록하므로 변환 중에도 메모리는
+    chunk_rows 크기로 제한된다.
+    """
+    index_name, sample_names = read_count_header(tsv_path)
+    n_rows = _count_data_rows(tsv_path)
+
+    return write_count_store(
+        store_path, iter_count_blocks(tsv_path, chunk_rows, dtype), n_rows,
+        sample_names, index_name=index_name, dtype=dtype, source=tsv_path
+    )
+
+
+class CountMatrixStore:
+    """memmap 기반 count matrix store (read-only)"""
+
+    def __init__(self, store_path):
+        import numpy as np
+        import pandas as pd
+
+        self.store_path = store_path
+        self.values = np.load(store_path, mmap_mode='r')
+        sidecar = _read_sidecar(store_path)
+
+        self.index_name = sidecar.get('index_name') or None
+        self.gene_ids = pd.Index(sidecar['gene_ids'], name=self.index_name)
+        self.sample_names = pd.Index(sidecar['sample_names'])
+
+        if self.values.shape != (len(self.gene_ids), len(self.sample_names)):
+            raise ValueError(f"Store shape {self.values.shape} does not match sidecar index")
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def to_frame(self):
+        """전체 matrix를 복사 없이 memmap 위의 DataFrame으로 반환"""
+        import pandas as pd
+
+        return pd.DataFrame(self.values, index=self.gene_ids, columns=self.sample_names, copy=False)
+
+    def select(self, genes=None, samples=None):
+        """필요한 유전자/샘플만 디스크에서 읽어 DataFrame으로 반환 (유전자는 store 순서)
+
+        genes는 유전자 ID 목록 또는 store 행 순서의 boolean mask이다.
+        """
+        import numpy as np
+        import pandas as pd
+
+        if genes is None:
+            row_idx = slice(None)
+        elif isinstance(genes, np.ndarray) and genes.dtype == bool:
+            row_idx = np.flatnonzero(genes)
+        else:
+            row_idx = np.sort(self.gene_ids.get_indexer_for(genes))
+        col_idx = slice(None) if samples is None else self.sample_names.get_indexer_for(samples)
+
+        if (isinstance(row_idx, np.ndarray) and (row_idx < 0).any()) or \
+                (isinstance(col_idx, np.ndarray) and (col_idx < 0).any()):
+            raise KeyError("Requested genes or samples are not in the count store")
+
+        values = self.values[row_idx]
+        if not isinstance(col_idx, slice):
+            values = values[:, col_idx]
+
+        return pd.DataFrame(
+            np.asarray(values),
+            index=self.gene_ids[row_idx],
+            columns=self.sample_names[col_idx]
+        )
+
+    def iter_blocks(self, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """유전자 블록 단위 (gene_ids, values) 순회 (iter_count_blocks와 동일 형식)"""
+        import numpy as np
+
+        for start in range(0, self.shape[0], chunk_rows):
+            stop = min(start + chunk_rows, self.shape[0])
+            yield list(self.gene_ids[start:stop]), np.asarray(self.values[start:stop])
+
+
+def open_count_store(store_path):
+    """binary count store 열기"""
+    return CountMatrixStore(store_path)
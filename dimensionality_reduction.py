@@ -0,0 +1,249 @@
+"""
+Dimensionality Reduction
+유전자 블록을 스트리밍하는 샘플 PCA (exact / randomized / incremental)
+(MODERN_DIMENSIONALITY_REDUCTION["PCA"] 참조)
+
+sklearn은 import 비용이 커서 exact / incremental 적합 시점에 import한다.
+"""
+
+import numpy as np
+import pandas as pd
+
+from count_matrix_io import DEFAULT_CHUNK_ROWS, CountMatrixStore, is_count_store, open_count_store
+from sparse_backend import SparseExpressionMatrix
+
+PCA_METHODS = ('auto', 'exact', 'randomized', 'incremental')
+
+# method='auto'에서 exact PCA를 쓰는 최대 원소 수 (genes x samples)
+EXACT_PCA_MAX_ELEMENTS = 20_000_000
+
+
+class _GeneMatrix:
+    """gene x sample matrix (DataFrame, CountMatrixStore, store 경로, SparseExpressionMatrix)를
+    블록 단위로 읽는 wrapper"""
+
+    def __init__(self, data):
+        if isinstance(data, str) and is_count_store(data):
+            data = open_count_store(data)
+
+        self.is_sparse = isinstance(data, SparseExpressionMatrix)
+        if isinstance(data, CountMatrixStore):
+            self.values = data.values
+            self.gene_ids = data.gene_ids
+            self.sample_names = data.sample_names
+        elif self.is_sparse:
+            self.values = data.matrix
+            self.gene_ids = data.index
+            self.sample_names = data.columns
+        else:
+            self.values = data.to_numpy()
+            self.gene_ids = data.index
+            self.sample_names = data.columns
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def dense(self, rows=slice(None), columns=slice(None)):
+        """선택한 영역의 float64 dense 사본 (sparse이면 이 영역만 dense로 변환)"""
+        selected = self.values[rows]
+        if not isinstance(columns, slice) or columns != slice(None):
+            selected = selected[:, columns]
+        if self.is_sparse:
+            return selected.toarray().astype(np.float64, copy=False)
+        return np.array(selected, dtype=np.float64)
+
+    def blocks(self, chunk_rows):
+        """(slice, float64 block) 순회 - 한 번에 한 블록만 메모리에 올린다"""
+        for start in range(0, self.shape[0], chunk_rows):
+            rows = slice(start, min(start + chunk_rows, self.shape[0]))
+            yield rows, self.dense(rows)
+
+
+def _standardize_rows(block, scaling):
+    """유전자(행)별 centering / scaling을 in-place로 적용하고 (mean, scale) 반환
+
+    StandardScaler와 동일하게 ddof=0 표준편차를 쓰며 분산이 0이면 scale은 1이다.
+    """
+    mean = block.mean(axis=1)
+    block -= mean[:, None]
+    if scaling != 'standard':
+        return mean, np.ones(len(mean))
+    scale = np.sqrt(np.einsum('ij,ij->i', block, block) / block.shape[1])
+    scale[scale == 0] = 1.0
+    block /= scale[:, None]
+    return mean, scale
+
+
+def _flip_signs(components, scores):
+    """성분별 절댓값이 가장 큰 loading이 양수가 되도록 부호 고정 (sklearn svd_flip과 동일)"""
+    signs = np.sign(components[np.arange(len(components)), np.abs(components).argmax(axis=1)])
+    signs[signs == 0] = 1.0
+    return components * signs[:, None], scores * signs
+
+
+class SamplePCA:
+    """샘플 PCA (유전자 = feature)
+
+    exact는 scaled matrix 전체로 sklearn PCA를 수행하고, randomized는 유전자 블록을
+    스트리밍하며 range finder / power iteration을 누적하는 truncated SVD,
+    incremental은 샘플 batch 단위 IncrementalPCA이다. 두 스트리밍 모드의 메모리는
+    블록 하나와 (유전자 수 x 성분 수) 배열 정도로 제한된다.
+
+    randomized의 n_iter="auto"는 sklearn randomized_svd와 같이 성분 수가 min(유전자, 샘플)의
+    10% 미만이면 power iteration 7회, 아니면 4회이다 (평평한 spectrum에서 정확도 확보).
+
+    n_components="auto"이면 max_components까지 계산한 뒤 누적 설명 분산이
+    variance_target 이상이 되는 최소 개수(2개 이상)만 남긴다.
+    """
+
+    def __init__(self, n_components=2, method='auto', scaling='standard', chunk_rows=DEFAULT_CHUNK_ROWS,
+                 n_oversamples=10, n_iter='auto', max_components=50, variance_target=0.9, random_state=42):
+        if method not in PCA_METHODS:
+            raise ValueError(f"Unknown PCA method: {method} (available: {', '.join(PCA_METHODS)})")
+        self.n_components = n_components
+        self.method = method
+        self.scaling = scaling
+        self.chunk_rows = chunk_rows
+        self.n_oversamples = n_oversamples
+        self.n_iter = n_iter
+        self.max_components = max_components
+        self.variance_target = variance_target
+        self.random_state = random_state
+
+    def _requested_components(self, n_genes, n_samples):
+        limit = min(n_genes, n_samples)
+        if self.n_components == 'auto':
+            return min(self.max_components, max(limit - 1, 1))
+        return min(int(self.n_components), limit)
+
+    def fit(self, data):
+        """gene x sample matrix로 PCA 학습 (DataFrame, CountMatrixStore 또는 store 경로)"""
+        matrix = _GeneMatrix(data)
+        n_genes, n_samples = matrix.shape
+        n_components = self._requested_components(n_genes, n_samples)
+
+        method = self.method
+        if method == 'auto':
+            method = 'exact' if n_genes * n_samples <= EXACT_PCA_MAX_ELEMENTS else 'randomized'
+
+        if method == 'exact':
+            scores, components, ratio = self._fit_exact(matrix, n_components)
+        elif method == 'randomized':
+            scores, components, ratio = self._fit_randomized(matrix, n_components)
+        else:
+            scores, components, ratio = self._fit_incremental(matrix, n_components)
+
+        if self.n_components == 'auto':
+            reached = np.flatnonzero(np.cumsum(ratio) >= self.variance_target)
+            keep = reached[0] + 1 if len(reached) else len(ratio)
+            keep = min(max(keep, 2), len(ratio))
+            scores, components, ratio = scores[:, :keep], components[:keep], ratio[:keep]
+
+        self.method_ = method
+        self.n_components_ = len(ratio)
+        self.scores_ = scores
+        self.components_ = components
+        self.explained_variance_ratio_ = ratio
+        self.gene_ids_ = matrix.gene_ids
+        self.sample_names_ = matrix.sample_names
+        return self
+
+    def to_frame(self):
+        """샘플 x PC score DataFrame"""
+        return pd.DataFrame(
+            self.scores_,
+            columns=[f'PC{i + 1}' for i in range(self.n_components_)],
+            index=self.sample_names_
+        )
+
+    def _fit_exact(self, matrix, n_components):
+        from sklearn.decomposition import PCA
+
+        values = matrix.dense()
+        _standardize_rows(values, self.scaling)
+        pca = PCA(n_components=n_components, svd_solver='full')
+        scores = pca.fit_transform(values.T)
+        return scores, pca.components_, pca.explained_variance_ratio_
+
+    def _scaled_blocks(self, matrix):
+        for rows, block in matrix.blocks(self.chunk_rows):
+            _standardize_rows(block, self.scaling)
+            yield rows, block
+
+    def _project_genes(self, matrix, basis):
+        """A^T basis (유전자 x l)와 전체 제곱합을 블록 단위로 계산"""
+        projected = np.empty((matrix.shape[0], basis.shape[1]))
+        total_ss = 0.0
+        for rows, block in self._scaled_blocks(matrix):
+            projected[rows] = block @ basis
+            total_ss += np.einsum('ij,ij->', block, block)
+        return projected, total_ss
+
+    def _project_samples(self, matrix, gene_basis):
+        """A gene_basis (샘플 x l)를 블록 단위로 누적"""
+        projected = np.zeros((matrix.shape[1], gene_basis.shape[1]))
+        for rows, block in self._scaled_blocks(matrix):
+            projected += block.T @ gene_basis[rows]
+        return projected
+
+    def _fit_randomized(self, matrix, n_components):
+        n_genes, n_samples = matrix.shape
+        n_basis = min(n_components + self.n_oversamples, n_samples, n_genes)
+        rng = np.random.default_rng(self.random_state)
+
+        n_iter = self.n_iter
+        if n_iter == 'auto':
+            n_iter = 7 if n_components < 0.1 * min(n_genes, n_samples) else 4
+
+        sample_basis, _ = np.linalg.qr(self._project_samples(matrix, rng.standard_normal((n_genes, n_basis))))
+        for _ in range(n_iter):
+            gene_basis, _ = np.linalg.qr(self._project_genes(matrix, sample_basis)[0])
+            sample_basis, _ = np.linalg.qr(self._project_samples(matrix, gene_basis))
+
+        # B^T = A^T Q -> B = Ub S Vt
+        projected, total_ss = self._project_genes(matrix, sample_basis)
+        gene_vectors, singular_values, small_vt = np.linalg.svd(projected, full_matrices=False)
+
+        components = gene_vectors[:, :n_components].T
+        scores = (sample_basis @ small_vt.T[:, :n_components]) * singular_values[:n_components]
+        components, scores = _flip_signs(components, scores)
+
+        ratio = singular_values[:n_components] ** 2 / total_ss if total_ss > 0 else np.zeros(n_components)
+        return scores, components, ratio
+
+    def _fit_incremental(self, matrix, n_components):
+        from sklearn.decomposition import IncrementalPCA
+        from sklearn.utils import gen_batches
+
+        n_genes, n_samples = matrix.shape
+
+        # 유전자 scaling 통계는 유전자 블록 한 번 순회로 계산
+        mean = np.empty(n_genes)
+        scale = np.empty(n_genes)
+        for rows, block in matrix.blocks(self.chunk_rows):
+            mean[rows], scale[rows] = _standardize_rows(block, self.scaling)
+
+        # partial_fit 내부의 SVD가 batch 크기의 사본을 여러 개 만들므로, 그 합이
+        # 유전자 블록 하나와 비슷하도록 batch 크기를 블록 원소 수의 1/4로 잡는다.
+        # 작은 코호트에서 batch가 너무 작으면 근사 오차가 커지므로 5 x 성분 수 이상으로 둔다
+        # batch 사이에는 n_oversamples개 성분을 더 유지해 잘려 나간 방향의 누적 오차를 줄인다
+        n_tracked = min(n_components + self.n_oversamples, n_samples, n_genes)
+        memory_batch = (self.chunk_rows * n_samples) // (4 * max(n_genes, 1))
+        batch_size = min(n_samples, max(5 * n_components, n_tracked, memory_batch))
+
+        def sample_batches():
+            for batch in gen_batches(n_samples, batch_size, min_batch_size=n_tracked):
+                values = matrix.dense(columns=batch)
+                values -= mean[:, None]
+                values /= scale[:, None]
+                yield batch, values.T
+
+        pca = IncrementalPCA(n_components=n_tracked)
+        for _, batch_values in sample_batches():
+            pca.partial_fit(batch_values)
+
+        scores = np.empty((n_samples, n_components))
+        for batch, batch_values in sample_batches():
+            scores[batch] = pca.transform(batch_values)[:, :n_components]
+        return scores, pca.components_[:n_components], pca.explained_variance_ratio_[:n_components]
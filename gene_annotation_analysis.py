@@ -1,9 +1,22 @@
 import pandas as pd
 import numpy as np
-from scipy import stats
+from de_engine import two_group_statistics
+from count_matrix_io import load_count_matrix
+from annotation_table import AnnotationTable
+from annotation_cache import AnnotationProvider, AnnotationSection, section_fingerprint
+from pathway_index import PathwayIndex
+from pathway_enrichment import hypergeometric_enrichment
+from gsea import GSEAEngine
+from gene_blocks import GeneBlockExecutor
+from multiple_testing import adjust_p_values
+from instrumentation import instrumented_stage, logger
 
 class GeneExpressionAnalyzer:
-    def __init__(self):
+    gene_annotations = AnnotationSection()
+    pathway_info = AnnotationSection()
+    expression_thresholds = AnnotationSection()
+    
+    def __init__(self, annotation_path=None):
         self.gene_annotations = {
             'ENSG00000139618': {'symbol': 'BRCA2', 'biotype': 'protein_coding', 'chromosome': '13'},
             'ENSG00000012048': {'symbol': 'BRCA1', 'biotype': 'protein_coding', 'chromosome': '17'},
@@ -22,86 +35,114 @@ class GeneExpressionAnalyzer:
             'low_expression': 1.0,
             'high_expression': 10.0,
             'fold_change_cutoff': 2.0,
-            'pvalue_cutoff': 0.05
+            'pvalue_cutoff': 0.05,
+            'fdr_cutoff': 0.05
         }
+        
+        self.multiple_testing_method = 'BH_FDR'
+        
+        # 유전자별 DE 통계량을 유전자 블록 단위로 병렬 계산 ('thread' 또는 'process')
+        self.n_jobs = 1
+        self.gene_block_backend = 'thread'
+        
+        # annotation 파일이 주어지면 cache provider가 위 기본값을 대체 (변경 시 자동 reload)
+        self.annotation_provider = None
+        # (내용 fingerprint, 컴파일 결과) - gene_annotations / pathway_info가 바뀌면 다시 빌드
+        self._annotation_table = None
+        self._pathway_index = None
+        self.instrumentation = None
+        if annotation_path is not None:
+            self.annotation_provider = AnnotationProvider(annotation_path)
     
+    @instrumented_stage("load_expression_data")
     def load_expression_data(self, file_path):
         """RNA-seq 발현 데이터 로드"""
         try:
-            data = pd.read_csv(file_path, sep='\t', index_col=0)
+            data = load_count_matrix(file_path, dtype=np.float64)
             return data
         except FileNotFoundError:
-            print(f"파일을 찾을 수 없습니다: {file_path}")
+            logger.warning("파일을 찾을 수 없습니다: %s", file_path)
             return None
     
+    @instrumented_stage("annotate_genes")
     def annotate_genes(self, expression_data):
         """유전자에 어노테이션 정보 추가"""
-        annotated_data = expression_data.copy()
-        
-        # 유전자 심볼 추가
-        gene_symbols = []
-        biotypes = []
-        chromosomes = []
-        
-        for gene_id in expression_data.index:
-            if gene_id in self.gene_annotations:
-                gene_symbols.append(self.gene_annotations[gene_id]['symbol'])
-                biotypes.append(self.gene_annotations[gene_id]['biotype'])
-                chromosomes.append(self.gene_annotations[gene_id]['chromosome'])
-            else:
-                gene_symbols.append('Unknown')
-                biotypes.append('Unknown')
-                chromosomes.append('Unknown')
-        
-        annotated_data['gene_symbol'] = gene_symbols
-        annotated_data['biotype'] = biotypes
-        annotated_data['chromosome'] = chromosomes
-        
-        return annotated_data
+        return self.annotation_table.annotate(expression_data)
     
+    @instrumented_stage("identify_pathway_genes")
     def identify_pathway_genes(self, gene_list):
         """pathway별 유전자 분류"""
-        pathway_results = {}
-        
-        for pathway, genes in self.pathway_info.items():
-            pathway_genes = [gene for gene in gene_list if gene in genes]
-            pathway_results[pathway] = pathway_genes
+        return self.pathway_index.membership(gene_list)
+    
+    @instrumented_stage("pathway_enrichment")
+    def pathway_enrichment(self, de_results, background=None):
+        """유의한 DE 유전자의 pathway over-representation 분석 (hypergeometric + BH)"""
+        significant_genes = de_results.loc[de_results['significant'].astype(bool), 'gene_id']
+        if background is None:
+            background = de_results['gene_id']
         
-        return pathway_results
+        enrichment = hypergeometric_enrichment(self.pathway_index, [significant_genes], background)
+        return enrichment.drop(columns='gene_list').sort_values('p_value', ignore_index=True)
+    
+    @instrumented_stage("batch_pathway_enrichment")
+    def batch_pathway_enrichment(self, gene_lists, background, list_names=None):
+        """여러 gene list (예: contrast별 유의 유전자)의 pathway over-representation 분석"""
+        return hypergeometric_enrichment(self.pathway_index, gene_lists, background, list_names)
+    
+    @instrumented_stage("gene_set_enrichment")
+    def gene_set_enrichment(self, de_results, score_column='log2_fold_change', **gsea_options):
+        """DE 결과의 순위 통계량으로 순열 기반 GSEA 수행 (GSEAEngine 옵션 전달)"""
+        ranked_scores = de_results.set_index('gene_id')[score_column]
+        return GSEAEngine(**gsea_options).run(ranked_scores, self.pathway_info)
     
+    @property
+    def annotation_table(self):
+        """gene_annotations로 컴파일한 AnnotationTable (gene_annotations가 바뀌면 다시 컴파일)"""
+        if self.annotation_provider is not None:
+            return self.annotation_provider.annotation_table
+        gene_annotations = self.gene_annotations
+        fingerprint = section_fingerprint(gene_annotations)
+        if self._annotation_table is None or self._annotation_table[0] != fingerprint:
+            self._annotation_table = (fingerprint, AnnotationTable.from_dict(gene_annotations))
+        return self._annotation_table[1]
+    
+    @property
+    def pathway_index(self):
+        """pathway_info로부터 만든 PathwayIndex (pathway_info가 바뀌면 다시 빌드)"""
+        pathway_info = self.pathway_info
+        fingerprint = section_fingerprint(pathway_info)
+        if self._pathway_index is None or self._pathway_index[0] != fingerprint:
+            self._pathway_index = (fingerprint, PathwayIndex(pathway_info))
+        return self._pathway_index[1]
+    
+    def gene_block_executor(self):
+        """n_jobs / gene_block_backend 설정의 유전자 블록 실행기"""
+        return GeneBlockExecutor(n_workers=self.n_jobs, backend=self.gene_block_backend)
+    
+    @instrumented_stage("differential_expression_analysis")
     def differential_expression_analysis(self, control_samples, treatment_samples, expression_data):
         """차등 발현 분석"""
-        results = []
+        de_stats = two_group_statistics(expression_data, treatment_samples, control_samples,
+                                        executor=self.gene_block_executor())
+        
+        p_adjusted = adjust_p_values(de_stats['p_value'].values, self.multiple_testing_method)
         
-        for gene_id in expression_data.index:
-            control_values = expression_data.loc[gene_id, control_samples].values
-            treatment_values = expression_data.loc[gene_id, treatment_samples].values
-            
-            # t-test 수행
-            t_stat, p_value = stats.ttest_ind(treatment_values, control_values)
-            
-            # fold change 계산
-            control_mean = np.mean(control_values)
-            treatment_mean = np.mean(treatment_values)
-            
-            if control_mean > 0:
-                fold_change = treatment_mean / control_mean
-            else:
-                fold_change = np.inf
-            
-            # 유의성 판단
-            is_significant = (p_value < self.expression_thresholds['pvalue_cutoff'] and 
-                            abs(np.log2(fold_change)) > np.log2(self.expression_thresholds['fold_change_cutoff']))
-            
-            results.append({
-                'gene_id': gene_id,
-                'fold_change': fold_change,
-                'log2_fold_change': np.log2(fold_change) if fold_change > 0 else np.nan,
-                'p_value': p_value,
-                'significant': is_significant
-            })
+        # 유의성 판단 (FDR 기준)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            is_significant = (
+                (p_adjusted < self.expression_thresholds['fdr_cutoff']) &
+                (np.abs(np.log2(de_stats['fold_change'].values)) >
+                 np.log2(self.expression_thresholds['fold_change_cutoff']))
+            )
         
-        return pd.DataFrame(results)
+        return pd.DataFrame({
+            'gene_id': de_stats.index,
+            'fold_change': de_stats['fold_change'].values,
+            'log2_fold_change': de_stats['log2_fold_change'].values,
+            'p_value': de_stats['p_value'].values,
+            'p_adjusted': p_adjusted,
+            'significant': is_significant
+        })
 
 # 사용 예시
 if __name__ == "__main__":
@@ -0,0 +1,275 @@
+"""
+Gene Set Enrichment Analysis (fgsea-style)
+DE 결과의 순위 통계량으로 모든 pathway의 running-sum enrichment score를 한 번에
+계산하고, process pool에서 순열 검정으로 p-value를 추정
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from de_engine import two_group_statistics
+from multiple_testing import benjamini_hochberg
+
+# worker process별 상태 (initializer로 한 번만 전달)
+_WORKER_STATE = {}
+
+
+class _GeneSets:
+    """순위 유전자 기준으로 정리한 gene set membership (set 순서로 정렬된 flat 배열)"""
+
+    def __init__(self, pathway_info, gene_index, min_size=1, max_size=None):
+        names = []
+        members = []
+        for pathway, genes in pathway_info.items():
+            codes = gene_index.get_indexer(pd.Index(list(dict.fromkeys(genes)), dtype=object))
+            codes = codes[codes >= 0]
+            if len(codes) < min_size or (max_size is not None and len(codes) > max_size):
+                continue
+            names.append(pathway)
+            members.append(codes)
+
+        self.names = names
+        self.sizes = np.array([len(codes) for codes in members], dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(self.sizes)]).astype(np.int64)
+        self.member_genes = np.concatenate(members) if members else np.empty(0, dtype=np.intp)
+        self.set_ids = np.repeat(np.arange(len(names), dtype=np.int64), self.sizes)
+
+    def subset(self, active):
+        """active set만 남긴 사본"""
+        subset = _GeneSets.__new__(_GeneSets)
+        keep = active[self.set_ids]
+        subset.names = [name for name, flag in zip(self.names, active) if flag]
+        subset.sizes = self.sizes[active]
+        subset.offsets = np.concatenate([[0], np.cumsum(subset.sizes)]).astype(np.int64)
+        subset.member_genes = self.member_genes[keep]
+        subset.set_ids = np.repeat(np.arange(len(subset.sizes), dtype=np.int64), subset.sizes)
+        return subset
+
+
+def enrichment_scores(gene_rank, sorted_weights, gene_sets):
+    """모든 gene set의 enrichment score를 hit 위치만으로 계산
+
+    running sum의 최댓값은 hit 직후, 최솟값은 hit 직전에서만 나오므로
+    set별로 hit 위치를 정렬한 뒤 segment 단위 cumsum / reduceat으로 구한다.
+
+    Args:
+        gene_rank: 유전자 code -> 순위(0 = 최상위) 배열
+        sorted_weights: 순위별 |score|^weight 배열
+        gene_sets: _GeneSets
+    """
+    n_genes = len(sorted_weights)
+    if len(gene_sets.sizes) == 0:
+        return np.empty(0)
+
+    # set 내부에서 순위 정렬 (set_id가 상위 key이므로 set 순서는 유지)
+    keys = np.sort(gene_sets.set_ids * n_genes + gene_rank[gene_sets.member_genes])
+    positions = keys - gene_sets.set_ids * n_genes
+    weights = sorted_weights[positions]
+
+    starts = gene_sets.offsets[:-1]
+    cumulative = np.cumsum(weights)
+    segment_base = np.concatenate([[0.0], cumulative])[starts]
+    hit_cumsum = cumulative - np.repeat(segment_base, gene_sets.sizes)
+    hit_total = np.repeat(np.add.reduceat(weights, starts), gene_sets.sizes)
+
+    rank_in_set = np.arange(len(positions)) - np.repeat(starts, gene_sets.sizes)
+    miss_fraction = (positions - rank_in_set) / np.repeat(n_genes - gene_sets.sizes, gene_sets.sizes)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        after_hit = hit_cumsum / hit_total - miss_fraction
+        before_hit = (hit_cumsum - weights) / hit_total - miss_fraction
+
+    max_deviation = np.maximum(np.maximum.reduceat(after_hit, starts), 0.0)
+    min_deviation = np.minimum(np.minimum.reduceat(before_hit, starts), 0.0)
+    return np.where(max_deviation >= -min_deviation, max_deviation, min_deviation)
+
+
+def _ranking(scores, weight):
+    """score 배열 -> (gene_rank, sorted_weights)"""
+    order = np.argsort(-scores, kind='stable')
+    gene_rank = np.empty(len(scores), dtype=np.int64)
+    gene_rank[order] = np.arange(len(scores))
+    return gene_rank, np.abs(scores[order]) ** weight
+
+
+def _init_worker(state):
+    _WORKER_STATE.clear()
+    _WORKER_STATE.update(state)
+
+
+def _permutation_batch(seed, n_permutations, active):
+    """한 batch의 순열 ES를 계산해 set별 누적값 반환"""
+    state = _WORKER_STATE
+    gene_sets = state['gene_sets'].subset(active)
+    observed = state['observed'][active]
+    rng = np.random.default_rng(seed)
+
+    counts = np.zeros((6, len(observed)))
+    for _ in range(n_permutations):
+        if state['mode'] == 'gene_set':
+            # 유전자 label 순열 = 모든 set에 대해 같은 크기의 random set
+            gene_rank = rng.permutation(len(state['sorted_weights']))
+            sorted_weights = state['sorted_weights']
+        else:
+            labels = rng.permutation(state['sample_labels'])
+            values = state['expression_values']
+            frame = pd.DataFrame(values, columns=np.arange(values.shape[1]), copy=False)
+            scores = two_group_statistics(
+                frame, np.flatnonzero(labels), np.flatnonzero(~labels)
+            )[state['statistic']].to_numpy()
+            scores = np.where(np.isfinite(scores), scores, 0.0)
+            gene_rank, sorted_weights = _ranking(scores, state['weight'])
+
+        es = enrichment_scores(gene_rank, sorted_weights, gene_sets)
+        positive = es >= 0
+        counts[0] += positive & (es >= observed)
+        counts[1] += positive
+        counts[2] += np.where(positive, es, 0.0)
+        counts[3] += ~positive & (es <= observed)
+        counts[4] += ~positive
+        counts[5] += np.where(positive, 0.0, es)
+
+    return active, counts
+
+
+class GSEAEngine:
+    """fgsea-style 순열 기반 GSEA
+
+    run()은 순위 통계량만으로 gene label을 섞고 (fgsea 방식),
+    run_sample_permutation()은 샘플 group label을 섞어 DE 통계량을 다시 계산한다.
+    순열은 batch 단위로 process pool에 분배되며, batch별 seed가 고정되어
+    worker 수와 관계없이 같은 결과를 낸다. early_stop_pvalue를 쓰면 batch 결과를
+    SeedSequence 순서대로 하나씩 반영하며 중단 여부를 판정한다.
+    """
+
+    def __init__(self, n_permutations=1000, seed=42, n_workers=1, weight=1.0,
+                 min_size=1, max_size=None, batch_size=250, early_stop_pvalue=None,
+                 min_permutations=1000):
+        self.n_permutations = n_permutations
+        self.seed = seed
+        self.n_workers = n_workers or os.cpu_count()
+        self.weight = weight
+        self.min_size = min_size
+        self.max_size = max_size
+        self.batch_size = batch_size
+        # 현재 p-value 추정치가 이 값보다 크면 (min_permutations 이후) 순열 중단
+        self.early_stop_pvalue = early_stop_pvalue
+        self.min_permutations = min_permutations
+
+    def run(self, ranked_scores, pathway_info):
+        """gene_id -> 순위 통계량 Series로 GSEA 수행 (gene-set 순열)"""
+        scores = ranked_scores[np.isfinite(ranked_scores.to_numpy(dtype=np.float64))].astype(np.float64)
+        gene_index = pd.Index(scores.index, dtype=object)
+        gene_sets = _GeneSets(pathway_info, gene_index, self.min_size, self.max_size)
+        gene_rank, sorted_weights = _ranking(scores.to_numpy(), self.weight)
+
+        return self._run(gene_sets, gene_rank, sorted_weights, {
+            'mode': 'gene_set',
+            'sorted_weights': sorted_weights
+        })
+
+    def run_sample_permutation(self, expression_data, group1_samples, group2_samples,
+                               pathway_info, statistic='t_statistic'):
+        """샘플 label 순열 GSEA (group1 vs group2 DE 통계량 순위)"""
+        samples = list(group1_samples) + list(group2_samples)
+        scores = two_group_statistics(expression_data, group1_samples, group2_samples)[statistic]
+        finite = np.isfinite(scores.to_numpy())
+        scores = scores[finite]
+
+        gene_index = pd.Index(scores.index, dtype=object)
+        gene_sets = _GeneSets(pathway_info, gene_index, self.min_size, self.max_size)
+        gene_rank, sorted_weights = _ranking(scores.to_numpy(), self.weight)
+
+        labels = np.zeros(len(samples), dtype=bool)
+        labels[:len(list(group1_samples))] = True
+
+        return self._run(gene_sets, gene_rank, sorted_weights, {
+            'mode': 'sample',
+            'expression_values': expression_data.loc[finite, samples].to_numpy(dtype=np.float64),
+            'sample_labels': labels,
+            'statistic': statistic,
+            'weight': self.weight
+        })
+
+    def _run(self, gene_sets, gene_rank, sorted_weights, state):
+        observed = enrichment_scores(gene_rank, sorted_weights, gene_sets)
+        state = dict(state, gene_sets=gene_sets, observed=observed)
+
+        n_sets = len(observed)
+        totals = np.zeros((6, n_sets))
+        n_done = np.zeros(n_sets, dtype=np.int64)
+        active = np.ones(n_sets, dtype=bool)
+
+        # batch별 seed는 worker 수와 무관하게 고정
+        n_batches = -(-self.n_permutations // self.batch_size)
+        batch_seeds = np.random.SeedSequence(self.seed).spawn(n_batches)
+        batch_sizes = [
+            min(self.batch_size, self.n_permutations - i * self.batch_size) for i in range(n_batches)
+        ]
+        round_size = max(1, self.n_workers)
+
+        pool = None
+        if self.n_workers > 1:
+            pool = ProcessPoolExecutor(self.n_workers, initializer=_init_worker, initargs=(state,))
+        else:
+            _init_worker(state)
+
+        try:
+            for round_start in range(0, n_batches, round_size):
+                if not active.any():
+                    break
+                batches = range(round_start, min(round_start + round_size, n_batches))
+                if pool is not None:
+                    futures = [
+                        pool.submit(_permutation_batch, batch_seeds[i], batch_sizes[i], active)
+                        for i in batches
+                    ]
+                    results = [future.result() for future in futures]
+                else:
+                    results = [_permutation_batch(batch_seeds[i], batch_sizes[i], active) for i in batches]
+
+                # batch 순서대로 누적 / 중단 판정: 같은 round에서 먼저 중단된 set의 결과는
+                # 버리므로 중단 시점은 seed와 batch_size로만 정해진다
+                for i, (batch_active, counts) in zip(batches, results):
+                    still_active = active[batch_active]
+                    columns = np.flatnonzero(batch_active)[still_active]
+                    totals[:, columns] += counts[:, still_active]
+                    n_done[columns] += batch_sizes[i]
+
+                    if self.early_stop_pvalue is not None:
+                        p_current = self._p_values(observed, totals)
+                        stop = (n_done >= self.min_permutations) & (p_current > self.early_stop_pvalue)
+                        active &= ~stop
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            else:
+                # 순차 실행은 현재 process의 worker 상태를 썼으므로 matrix 참조를 해제
+                _WORKER_STATE.clear()
+
+        p_values = self._p_values(observed, totals)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_positive = totals[2] / totals[1]
+            mean_negative = -totals[5] / totals[4]
+            nes = np.where(observed >= 0, observed / mean_positive, observed / mean_negative)
+
+        return pd.DataFrame({
+            'pathway': gene_sets.names,
+            'size': gene_sets.sizes,
+            'es': observed,
+            'nes': nes,
+            'p_value': p_values,
+            'p_adjusted': benjamini_hochberg(p_values),
+            'n_permutations': n_done
+        }).sort_values('p_value', ignore_index=True)
+
+    @staticmethod
+    def _p_values(observed, totals):
+        return np.where(
+            observed >= 0,
+            (totals[0] + 1) / (totals[1] + 1),
+            (totals[3] + 1) / (totals[4] + 1)
+        )
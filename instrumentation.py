@@ -0,0 +1,226 @@
+"""
+Stage Instrumentation
+pipeline / analyzer stage별 wall time, CPU time, 메모리, 입출력 shape를 기록하고
+Chrome trace (chrome://tracing, Perfetto) 형식 JSON으로 내보낸다
+"""
+
+import cProfile
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 진행 메시지 logger (기본은 비활성 - 호출 측은 lazy % formatting으로 기록)
+logger = logging.getLogger("rna_pipeline")
+
+
+def configure_console_logging(level=logging.INFO, stream=None):
+    """진행 메시지를 기존 print 출력처럼 stdout(또는 stream)에 표시"""
+    if not any(getattr(handler, '_rna_console', False) for handler in logger.handlers):
+        handler = logging.StreamHandler(stream or sys.stdout)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        handler._rna_console = True
+        logger.addHandler(handler)
+    logger.setLevel(level)
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    # Linux ru_maxrss 단위는 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def describe_shape(value):
+    """trace 기록용 shape 요약 (shape 속성, tuple, 경로, 길이)"""
+    if hasattr(value, 'shape'):
+        return list(value.shape)
+    if isinstance(value, (tuple, list)) and value and len(value) <= 8:
+        return [describe_shape(item) for item in value]
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return {'len': len(value)}
+    return None
+
+
+class _TraceLogHandler(logging.Handler):
+    """log record를 trace의 instant event로 기록"""
+
+    def __init__(self, instrumentation):
+        super().__init__()
+        self.instrumentation = instrumentation
+
+    def emit(self, record):
+        self.instrumentation.add_instant(record.getMessage(), record.created)
+
+
+class Instrumentation:
+    """stage 측정 결과 수집기
+
+    Args:
+        trace_memory: tracemalloc으로 stage별 Python heap peak 증가량 기록 (느려짐)
+        profile_stages: cProfile을 켤 stage 이름 목록 (True면 모든 stage)
+        profile_dir: 지정하면 stage별 .prof 파일 저장 (snakeviz, pstats로 열람)
+        capture_logs: rna_pipeline logger의 메시지를 instant event로 함께 기록
+    """
+
+    def __init__(self, trace_memory=False, profile_stages=None, profile_dir=None, capture_logs=True):
+        self.trace_memory = trace_memory
+        self.profile_stages = profile_stages
+        self.profile_dir = profile_dir
+        self.events = []
+        self.profiles = {}
+        self._origin = time.perf_counter()
+        self._wall_origin = time.time()
+        self._lock = threading.Lock()
+        # 중첩 stage용 [시작 시 heap, 안쪽 stage에서 관측한 peak]
+        self._memory_stack = []
+        self._log_handler = None
+        # INFO 기록을 위해 logger level을 바꾼 경우 close()에서 되돌릴 원래 level
+        self._previous_level = None
+        if capture_logs:
+            self._log_handler = _TraceLogHandler(self)
+            logger.addHandler(self._log_handler)
+            if not logger.isEnabledFor(logging.INFO):
+                self._previous_level = logger.level
+                logger.setLevel(logging.INFO)
+
+    def close(self):
+        """logger handler 해제와 logger level 복원"""
+        if self._log_handler is not None:
+            logger.removeHandler(self._log_handler)
+            self._log_handler = None
+        if self._previous_level is not None:
+            logger.setLevel(self._previous_level)
+            self._previous_level = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def _timestamp_us(self, perf_time):
+        return (perf_time - self._origin) * 1e6
+
+    def add_instant(self, message, created):
+        with self._lock:
+            self.events.append({
+                'name': message, 'cat': 'log', 'ph': 'i', 's': 't',
+                'ts': (created - self._wall_origin) * 1e6,
+                'pid': os.getpid(), 'tid': threading.get_ident()
+            })
+
+    def _should_profile(self, stage):
+        if not self.profile_stages:
+            return False
+        return self.profile_stages is True or stage in self.profile_stages
+
+    def run(self, stage, func, args, kwargs):
+        """func를 실행하면서 stage 측정값을 trace event로 기록"""
+        trace_memory = self.trace_memory
+        started_tracing = trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if trace_memory:
+            # 안쪽 stage의 reset_peak가 바깥 stage peak를 지우지 않도록 peak를 stack으로 전달
+            current, peak = tracemalloc.get_traced_memory()
+            if self._memory_stack:
+                self._memory_stack[-1][1] = max(self._memory_stack[-1][1], peak)
+            self._memory_stack.append([current, current])
+            tracemalloc.reset_peak()
+
+        profiler = cProfile.Profile() if self._should_profile(stage) else None
+        rss_before = _peak_rss_mb()
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException:
+            if trace_memory:
+                self._memory_stack.pop()
+                if started_tracing:
+                    tracemalloc.stop()
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            wall_end = time.perf_counter()
+            cpu_end = time.process_time()
+
+        event_args = {
+            'wall_s': wall_end - wall_start,
+            'cpu_s': cpu_end - cpu_start,
+            'input_shape': describe_shape(args[0]) if args else None,
+            'output_shape': describe_shape(result)
+        }
+        rss_after = _peak_rss_mb()
+        if rss_after is not None:
+            event_args['peak_rss_mb'] = rss_after
+            event_args['peak_rss_delta_mb'] = rss_after - rss_before
+        if trace_memory:
+            heap_before, inner_peak = self._memory_stack.pop()
+            peak = max(tracemalloc.get_traced_memory()[1], inner_peak)
+            event_args['tracemalloc_peak_delta_mb'] = (peak - heap_before) / 2 ** 20
+            if self._memory_stack:
+                self._memory_stack[-1][1] = max(self._memory_stack[-1][1], peak)
+            if started_tracing:
+                tracemalloc.stop()
+
+        if profiler is not None:
+            self.profiles.setdefault(stage, []).append(profiler)
+            if self.profile_dir is not None:
+                os.makedirs(self.profile_dir, exist_ok=True)
+                n_runs = len(self.profiles[stage])
+                profiler.dump_stats(os.path.join(self.profile_dir, f"{stage}.{n_runs}.prof"))
+
+        with self._lock:
+            self.events.append({
+                'name': stage, 'cat': 'stage', 'ph': 'X',
+                'ts': self._timestamp_us(wall_start), 'dur': (wall_end - wall_start) * 1e6,
+                'pid': os.getpid(), 'tid': threading.get_ident(),
+                'args': event_args
+            })
+        return result
+
+    def stage_summary(self):
+        """stage event 목록 (name + 측정값) - 시작 순"""
+        stages = [event for event in self.events if event['cat'] == 'stage']
+        return [dict(stage=event['name'], **event['args']) for event in sorted(stages, key=lambda e: e['ts'])]
+
+    def to_chrome_trace(self):
+        return {'traceEvents': list(self.events), 'displayTimeUnit': 'ms'}
+
+    def write_trace(self, path):
+        """Chrome trace JSON 저장"""
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome_trace(), f, default=str)
+        return path
+
+
+def instrumented_stage(stage):
+    """메서드를 stage로 측정하는 decorator
+
+    self.instrumentation이 None이면 (기본값) 측정 없이 바로 호출한다.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            instrumentation = self.__dict__.get('instrumentation')
+            if instrumentation is None:
+                return method(self, *args, **kwargs)
+            return instrumentation.run(stage, functools.partial(method, self), args, kwargs)
+        return wrapper
+    return decorator
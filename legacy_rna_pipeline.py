@@ -3,20 +3,76 @@
 Legacy RNA Analysis Pipeline
 """
 
+import os
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn.decomposition import PCA
-from sklearn.preprocessing import StandardScaler
-import warnings
-warnings.filterwarnings('ignore')
+from de_engine import two_group_statistics
+from batch_correction import ComBat, batch_variance_explained
+from dimensionality_reduction import SamplePCA
+from contrast_scheduler import run_contrast_pool
+from gene_blocks import GeneBlockExecutor
+from stage_cache import StageCache, input_fingerprint, stage_key
+from instrumentation import configure_console_logging, instrumented_stage, logger
+from count_matrix_io import (
+    DEFAULT_CHUNK_ROWS,
+    CountMatrixStore,
+    is_count_store,
+    load_count_matrix as load_counts,
+    open_count_store,
+)
+from nb_glm import NegativeBinomialGLM
+from normalizers import get_normalizer, matrix_fingerprint
+from multiple_testing import adjust_p_values
+from preprocessing import (
+    adaptive_filter_mask,
+    chunked_log_cpm,
+    expression_filter_mask,
+    streaming_filter_statistics,
+)
+from qc_metrics import QCEngine
+from sparse_backend import (
+    DEFAULT_SPARSITY_THRESHOLD,
+    SparseExpressionMatrix,
+    as_expression_matrix,
+    sparse_expression_filter_mask,
+    sparse_filter_statistics,
+    sparse_log_cpm,
+    sparse_two_group_statistics,
+)
 
 class LegacyRNAAnalysisPipeline:
     def __init__(self):
         self.normalization_method = "simple_cpm"
         self.min_count_threshold = 5
         self.min_samples_expressed = 2
+        # 설정하면 CPM 기준 / log-CPM 분산 하위 percentile 제거를 함께 적용 (MODERN_FILTERING_CRITERIA)
+        self.min_cpm_threshold = None
+        self.variance_percentile = None
         self.statistical_test = "t_test"
+        self.count_dtype = np.float32
+        self.n_jobs = 1
+        # 유전자별 DE 계산 (t-test, NB GLM dispersion)의 n_jobs 병렬화 방식: 'thread' 또는 'process'
+        self.gene_block_backend = "thread"
+        self.gene_lengths = None
+        self.multiple_testing_method = "BH_FDR"
+        self.fdr_cutoff = 0.05
+        self.sparse_threshold = DEFAULT_SPARSITY_THRESHOLD
+        self.pca_method = "auto"
+        self.pca_n_components = 2
+        # batch label (샘플 이름 index Series 또는 샘플 순서 목록)이 있으면 PCA / DE 전에 ComBat 보정
+        self.batches = None
+        self.batch_covariates = None
+        self.batch_correction_chunk_rows = None
+        self._normalization_factor_cache = {}
+        self._pca_cache = {}
+        # mitochondrial / ribosomal 유전자 판별용 AnnotationTable (없으면 gene_id를 symbol로 간주)
+        self.annotation_table = None
+        self._qc_engine = None
+        self._qc_engine_key = None
+        # StageCache가 설정되면 run_stages가 stage 결과를 checkpoint로 저장 / 재사용
+        self.stage_cache = None
+        # Instrumentation이 설정되면 stage별 시간 / 메모리 / shape를 trace로 기록
+        self.instrumentation = None
         
         self.housekeeping_genes = [
             "ENSG00000075624",
@@ -26,154 +82,493 @@ class LegacyRNAAnalysisPipeline:
         
         self.pathway_database_version = "KEGG_2018"
     
+    @instrumented_stage("load")
     def load_count_matrix(self, file_path):
         """Count matrix 로딩"""
-        print("Loading count matrix...")
+        logger.info("Loading count matrix...")
         
-        with open(file_path, 'r') as f:
-            lines = f.readlines()
+        return load_counts(file_path, dtype=self.count_dtype)
+    
+    @instrumented_stage("run_stages")
+    def run_stages(self, source, stages=("normalized", "qc", "pca")):
+        """load -> filter -> normalize -> QC / PCA 실행
+        
+        stage_cache가 있으면 각 stage key(입력 hash + 상위 stage key + stage 파라미터)로
+        checkpoint를 찾아, 요청한 stage마다 가장 깊은 유효 checkpoint부터 다시 계산한다.
+        
+        Args:
+            source: count matrix DataFrame / SparseExpressionMatrix 또는 count 파일 / store 경로
+            stages: 반환할 stage ("counts", "filtered", "normalized", "corrected", "qc", "pca")
+                (source가 count store이면 "counts"는 CountMatrixStore이고, filter는 통과한 행만 읽는다)
+        
+        Returns:
+            {stage: 결과} (pca는 (pca_df, explained_variance))
+        """
+        plan = self._stage_plan(source)
+        results = {}
+        
+        def resolve(stage):
+            if stage in results:
+                return results[stage]
+            key, parents, compute, cacheable = plan[stage]
+            cache = self.stage_cache if cacheable else None
+            value = cache.get(key) if cache is not None else None
+            if value is None:
+                value = compute(*[resolve(parent) for parent in parents])
+                if cache is not None:
+                    cache.put(key, stage, value)
+            else:
+                logger.info("Loaded %s stage from cache", stage)
+            results[stage] = value
+            return value
+        
+        for stage in stages:
+            resolve(stage)
+        return {stage: results[stage] for stage in stages}
+    
+    def _stage_plan(self, source):
+        """stage -> (cache key, 상위 stage, 계산 함수, cache 여부)"""
+        is_path = isinstance(source, str)
+        input_key = input_fingerprint(source) if self.stage_cache is not None else None
         
-        header = lines[0].strip().split('\t')
-        data_dict = {col: [] for col in header[1:]}
-        gene_ids = []
+        gene_lengths_key = None
+        if self.gene_lengths is not None:
+            gene_lengths_key = matrix_fingerprint(self.gene_lengths.to_numpy(), self.gene_lengths.index)
+        batch_key = None
+        if self.batches is not None:
+            batch_key = repr((
+                pd.Series(self.batches).to_dict() if isinstance(self.batches, pd.Series) else list(self.batches),
+                None if self.batch_covariates is None else self.batch_covariates.to_dict()
+            ))
+        annotation_key = None
+        if self.annotation_table is not None:
+            annotation_key = matrix_fingerprint(
+                pd.util.hash_pandas_object(self.annotation_table.table, index=True).to_numpy()
+            )
         
-        for line in lines[1:]:
-            parts = line.strip().split('\t')
-            gene_ids.append(parts[0])
-            for i, value in enumerate(parts[1:]):
-                data_dict[header[i+1]].append(float(value))
+        stage_params = {
+            "counts": ([], {"count_dtype": np.dtype(self.count_dtype).str},
+                       lambda: self._open_source(source) if is_path else source,
+                       is_path and not is_count_store(source)),
+            "filtered": (["counts"], {
+                "min_count_threshold": self.min_count_threshold,
+                "min_samples_expressed": self.min_samples_expressed,
+                "min_cpm_threshold": self.min_cpm_threshold,
+                "variance_percentile": self.variance_percentile,
+                "sparse_threshold": self.sparse_threshold
+            }, self.filter_low_expression_genes, True),
+            "normalized": (["filtered"], {
+                "normalization_method": self.normalization_method,
+                "gene_lengths": gene_lengths_key
+            }, self.normalize_expression, True),
+            "corrected": (["normalized"], {
+                "batches": batch_key
+            }, self.correct_batch_effects, batch_key is not None),
+            "qc": (["normalized", "filtered"], {
+                "housekeeping_genes": tuple(self.housekeeping_genes),
+                "annotation_table": annotation_key
+            }, self.quality_control_analysis, True),
+            "pca": (["corrected"], {
+                "pca_method": self.pca_method,
+                "pca_n_components": self.pca_n_components
+            }, self.perform_pca_analysis, True)
+        }
         
-        df = pd.DataFrame(data_dict, index=gene_ids)
-        return df
+        plan = {}
+        for stage, (parents, params, compute, cacheable) in stage_params.items():
+            parent_keys = tuple(plan[parent][0] for parent in parents) or (input_key,)
+            plan[stage] = (stage_key(stage, parent_keys, params), parents, compute, cacheable)
+        return plan
     
+    def _open_source(self, path):
+        """count store는 memmap store 그대로 (필요한 행만 나중에 select), TSV는 전체 로드"""
+        if is_count_store(path):
+            return open_count_store(path)
+        return self.load_count_matrix(path)
+    
+    @instrumented_stage("filter")
     def filter_low_expression_genes(self, count_matrix):
         """유전자 필터링"""
-        print(f"Filtering genes with criteria: min_count={self.min_count_threshold}")
+        logger.info("Filtering genes with criteria: min_count=%s", self.min_count_threshold)
+        
+        if isinstance(count_matrix, CountMatrixStore):
+            return self._filter_count_store(count_matrix)
         
-        expressed_samples = (count_matrix >= self.min_count_threshold).sum(axis=1)
-        filtered_genes = expressed_samples >= self.min_samples_expressed
+        # 0 비율이 sparse_threshold를 넘으면 이후 단계는 sparse backend로 진행
+        count_matrix = as_expression_matrix(count_matrix, self.sparse_threshold)
+        is_sparse = isinstance(count_matrix, SparseExpressionMatrix)
+        if self.min_cpm_threshold is not None or self.variance_percentile:
+            # CPM / 분산 기준은 유전자별 누적 통계 한 번 계산으로 함께 평가
+            if is_sparse:
+                statistics = sparse_filter_statistics(count_matrix, self.min_count_threshold, self.min_cpm_threshold)
+            else:
+                statistics = streaming_filter_statistics(
+                    count_matrix.to_numpy(), self.min_count_threshold, self.min_cpm_threshold
+                )
+            filtered_genes = adaptive_filter_mask(statistics, self.min_samples_expressed, self.variance_percentile)
+        elif is_sparse:
+            filtered_genes = sparse_expression_filter_mask(
+                count_matrix, self.min_count_threshold, self.min_samples_expressed
+            )
+        else:
+            filtered_genes = expression_filter_mask(
+                count_matrix.to_numpy(), self.min_count_threshold, self.min_samples_expressed
+            )
+        filtered_matrix = count_matrix.filter_rows(filtered_genes) if is_sparse else count_matrix[filtered_genes]
         
-        filtered_matrix = count_matrix[filtered_genes]
-        print(f"Retained {len(filtered_matrix)} genes after filtering")
+        logger.info("Retained %d genes after filtering", len(filtered_matrix))
         
         return filtered_matrix
     
+    def _filter_count_store(self, store):
+        """memmap store: 필터 기준은 블록 단위로 평가하고 통과한 유전자 행만 select로 읽음"""
+        if self.min_cpm_threshold is not None or self.variance_percentile:
+            statistics = streaming_filter_statistics(store.values, self.min_count_threshold, self.min_cpm_threshold)
+            filtered_genes = adaptive_filter_mask(statistics, self.min_samples_expressed, self.variance_percentile)
+        else:
+            filtered_genes = np.concatenate([
+                expression_filter_mask(block, self.min_count_threshold, self.min_samples_expressed)
+                for _, block in store.iter_blocks()
+            ] or [np.zeros(0, dtype=bool)])
+        
+        filtered_matrix = store.select(genes=filtered_genes)
+        logger.info("Retained %d genes after filtering", len(filtered_matrix))
+        
+        # sparse 여부는 읽어 온 (필터 통과) 유전자 기준으로 판단
+        return as_expression_matrix(filtered_matrix, self.sparse_threshold)
+    
+    def apply_filtering_criteria(self, criteria):
+        """MODERN_FILTERING_CRITERIA 형식 dict로 필터 설정 변경"""
+        self.min_count_threshold = criteria.get("min_count_per_sample", self.min_count_threshold)
+        self.min_samples_expressed = criteria.get("min_samples_expressed", self.min_samples_expressed)
+        self.min_cpm_threshold = criteria.get("min_cpm_threshold", self.min_cpm_threshold)
+        if "remove_low_variance" in criteria:
+            self.variance_percentile = criteria.get("variance_percentile", 10) if criteria["remove_low_variance"] else None
+        return self
+    
+    @instrumented_stage("normalize")
     def normalize_expression(self, count_matrix):
         """발현 정규화"""
-        print(f"Normalizing using method: {self.normalization_method}")
+        logger.info("Normalizing using method: %s", self.normalization_method)
         
-        if self.normalization_method == "simple_cpm":
-            library_sizes = count_matrix.sum(axis=0)
-            cpm_matrix = count_matrix.div(library_sizes, axis=1) * 1e6
-            
-            log_cpm = np.log2(cpm_matrix + 1)
-            
-            return log_cpm
+        normalizer = get_normalizer(self.normalization_method)
+        
+        gene_lengths = None
+        if normalizer.requires_gene_lengths:
+            if self.gene_lengths is None:
+                raise ValueError(f"{normalizer.name} normalization requires pipeline.gene_lengths")
+            gene_lengths = self.gene_lengths.reindex(count_matrix.index).to_numpy()
+            if np.isnan(gene_lengths).any():
+                raise ValueError("gene_lengths is missing entries for some genes")
+        
+        if isinstance(count_matrix, SparseExpressionMatrix):
+            # 모든 normalizer는 log2(values / factors * scale + 1)이므로 0은 0으로 남아 sparse 유지
+            factors = self.normalization_factors(count_matrix, normalizer, gene_lengths=gene_lengths)
+            values = SparseExpressionMatrix(
+                normalizer.sparse_values(count_matrix.matrix, gene_lengths),
+                count_matrix.index, count_matrix.columns
+            )
+            return sparse_log_cpm(values, sizes=factors, scale=normalizer.scale)
+        
+        values = count_matrix.to_numpy()
+        factors = self.normalization_factors(count_matrix, normalizer, values, gene_lengths)
+        
+        return pd.DataFrame(
+            normalizer.transform(values, factors, gene_lengths),
+            index=count_matrix.index,
+            columns=count_matrix.columns,
+            copy=False
+        )
     
-    def quality_control_analysis(self, normalized_matrix):
-        """품질 관리 분석"""
-        print("Performing quality control analysis...")
+    def normalization_factors(self, count_matrix, normalizer=None, values=None, gene_lengths=None):
+        """샘플별 normalization factor (같은 matrix / method이면 cache 재사용)"""
+        normalizer = normalizer or get_normalizer(self.normalization_method)
+        is_sparse = isinstance(count_matrix, SparseExpressionMatrix)
+        if is_sparse:
+            key = (normalizer.name,) + count_matrix.fingerprint()
+        else:
+            values = count_matrix.to_numpy() if values is None else values
+            key = (normalizer.name, matrix_fingerprint(values, count_matrix.index, count_matrix.columns))
+        if normalizer.requires_gene_lengths:
+            key += (matrix_fingerprint(gene_lengths),)
+        if key not in self._normalization_factor_cache:
+            self._normalization_factor_cache[key] = (
+                normalizer.compute_sparse_factors(count_matrix.matrix, gene_lengths) if is_sparse
+                else normalizer.compute_factors(values, gene_lengths)
+            )
+        return self._normalization_factor_cache[key]
+    
+    @instrumented_stage("preprocess_out_of_core")
+    def preprocess_out_of_core(self, input_path, output_path, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """RAM보다 큰 코호트용 블록 단위 filter -> normalize 전처리"""
+        logger.info("Preprocessing %s out-of-core in blocks of %d genes", input_path, chunk_rows)
         
-        qc_metrics = {}
+        if self.normalization_method != "simple_cpm":
+            raise ValueError(f"Unsupported normalization method for out-of-core mode: {self.normalization_method}")
+        if self.min_cpm_threshold is not None or self.variance_percentile:
+            raise ValueError("CPM / variance filters are not supported in out-of-core mode")
         
-        for sample in normalized_matrix.columns:
-            sample_data = normalized_matrix[sample]
-            
-            qc_metrics[sample] = {
-                'total_detected_genes': (sample_data > 0).sum(),
-                'mean_expression': sample_data.mean(),
-                'median_expression': sample_data.median(),
-                'housekeeping_expression': sample_data[
-                    sample_data.index.isin(self.housekeeping_genes)
-                ].mean() if any(sample_data.index.isin(self.housekeeping_genes)) else np.nan
-            }
-        
-        qc_df = pd.DataFrame(qc_metrics).T
-        return qc_df
+        output_path, n_retained = chunked_log_cpm(
+            input_path, output_path,
+            self.min_count_threshold, self.min_samples_expressed, chunk_rows
+        )
+        logger.info("Retained %d genes after filtering", n_retained)
+        
+        return output_path
     
-    def perform_pca_analysis(self, normalized_matrix):
-        """PCA 분석"""
-        print("Performing PCA analysis...")
+    @instrumented_stage("batch_correction")
+    def correct_batch_effects(self, normalized_matrix):
+        """ComBat batch 보정 (batches가 없으면 입력을 그대로 반환)
         
-        scaler = StandardScaler()
-        scaled_data = scaler.fit_transform(normalized_matrix.T)
+        batch_covariates(샘플 x 조건 DataFrame)에 있는 생물학적 효과는 보존하며,
+        batch_correction_chunk_rows를 주면 유전자 블록 단위로 처리한다.
+        """
+        if self.batches is None:
+            return normalized_matrix
         
-        pca = PCA(n_components=2)
-        pca_result = pca.fit_transform(scaled_data)
+        logger.info("Correcting batch effects (ComBat)")
         
-        pca_df = pd.DataFrame(
-            pca_result,
-            columns=['PC1', 'PC2'],
-            index=normalized_matrix.columns
+        return ComBat(chunk_rows=self.batch_correction_chunk_rows).fit_transform(
+            normalized_matrix, self.batches, self.batch_covariates
         )
+    
+    def batch_effect_report(self, normalized_matrix, corrected_matrix=None):
+        """보정 전 / 후 PCA에서 batch가 설명하는 분산 비율
         
-        explained_variance = pca.explained_variance_ratio_
+        Returns:
+            index ("before", "after"), 컬럼 batch_variance_fraction (PC 설명 분산 x batch R^2 합)과
+            PC별 batch R^2인 DataFrame
+        """
+        if self.batches is None:
+            raise ValueError("batch_effect_report requires pipeline.batches")
+        if corrected_matrix is None:
+            corrected_matrix = self.correct_batch_effects(normalized_matrix)
         
-        return pca_df, explained_variance
+        rows = {}
+        for label, matrix in (("before", normalized_matrix), ("after", corrected_matrix)):
+            pca = self.fit_pca(matrix)
+            per_pc, fraction = batch_variance_explained(pca.to_frame(), pca.explained_variance_ratio_, self.batches)
+            rows[label] = {"batch_variance_fraction": fraction,
+                           **{f"{pc}_batch_r2": r2 for pc, r2 in per_pc["batch_r2"].items()}}
+            logger.info("Batch-explained PCA variance %s correction: %.1f%%", label, 100 * fraction)
+        
+        return pd.DataFrame.from_dict(rows, orient="index")
     
-    def differential_expression_legacy(self, normalized_matrix, group1_samples, group2_samples):
-        """차등 발현 분석"""
-        print(f"Performing differential expression using {self.statistical_test}")
+    @instrumented_stage("qc")
+    def quality_control_analysis(self, normalized_matrix, count_matrix=None):
+        """품질 관리 분석
         
-        results = []
+        count_matrix(raw count)가 주어지면 library size, mitochondrial / ribosomal %,
+        complexity는 raw count 기준으로 계산한다.
+        """
+        logger.info("Performing quality control analysis...")
         
-        for gene in normalized_matrix.index:
-            group1_values = normalized_matrix.loc[gene, group1_samples].values
-            group2_values = normalized_matrix.loc[gene, group2_samples].values
-            
-            from scipy.stats import ttest_ind
-            t_stat, p_value = ttest_ind(group1_values, group2_values)
-            
-            mean1 = np.mean(group1_values)
-            mean2 = np.mean(group2_values)
-            
-            if mean2 > 0:
-                fold_change = mean1 / mean2
+        return self.qc_engine.compute(normalized_matrix, count_matrix)
+    
+    @property
+    def qc_engine(self):
+        """housekeeping 목록 / annotation이 바뀔 때만 다시 만드는 QC engine (gene class mask 재사용)"""
+        key = (tuple(self.housekeeping_genes), id(self.annotation_table))
+        if self._qc_engine is None or self._qc_engine_key != key:
+            self._qc_engine = QCEngine(self.housekeeping_genes, self.annotation_table)
+            self._qc_engine_key = key
+        return self._qc_engine
+    
+    @instrumented_stage("pca")
+    def perform_pca_analysis(self, normalized_matrix):
+        """PCA 분석 (normalized_matrix: DataFrame 또는 preprocess_out_of_core 출력 store 경로)"""
+        logger.info("Performing PCA analysis...")
+        
+        pca = self.fit_pca(normalized_matrix)
+        logger.info("PCA (%s): %d components", pca.method_, pca.n_components_)
+        
+        return pca.to_frame(), pca.explained_variance_ratio_
+    
+    def fit_pca(self, normalized_matrix):
+        """샘플 PCA fit (같은 matrix / 설정이면 plot 간에 cache 재사용)"""
+        if isinstance(normalized_matrix, str):
+            stat = os.stat(normalized_matrix)
+            source = (os.path.abspath(normalized_matrix), stat.st_mtime_ns, stat.st_size)
+        elif isinstance(normalized_matrix, SparseExpressionMatrix):
+            source = normalized_matrix.fingerprint()
+        else:
+            source = matrix_fingerprint(
+                normalized_matrix.to_numpy(), normalized_matrix.index, normalized_matrix.columns
+            )
+        
+        key = (source, self.pca_method, self.pca_n_components)
+        if key not in self._pca_cache:
+            self._pca_cache[key] = SamplePCA(
+                n_components=self.pca_n_components, method=self.pca_method
+            ).fit(normalized_matrix)
+        return self._pca_cache[key]
+    
+    @instrumented_stage("differential_expression")
+    def differential_expression_legacy(self, normalized_matrix, group1_samples, group2_samples, count_matrix=None):
+        """차등 발현 분석
+        
+        statistical_test가 "nb_glm"이면 normalized_matrix에 남은 유전자의 raw count
+        (count_matrix)로 NB GLM Wald 검정을 수행한다.
+        """
+        logger.info("Performing differential expression using %s", self.statistical_test)
+        
+        de_df = self.contrast_statistics(normalized_matrix, group1_samples, group2_samples, count_matrix)
+        de_df['p_adjusted'] = adjust_p_values(de_df['p_value'].values, self.multiple_testing_method)
+        de_df['significant'] = de_df['p_adjusted'] < self.fdr_cutoff
+        
+        return de_df
+    
+    def contrast_statistics(self, normalized_matrix, group1_samples, group2_samples, count_matrix=None):
+        """group1 vs group2 DE 통계량 (다중 검정 보정 전)"""
+        if self.statistical_test == "nb_glm":
+            de_df = self._differential_expression_nb_glm(
+                count_matrix, normalized_matrix.index, group1_samples, group2_samples
+            )
+        else:
+            if isinstance(normalized_matrix, SparseExpressionMatrix):
+                de_stats = sparse_two_group_statistics(normalized_matrix, group1_samples, group2_samples)
             else:
-                fold_change = np.inf
+                de_stats = two_group_statistics(normalized_matrix, group1_samples, group2_samples,
+                                                executor=self.gene_block_executor())
             
-            results.append({
-                'gene_id': gene,
-                'group1_mean': mean1,
-                'group2_mean': mean2,
-                'fold_change': fold_change,
-                'log2_fold_change': np.log2(fold_change) if fold_change > 0 else np.nan,
-                'p_value': p_value,
-                't_statistic': t_stat
+            de_df = pd.DataFrame({
+                'gene_id': de_stats.index,
+                'group1_mean': de_stats['test_mean'].values,
+                'group2_mean': de_stats['reference_mean'].values,
+                'fold_change': de_stats['fold_change'].values,
+                'log2_fold_change': de_stats['log2_fold_change'].values,
+                'p_value': de_stats['p_value'].values,
+                't_statistic': de_stats['t_statistic'].values
             })
         
-        de_df = pd.DataFrame(results)
+        return de_df
+    
+    @instrumented_stage("run_contrasts")
+    def run_contrasts(self, count_matrix, contrasts, n_workers=None):
+        """여러 contrast DE를 한 번의 filter / normalize 후 process pool로 수행
+        
+        Args:
+            count_matrix: raw count matrix
+            contrasts: {name: (group1_samples, group2_samples)} 또는 (name, group1, group2) 목록
+            n_workers: worker process 수 (None이면 CPU 수, 1이면 현재 process에서 순차 실행)
         
-        de_df['p_adjusted'] = de_df['p_value'] * len(de_df)
-        de_df['p_adjusted'] = de_df['p_adjusted'].clip(upper=1.0)
+        Returns:
+            contrast 컬럼이 붙은 long-format DE table (p_adjusted는 contrast별 보정)
+        """
+        filtered_matrix = self.filter_low_expression_genes(count_matrix)
+        normalized_matrix = self.normalize_expression(filtered_matrix)
+        
+        logger.info("Running %d contrasts using %s", len(contrasts), self.statistical_test)
+        
+        results = run_contrast_pool(
+            self, normalized_matrix, contrasts,
+            count_matrix=filtered_matrix if self.statistical_test == "nb_glm" else None,
+            n_workers=n_workers
+        )
+        
+        de_df = pd.concat(
+            [table.assign(contrast=name) for name, table in results], ignore_index=True
+        )
+        de_df = de_df[['contrast'] + [column for column in de_df.columns if column != 'contrast']]
+        de_df['p_adjusted'] = adjust_p_values(
+            de_df['p_value'].values, self.multiple_testing_method, groups=de_df['contrast'].values
+        )
+        de_df['significant'] = de_df['p_adjusted'] < self.fdr_cutoff
         
         return de_df
     
-    def generate_legacy_plots(self, pca_df, explained_variance, output_dir="./"):
-        """플롯 생성"""
-        print("Generating plots...")
+    def gene_block_executor(self):
+        """n_jobs / gene_block_backend 설정의 유전자 블록 실행기"""
+        return GeneBlockExecutor(n_workers=self.n_jobs, backend=self.gene_block_backend)
+    
+    def contrast_settings(self):
+        """contrast worker에 넘길 설정 (cache 제외, worker 내부 병렬화는 끔)"""
+        settings = {
+            name: value for name, value in self.__dict__.items() if not name.startswith('_')
+        }
+        settings.update(n_jobs=1, stage_cache=None, instrumentation=None)
+        return settings
+    
+    def _differential_expression_nb_glm(self, count_matrix, gene_ids, group1_samples, group2_samples):
+        """group1 vs group2 NB GLM (design: intercept + group1 indicator)"""
+        if count_matrix is None:
+            raise ValueError("statistical_test='nb_glm' requires the raw count_matrix")
+        
+        samples = list(group1_samples) + list(group2_samples)
+        size_factors = None
+        if isinstance(count_matrix, SparseExpressionMatrix):
+            # IRLS는 유전자 chunk 단위 dense 연산이므로 선택한 유전자 / 샘플만 dense로 변환
+            selected = count_matrix.subset(gene_ids, samples)
+            # sparse count는 거의 모든 유전자에 0이 있어 median-of-ratios가 정의되지 않으면 poscounts 사용
+            size_factors = get_normalizer("DESeq2").compute_sparse_factors(selected.matrix)
+            counts = selected.to_frame()
+        else:
+            counts = count_matrix.loc[gene_ids, samples]
+        design = pd.DataFrame({
+            'intercept': 1.0,
+            'group1': [1.0] * len(group1_samples) + [0.0] * len(group2_samples)
+        }, index=samples)
+        
+        model = NegativeBinomialGLM(n_jobs=self.n_jobs, backend=self.gene_block_backend).fit(
+            counts, design, size_factors=size_factors
+        )
+        wald = model.wald_test('group1')
+        
+        normalized_counts = counts.to_numpy(dtype=np.float64) / model.size_factors_
+        n_group1 = len(group1_samples)
+        
+        return pd.DataFrame({
+            'gene_id': wald.index,
+            'group1_mean': normalized_counts[:, :n_group1].mean(axis=1),
+            'group2_mean': normalized_counts[:, n_group1:].mean(axis=1),
+            'fold_change': np.exp2(wald['log2_fold_change'].values),
+            'log2_fold_change': wald['log2_fold_change'].values,
+            'lfc_se': wald['lfc_se'].values,
+            'p_value': wald['p_value'].values,
+            'wald_statistic': wald['wald_statistic'].values,
+            'dispersion': wald['dispersion'].values
+        })
+    
+    @instrumented_stage("plots")
+    def generate_legacy_plots(self, pca_df, explained_variance, output_dir="./", de_results=None,
+                              expression_matrix=None, n_workers=None):
+        """플롯 생성
+        
+        PCA plot과 함께 de_results가 있으면 volcano / MA plot을, expression_matrix가 있으면
+        샘플별 expression boxplot을 저장한다. n_workers(기본 n_jobs) > 1이면 worker process에서
+        병렬로 렌더링한다.
         
-        plt.figure(figsize=(8, 6))
-        plt.scatter(pca_df['PC1'], pca_df['PC2'], alpha=0.7)
+        Returns:
+            저장한 plot 경로 목록
+        """
+        # matplotlib은 plot stage에서만 import
+        from plotting import box_statistics, ma_plot_data, pca_plot_data, render_plots, volcano_plot_data
         
-        for i, sample in enumerate(pca_df.index):
-            plt.annotate(sample, (pca_df.iloc[i, 0], pca_df.iloc[i, 1]))
+        logger.info("Generating plots...")
         
-        plt.xlabel(f'PC1 ({explained_variance[0]:.1%} variance)')
-        plt.ylabel(f'PC2 ({explained_variance[1]:.1%} variance)')
-        plt.title('PCA Analysis')
-        plt.grid(True, alpha=0.3)
+        jobs = [dict(kind='pca', path=f"{output_dir}/pca_plot.png",
+                     data=pca_plot_data(pca_df, explained_variance))]
+        if de_results is not None:
+            jobs.append(dict(kind='volcano', path=f"{output_dir}/volcano_plot.png",
+                             data=volcano_plot_data(de_results, self.fdr_cutoff)))
+            jobs.append(dict(kind='ma', path=f"{output_dir}/ma_plot.png",
+                             data=ma_plot_data(de_results, log_means=self.statistical_test != "nb_glm")))
+        if expression_matrix is not None:
+            jobs.append(dict(kind='boxplot', path=f"{output_dir}/expression_boxplot.png",
+                             data={'stats': box_statistics(expression_matrix)}))
         
-        plt.tight_layout()
-        plt.savefig(f"{output_dir}/pca_plot.png", dpi=150)
-        plt.close()
+        paths = render_plots(jobs, n_workers=n_workers or self.n_jobs)
         
-        print(f"PCA plot saved to {output_dir}/pca_plot.png")
+        for path in paths:
+            logger.info("Plot saved to %s", path)
+        return paths
 
 # 사용 예시
-def run_legacy_pipeline():
-    """파이프라인 실행"""
+def run_legacy_pipeline(cache_dir=None):
+    """파이프라인 실행 (cache_dir를 주면 stage checkpoint를 저장 / 재사용)"""
     pipeline = LegacyRNAAnalysisPipeline()
+    if cache_dir is not None:
+        pipeline.stage_cache = StageCache(cache_dir)
     
     np.random.seed(42)
     sample_count_matrix = pd.DataFrame(
@@ -184,10 +579,10 @@ def run_legacy_pipeline():
     
     print("=== RNA Analysis Pipeline ===")
     
-    filtered_matrix = pipeline.filter_low_expression_genes(sample_count_matrix)
-    normalized_matrix = pipeline.normalize_expression(filtered_matrix)
-    qc_results = pipeline.quality_control_analysis(normalized_matrix)
-    pca_results, variance = pipeline.perform_pca_analysis(normalized_matrix)
+    stages = pipeline.run_stages(sample_count_matrix, stages=("corrected", "qc", "pca"))
+    normalized_matrix = stages["corrected"]
+    qc_results = stages["qc"]
+    pca_results, variance = stages["pca"]
     
     print("\nQuality Control Results:")
     print(qc_results.head())
@@ -198,13 +593,15 @@ def run_legacy_pipeline():
     group2 = ['Sample_5', 'Sample_6', 'Sample_7', 'Sample_8']
     
     de_results = pipeline.differential_expression_legacy(normalized_matrix, group1, group2)
-    significant_genes = de_results[de_results['p_adjusted'] < 0.05]
+    significant_genes = de_results[de_results['significant']]
     
     print(f"\nFound {len(significant_genes)} significantly differentially expressed genes")
     print("Top 5 significant genes:")
     print(significant_genes.nsmallest(5, 'p_adjusted')[['gene_id', 'log2_fold_change', 'p_adjusted']])
     
-    pipeline.generate_legacy_plots(pca_results, variance)
+    pipeline.generate_legacy_plots(pca_results, variance, de_results=de_results,
+                                   expression_matrix=normalized_matrix)
 
 if __name__ == "__main__":
+    configure_console_logging()
     run_legacy_pipeline()
@@ -0,0 +1,79 @@
+"""
+Multiple Testing Correction
+BH-FDR, Storey q-value, Bonferroni 보정을 정렬 + 누적 최솟값 한 번으로 계산
+(MODERN_STATISTICAL_METHODS["multiple_testing_correction"] 참조)
+"""
+
+import numpy as np
+import pandas as pd
+
+CORRECTION_METHODS = ('BH_FDR', 'qvalue', 'bonferroni')
+
+
+def adjust_p_values(p_values, method='BH_FDR', groups=None, lambda_=0.5):
+    """p-value 다중 검정 보정
+
+    groups가 주어지면 (예: contrast 이름) 그룹별로 독립 보정하되, 전체를
+    한 번의 lexsort와 그룹별 누적 최솟값으로 처리한다. NaN은 검정 수에서
+    제외하고 NaN으로 남긴다.
+
+    Args:
+        p_values: p-value 배열
+        method: 'BH_FDR', 'qvalue' (Storey, pi0는 lambda_ 기준, 추정치가 0이면 1), 'bonferroni'
+        groups: 그룹 label 배열 (없으면 전체를 한 그룹으로 취급)
+    """
+    if method not in CORRECTION_METHODS:
+        raise ValueError(f"Unknown correction method: {method} (available: {', '.join(CORRECTION_METHODS)})")
+
+    p = np.asarray(p_values, dtype=np.float64).ravel()
+    valid = ~np.isnan(p)
+    if groups is None:
+        codes = np.zeros(len(p), dtype=np.intp)
+        n_groups = 1
+    else:
+        codes, uniques = pd.factorize(np.asarray(groups).ravel())
+        n_groups = len(uniques)
+
+    n_tests = np.bincount(codes[valid], minlength=n_groups)
+    adjusted = np.full(len(p), np.nan)
+
+    if method == 'bonferroni':
+        adjusted[valid] = np.minimum(p[valid] * n_tests[codes[valid]], 1.0)
+        return adjusted
+
+    # 그룹 내 p-value 오름차순 (NaN은 그룹 끝)
+    order = np.lexsort((p, codes))
+    sorted_codes = codes[order]
+    sorted_p = p[order]
+    group_starts = np.searchsorted(sorted_codes, np.arange(n_groups))
+    ranks = np.arange(1, len(p) + 1) - group_starts[sorted_codes]
+
+    scaled = np.minimum(sorted_p * n_tests[sorted_codes] / ranks, 1.0)
+    # 뒤에서부터 그룹별 누적 최솟값
+    scaled = pd.Series(scaled[::-1]).groupby(sorted_codes[::-1], sort=False).cummin().to_numpy()[::-1]
+
+    if method == 'qvalue':
+        in_null = np.bincount(codes[valid], weights=(p[valid] > lambda_), minlength=n_groups)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pi0 = np.clip(in_null / (n_tests * (1.0 - lambda_)), 0.0, 1.0)
+        # lambda_보다 큰 p-value가 없으면 pi0 추정이 0이 되어 모든 q-value가 0이 되므로 BH (pi0=1) 사용
+        pi0[in_null == 0] = 1.0
+        scaled = scaled * pi0[sorted_codes]
+
+    adjusted[order] = scaled
+    adjusted[~valid] = np.nan
+    return adjusted
+
+
+def benjamini_hochberg(p_values, axis=-1):
+    """Benjamini-Hochberg FDR 보정
+
+    axis 방향의 각 1차원 slice를 독립된 검정 그룹으로 보고 한 번에 보정한다.
+    """
+    p = np.moveaxis(np.asarray(p_values, dtype=np.float64), axis, -1)
+    if p.size == 0:
+        return np.moveaxis(p.copy(), -1, axis)
+
+    row_codes = np.repeat(np.arange(p.size // p.shape[-1]), p.shape[-1])
+    adjusted = adjust_p_values(p.reshape(-1), 'BH_FDR', groups=row_codes).reshape(p.shape)
+    return np.moveaxis(adjusted, -1, axis)
@@ -0,0 +1,266 @@
+"""
+Normalizer Registry
+simple CPM, TMM, DESeq2 median-of-ratios, TPM 정규화를 whole-matrix 커널로 제공
+(MODERN_NORMALIZATION_METHODS 참조)
+"""
+
+import hashlib
+
+import numpy as np
+from scipy import sparse
+
+from preprocessing import fused_log_cpm, library_sizes
+
+NORMALIZERS = {}
+
+
+def register_normalizer(cls):
+    """normalization_method 이름으로 normalizer 등록"""
+    NORMALIZERS[cls.name] = cls()
+    return cls
+
+
+def get_normalizer(name):
+    """등록된 normalizer 조회"""
+    try:
+        return NORMALIZERS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown normalization method: {name} (available: {', '.join(NORMALIZERS)})"
+        ) from None
+
+
+def matrix_fingerprint(values, *labels):
+    """normalization factor cache key용 matrix 내용 hash"""
+    digest = hashlib.blake2b(digest_size=16)
+    values = np.ascontiguousarray(values)
+    digest.update(str((values.shape, values.dtype.str)).encode())
+    digest.update(values.view(np.uint8).ravel())
+    for label in labels:
+        digest.update(repr(list(label)).encode())
+    return digest.hexdigest()
+
+
+def median_of_ratios_size_factors(counts):
+    """DESeq2 median-of-ratios size factor
+
+    geometric mean은 log 공간에서 한 번에 계산하며, 0을 포함한 유전자는 제외한다.
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    with np.errstate(divide='ignore'):
+        log_counts = np.log(counts)
+    log_geo_means = log_counts.mean(axis=1)
+    usable = np.isfinite(log_geo_means)
+    if not usable.any():
+        raise ValueError("Every gene contains a zero count; median-of-ratios size factors are undefined")
+    return np.exp(np.median(log_counts[usable] - log_geo_means[usable, None], axis=0))
+
+
+def poscounts_size_factors(counts):
+    """DESeq2 sfType='poscounts' size factor (모든 유전자에 0이 있는 sparse count용)
+
+    유전자별 geometric mean은 양수 count의 log 합을 전체 샘플 수로 나눠 구하고,
+    샘플별 median ratio는 양수 count만으로 계산한 뒤 geometric mean 1로 정규화한다.
+    dense 배열과 scipy.sparse matrix를 모두 받는다.
+    """
+    counts = sparse.csc_matrix(counts, dtype=np.float64)
+    counts.eliminate_zeros()
+    n_genes, n_samples = counts.shape
+
+    log_values = np.log(counts.data)
+    log_geo_means = np.bincount(counts.indices, weights=log_values, minlength=n_genes) / n_samples
+    ratios = log_values - log_geo_means[counts.indices]
+    if (np.diff(counts.indptr) == 0).any():
+        raise ValueError("Some samples have no positive counts; poscounts size factors are undefined")
+
+    log_factors = np.array([
+        np.median(ratios[counts.indptr[sample]:counts.indptr[sample + 1]]) for sample in range(n_samples)
+    ])
+    return np.exp(log_factors - log_factors.mean())
+
+
+def _upper_quartiles(values, sizes):
+    """샘플별 (count / library size)의 75% quantile"""
+    return np.quantile(values / sizes, 0.75, axis=0)
+
+
+def _rank_window(values, lo, hi):
+    """0-based 순위 lo..hi 안의 값 mask (동점은 R rank()처럼 평균 순위로 판정)
+
+    전체 정렬 대신 np.partition으로 경계값만 구한다.
+    """
+    lo_value, hi_value = np.partition(values, [lo, hi])[[lo, hi]]
+
+    def average_rank(value):
+        return (values < value).sum() + ((values == value).sum() - 1) / 2.0
+
+    lower = values >= lo_value if average_rank(lo_value) >= lo else values > lo_value
+    upper = values <= hi_value if average_rank(hi_value) <= hi else values < hi_value
+    return lower & upper
+
+
+def tmm_factors(counts, logratio_trim=0.3, sum_trim=0.05, reference=None):
+    """edgeR TMM normalization factor (geometric mean 1로 정규화)
+
+    M-value 30%, A-value 5% 양끝 trimming 경계는 np.partition으로 구한다.
+    scipy.sparse matrix는 비교하는 두 샘플 열만 dense로 풀어 계산한다.
+    """
+    if sparse.issparse(counts):
+        counts = sparse.csc_matrix(counts, dtype=np.float64)
+        sizes = np.asarray(counts.sum(axis=0), dtype=np.float64).ravel()
+
+        def column(sample):
+            values = np.zeros(counts.shape[0])
+            stored = slice(counts.indptr[sample], counts.indptr[sample + 1])
+            values[counts.indices[stored]] = counts.data[stored]
+            return values
+    else:
+        counts = np.asarray(counts, dtype=np.float64)
+        sizes = library_sizes(counts)
+
+        def column(sample):
+            return counts[:, sample]
+
+    if reference is None:
+        if sparse.issparse(counts):
+            quartiles = np.array([np.quantile(column(j) / sizes[j], 0.75) for j in range(counts.shape[1])])
+        else:
+            quartiles = _upper_quartiles(counts, sizes)
+        reference = int(np.argmin(np.abs(quartiles - quartiles.mean())))
+
+    ref_counts = column(reference)
+    ref_size = sizes[reference]
+    factors = np.ones(counts.shape[1])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ref_log = np.log2(ref_counts / ref_size)
+        ref_var = (ref_size - ref_counts) / ref_size / ref_counts
+
+        for sample in range(counts.shape[1]):
+            if sample == reference:
+                continue
+            obs = column(sample)
+            obs_log = np.log2(obs / sizes[sample])
+            # edgeR과 같이 M은 비율 하나의 log로 계산 (log 차이로 구하면 동점이 깨져 trimming이 달라짐)
+            m_values = np.log2((obs / sizes[sample]) / (ref_counts / ref_size))
+            a_values = 0.5 * (obs_log + ref_log)
+            variance = (sizes[sample] - obs) / sizes[sample] / obs + ref_var
+
+            usable = np.isfinite(m_values) & np.isfinite(a_values)
+            m_values, a_values, variance = m_values[usable], a_values[usable], variance[usable]
+            n = len(m_values)
+            if n == 0 or np.max(np.abs(m_values)) < 1e-6:
+                continue
+
+            trim_m = int(np.floor(n * logratio_trim))
+            trim_a = int(np.floor(n * sum_trim))
+            keep = (
+                _rank_window(m_values, trim_m, n - trim_m - 1) &
+                _rank_window(a_values, trim_a, n - trim_a - 1)
+            )
+            if keep.any():
+                factors[sample] = 2.0 ** (np.sum(m_values[keep] / variance[keep]) / np.sum(1.0 / variance[keep]))
+
+    return factors / np.exp(np.mean(np.log(factors)))
+
+
+class Normalizer:
+    """sample별 factor 계산(compute_factors)과 log2 변환(transform)으로 구성된 normalizer
+
+    transform 결과는 log2(values / factors * scale + 1)이다. 0은 0으로 남으므로 sparse
+    mode에서는 sparse_values / compute_sparse_factors (scipy.sparse 입력)로 같은 변환을
+    저장 원소에만 적용한다.
+    """
+
+    name = None
+    scale = 1e6
+    requires_gene_lengths = False
+
+    def compute_factors(self, counts, gene_lengths=None):
+        raise NotImplementedError
+
+    def transform(self, counts, factors, gene_lengths=None):
+        log_values, _, _ = fused_log_cpm(counts, sizes=factors, scale=self.scale, compute_stats=False)
+        return log_values
+
+    def sparse_values(self, counts, gene_lengths=None):
+        """sparse mode에서 factor로 나눌 값 (기본은 count 그대로)"""
+        return counts
+
+    def compute_sparse_factors(self, counts, gene_lengths=None):
+        raise NotImplementedError
+
+
+@register_normalizer
+class SimpleCPMNormalizer(Normalizer):
+    """library size CPM"""
+
+    name = "simple_cpm"
+
+    def compute_factors(self, counts, gene_lengths=None):
+        return library_sizes(counts)
+
+    def compute_sparse_factors(self, counts, gene_lengths=None):
+        return np.asarray(counts.sum(axis=0), dtype=np.float64).ravel()
+
+
+@register_normalizer
+class TMMNormalizer(Normalizer):
+    """TMM effective library size 기반 CPM"""
+
+    name = "TMM"
+
+    def compute_factors(self, counts, gene_lengths=None):
+        return library_sizes(counts) * tmm_factors(counts)
+
+    def compute_sparse_factors(self, counts, gene_lengths=None):
+        return np.asarray(counts.sum(axis=0), dtype=np.float64).ravel() * tmm_factors(counts)
+
+
+@register_normalizer
+class DESeq2Normalizer(Normalizer):
+    """median-of-ratios size factor로 나눈 정규화 count"""
+
+    name = "DESeq2"
+    scale = 1.0
+
+    def compute_factors(self, counts, gene_lengths=None):
+        return median_of_ratios_size_factors(counts)
+
+    def compute_sparse_factors(self, counts, gene_lengths=None):
+        """0 없는 유전자가 있으면 그 행만 dense로 median-of-ratios, 없으면 poscounts"""
+        counts = sparse.csr_matrix(counts)
+        complete = np.bincount(
+            np.repeat(np.arange(counts.shape[0]), np.diff(counts.indptr)),
+            weights=counts.data > 0, minlength=counts.shape[0]
+        ) == counts.shape[1]
+        if complete.any():
+            return median_of_ratios_size_factors(counts[np.flatnonzero(complete)].toarray())
+        return poscounts_size_factors(counts)
+
+
+@register_normalizer
+class TPMNormalizer(Normalizer):
+    """Transcripts Per Million (gene_lengths: bp 단위 유전자 길이)"""
+
+    name = "TPM"
+    requires_gene_lengths = True
+
+    def _rates(self, counts, gene_lengths):
+        return counts / (np.asarray(gene_lengths, dtype=np.float64)[:, None] / 1e3)
+
+    def compute_factors(self, counts, gene_lengths=None):
+        return self._rates(counts, gene_lengths).sum(axis=0)
+
+    def sparse_values(self, counts, gene_lengths=None):
+        return sparse.diags(1e3 / np.asarray(gene_lengths, dtype=np.float64)) @ counts
+
+    def compute_sparse_factors(self, counts, gene_lengths=None):
+        return np.asarray(self.sparse_values(counts, gene_lengths).sum(axis=0), dtype=np.float64).ravel()
+
+    def transform(self, counts, factors, gene_lengths=None):
+        log_values, _, _ = fused_log_cpm(
+            self._rates(counts, gene_lengths), sizes=factors, scale=self.scale,
+            inplace=True, compute_stats=False
+        )
+        return log_values
@@ -0,0 +1,104 @@
+"""
+Pathway Over-Representation Analysis
+PathwayIndex 위에서 hypergeometric (one-sided Fisher) 검정과 BH 보정을
+모든 pathway / gene list에 대해 한 번에 계산
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.special import gammaln
+
+from multiple_testing import benjamini_hochberg
+
+
+def _log_comb(n, k):
+    return gammaln(n + 1) - gammaln(k + 1) - gammaln(n - k + 1)
+
+
+def hypergeom_sf(k, M, n, N, rtol=1e-15):
+    """P(X >= k), X ~ Hypergeom(M, n, N)의 벡터화 계산
+
+    scipy.stats.hypergeom.sf는 원소별 계산이라 (gene list x pathway) 전체에는
+    느리다. 최빈값 기준으로 짧은 쪽 꼬리만 pmf 점화식으로 누적하고,
+    항이 rtol 이하로 작아지면 해당 원소는 계산을 멈춘다.
+    """
+    k, M, n, N = np.broadcast_arrays(*(np.asarray(a, dtype=np.float64) for a in (k, M, n, N)))
+    lower = np.maximum(0.0, n + N - M)
+    upper = np.minimum(n, N)
+    sf = np.where(k <= lower, 1.0, 0.0)
+    inside = (k > lower) & (k <= upper)
+    k, M, n, N, lower, upper = (a[inside] for a in (k, M, n, N, lower, upper))
+
+    mode = np.floor((N + 1) * (n + 1) / (M + 2))
+    use_upper = k > mode
+    term = np.exp(_log_comb(n, k) + _log_comb(M - n, N - k) - _log_comb(M, N))
+    result = np.empty_like(k)
+
+    # upper tail: sum_{x=k}^{upper} pmf(x)
+    idx = np.flatnonzero(use_upper)
+    x, t = k[idx], term[idx]
+    total = t.copy()
+    while len(idx):
+        ratio = (n[idx] - x) * (N[idx] - x) / ((x + 1) * (M[idx] - n[idx] - N[idx] + x + 1))
+        x = x + 1
+        t = np.where(x <= upper[idx], t * ratio, 0.0)
+        total += t
+        active = t > rtol * total
+        result[idx[~active]] = total[~active]
+        idx, x, t, total = idx[active], x[active], t[active], total[active]
+
+    # lower tail: 1 - sum_{x=lower}^{k-1} pmf(x)
+    idx = np.flatnonzero(~use_upper)
+    x, t = k[idx], term[idx]
+    total = np.zeros_like(t)
+    while len(idx):
+        ratio = x * (M[idx] - n[idx] - N[idx] + x) / ((n[idx] - x + 1) * (N[idx] - x + 1))
+        x = x - 1
+        t = np.where(x >= lower[idx], t * ratio, 0.0)
+        total += t
+        active = t > rtol * np.maximum(total, 1e-300)
+        result[idx[~active]] = 1.0 - total[~active]
+        idx, x, t, total = idx[active], x[active], t[active], total[active]
+
+    sf[inside] = np.clip(result, 0.0, 1.0)
+    return sf
+
+
+def hypergeometric_enrichment(pathway_index, gene_lists, background, list_names=None):
+    """gene list들의 pathway over-representation 검정
+
+    background에 없는 유전자는 제외하며, background와 겹치지 않는 pathway는
+    검정하지 않는다 (p_value NaN). p_adjusted는 gene list별 BH-FDR이다.
+
+    Returns:
+        gene list x pathway long-format DataFrame
+    """
+    gene_lists = [list(gene_list) for gene_list in gene_lists]
+    list_names = list(range(len(gene_lists))) if list_names is None else list(list_names)
+
+    hits, pathway_sizes, list_sizes, background_size = pathway_index.enrichment_counts(gene_lists, background)
+    list_sizes_2d = list_sizes[:, None]
+
+    testable = np.broadcast_to(pathway_sizes > 0, hits.shape)
+    # P(X >= k), X ~ Hypergeom(M=background, n=pathway, N=list)
+    p_values = hypergeom_sf(hits, background_size, pathway_sizes, list_sizes_2d)
+    p_values = np.where(testable, p_values, np.nan)
+    p_adjusted = benjamini_hochberg(p_values, axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected = list_sizes_2d * pathway_sizes / background_size if background_size else np.zeros(hits.shape)
+        fold_enrichment = hits / expected
+
+    n_lists, n_pathways = hits.shape
+    return pd.DataFrame({
+        'gene_list': np.repeat(np.asarray(list_names, dtype=object), n_pathways),
+        'pathway': np.tile(np.asarray(pathway_index.pathway_names, dtype=object), n_lists),
+        'overlap': hits.ravel(),
+        'pathway_size': np.tile(pathway_sizes, n_lists),
+        'list_size': np.repeat(list_sizes, n_pathways),
+        'background_size': background_size,
+        'expected': np.broadcast_to(expected, hits.shape).ravel(),
+        'fold_enrichment': np.broadcast_to(fold_enrichment, hits.shape).ravel(),
+        'p_value': p_values.ravel(),
+        'p_adjusted': p_adjusted.ravel()
+    })
@@ -0,0 +1,126 @@
+"""
+Pathway Index
+pathway_info로부터 gene x pathway sparse incidence matrix와 gene -> pathway
+inverted index를 만들어 membership / overlap 질의를 sparse 곱셈으로 처리
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+class PathwayIndex:
+    """gene x pathway incidence 기반 pathway membership index"""
+
+    def __init__(self, pathway_info):
+        self.source = pathway_info
+        self.pathway_names = pd.Index(list(pathway_info.keys()))
+
+        gene_ids = []
+        pathway_codes = []
+        for code, genes in enumerate(pathway_info.values()):
+            unique_genes = list(dict.fromkeys(genes))
+            gene_ids.extend(unique_genes)
+            pathway_codes.extend([code] * len(unique_genes))
+
+        gene_codes, self.genes = pd.factorize(pd.Index(gene_ids, dtype=object))
+        self.genes = pd.Index(self.genes, dtype=object)
+
+        self.incidence = sparse.csr_matrix(
+            (np.ones(len(gene_codes), dtype=np.int32), (gene_codes, np.asarray(pathway_codes, dtype=np.intp))),
+            shape=(len(self.genes), len(self.pathway_names))
+        )
+        self.pathway_sizes = np.asarray(self.incidence.sum(axis=0)).ravel()
+
+    def __len__(self):
+        return len(self.pathway_names)
+
+    def pathways_for_gene(self, gene_id):
+        """유전자가 속한 pathway 목록 (inverted index)"""
+        position = self.genes.get_indexer([gene_id])[0]
+        if position < 0:
+            return []
+        row = self.incidence.indices[self.incidence.indptr[position]:self.incidence.indptr[position + 1]]
+        return list(self.pathway_names[np.sort(row)])
+
+    def query_matrix(self, gene_lists):
+        """gene list들을 (list 수 x index 유전자 수) 0/1 sparse matrix로 변환"""
+        gene_lists = [list(gene_list) for gene_list in gene_lists]
+        lengths = [len(gene_list) for gene_list in gene_lists]
+        list_codes = np.repeat(np.arange(len(gene_lists)), lengths)
+
+        all_genes = pd.Index([gene for gene_list in gene_lists for gene in gene_list], dtype=object)
+        positions = self.genes.get_indexer(all_genes) if len(all_genes) else np.empty(0, dtype=np.intp)
+        valid = positions >= 0
+
+        query = sparse.csr_matrix(
+            (np.ones(int(valid.sum()), dtype=np.int32), (list_codes[valid], positions[valid])),
+            shape=(len(gene_lists), len(self.genes))
+        )
+        # 중복 유전자는 한 번만 센다
+        query.sum_duplicates()
+        query.data[:] = 1
+        return query
+
+    def overlap_counts(self, gene_list):
+        """pathway별 gene_list 교집합 크기"""
+        return self.batch_overlap_counts([gene_list])[0]
+
+    def batch_overlap_counts(self, gene_lists):
+        """여러 gene list의 pathway overlap을 한 번의 sparse 곱셈으로 계산
+
+        Returns:
+            (list 수 x pathway 수) int 배열
+        """
+        return np.asarray((self.query_matrix(gene_lists) @ self.incidence).todense())
+
+    def membership(self, gene_list):
+        """pathway별로 gene_list 중 포함된 유전자 목록 (입력 순서 유지)"""
+        gene_array = np.asarray(list(gene_list), dtype=object)
+        positions = self.genes.get_indexer(pd.Index(gene_array, dtype=object))
+        found = np.flatnonzero(positions >= 0)
+
+        # 입력 위치 x pathway hit matrix를 CSC로 바꾸면 pathway별 hit가 입력 순서로 정렬됨
+        hits = self.incidence[positions[found]].tocsc()
+        hits.sort_indices()
+
+        results = {}
+        for code, pathway in enumerate(self.pathway_names):
+            rows = hits.indices[hits.indptr[code]:hits.indptr[code + 1]]
+            results[pathway] = gene_array[found[rows]].tolist()
+        return results
+
+    def batch_membership(self, gene_lists):
+        """여러 gene list의 pathway membership"""
+        return [self.membership(gene_list) for gene_list in gene_lists]
+
+    def enrichment_counts(self, gene_lists, background):
+        """over-representation 검정용 overlap 집계 (background로 제한)
+
+        Returns:
+            hits: (list 수 x pathway 수) gene list ∩ pathway ∩ background 크기
+            pathway_sizes: pathway ∩ background 크기
+            list_sizes: gene list ∩ background 크기
+            background_size: background 유전자 수
+        """
+        gene_lists = [list(gene_list) for gene_list in gene_lists]
+        background = pd.Index(list(background), dtype=object).unique()
+        in_background = np.zeros((len(self.genes), 1), dtype=np.int32)
+        positions = self.genes.get_indexer(background)
+        in_background[positions[positions >= 0]] = 1
+
+        restricted = sparse.csr_matrix(self.incidence.multiply(in_background))
+        hits = np.asarray((self.query_matrix(gene_lists) @ restricted).todense())
+        pathway_sizes = np.asarray(restricted.sum(axis=0)).ravel()
+
+        list_codes = np.repeat(np.arange(len(gene_lists)), [len(gene_list) for gene_list in gene_lists])
+        members = pd.DataFrame({
+            'list': list_codes,
+            'gene': pd.Index([gene for gene_list in gene_lists for gene in gene_list], dtype=object)
+        }).drop_duplicates()
+        list_sizes = np.bincount(
+            members['list'].to_numpy()[members['gene'].isin(background).to_numpy()],
+            minlength=len(gene_lists)
+        )
+
+        return hits, pathway_sizes, list_sizes, len(background)
@@ -0,0 +1,269 @@
+"""
+Batch Plotting Backend
+box 통계량을 vectorized로 미리 계산하고, 점이 많은 scatter layer는 rasterize하여
+PCA / boxplot / volcano / MA plot을 (필요하면 worker process에서 병렬로) 저장
+(MODERN_VISUALIZATION_TOOLS["specialized_plots"] 참조)
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.figure import Figure
+
+from sparse_backend import SparseExpressionMatrix
+
+# 점 수가 이 값을 넘는 scatter layer는 rasterize (벡터 출력 크기 / 렌더링 시간 제한)
+RASTERIZE_MIN_POINTS = 5000
+
+# PCA plot에 샘플 이름을 표시하는 최대 샘플 수
+DEFAULT_MAX_SAMPLE_LABELS = 50
+
+# volcano plot에 이름을 표시하는 상위 유의 유전자 수
+DEFAULT_TOP_GENE_LABELS = 10
+
+# box 통계량 계산 시 한 번에 dense로 다루는 샘플 수
+BOX_COLUMN_BLOCK = 256
+
+
+def _column_blocks(matrix, block_size):
+    """(시작 열, dense float64 block) - DataFrame, ndarray, SparseExpressionMatrix"""
+    if isinstance(matrix, SparseExpressionMatrix):
+        csc = matrix.matrix.tocsc()
+        for start in range(0, csc.shape[1], block_size):
+            yield start, csc[:, start:start + block_size].toarray().astype(np.float64, copy=False)
+        return
+    values = matrix.to_numpy() if isinstance(matrix, pd.DataFrame) else np.asarray(matrix)
+    for start in range(0, values.shape[1], block_size):
+        yield start, np.asarray(values[:, start:start + block_size], dtype=np.float64)
+
+
+def box_statistics(matrix, labels=None, whis=1.5, block_size=BOX_COLUMN_BLOCK):
+    """샘플(열)별 boxplot 통계량 DataFrame
+
+    사분위수와 whisker (q1 - whis*IQR 이상 / q3 + whis*IQR 이하의 최소 / 최대값)를
+    열 block 단위로 한 번에 계산한다. 값은 matplotlib boxplot의 기본 계산과 같다.
+    """
+    if labels is None:
+        labels = matrix.columns if hasattr(matrix, 'columns') else pd.RangeIndex(np.shape(matrix)[1])
+
+    n_columns = len(labels)
+    names = ('q1', 'median', 'q3', 'whislo', 'whishi', 'mean', 'n_fliers')
+    stats = {name: np.full(n_columns, np.nan) for name in names}
+
+    for start, block in _column_blocks(matrix, block_size):
+        if block.shape[0] == 0:
+            continue
+        columns = slice(start, start + block.shape[1])
+        q1, median, q3 = np.percentile(block, [25, 50, 75], axis=0)
+        iqr = q3 - q1
+        low, high = q1 - whis * iqr, q3 + whis * iqr
+        stats['q1'][columns] = q1
+        stats['median'][columns] = median
+        stats['q3'][columns] = q3
+        stats['whislo'][columns] = np.where(block >= low, block, np.inf).min(axis=0)
+        stats['whishi'][columns] = np.where(block <= high, block, -np.inf).max(axis=0)
+        stats['mean'][columns] = block.mean(axis=0)
+        stats['n_fliers'][columns] = np.count_nonzero((block < low) | (block > high), axis=0)
+
+    return pd.DataFrame(stats, index=pd.Index(labels))
+
+
+def _scatter_layer(ax, x, y, **kwargs):
+    """Line2D marker로 그리는 scatter (PathCollection보다 빠름), 점이 많으면 rasterize"""
+    return ax.plot(x, y, linestyle='none', rasterized=len(x) > RASTERIZE_MIN_POINTS, **kwargs)
+
+
+def draw_pca(fig, data, max_labels=DEFAULT_MAX_SAMPLE_LABELS):
+    ax = fig.add_subplot()
+    x, y = data['x'], data['y']
+    _scatter_layer(ax, x, y, marker='o', alpha=0.7)
+
+    # 샘플 이름은 샘플 수가 적을 때만 표시
+    if len(x) <= max_labels:
+        for label, x_value, y_value in zip(data['labels'], x, y):
+            ax.annotate(label, (x_value, y_value))
+
+    ratio = data['explained_variance']
+    ax.set_xlabel(f'PC1 ({ratio[0]:.1%} variance)')
+    ax.set_ylabel(f'PC2 ({ratio[1]:.1%} variance)')
+    ax.set_title('PCA Analysis')
+    ax.grid(True, alpha=0.3)
+
+
+def draw_boxplot(fig, data, title='RNA Expression Distribution', ylabel='Log2(CPM + 1)', width=0.5):
+    """box 통계량으로 boxplot을 그림 (box / whisker / median을 각각 collection 하나로 그려
+    샘플 수와 무관하게 artist 수가 일정)"""
+    ax = fig.add_subplot()
+    stats = data['stats']
+    n_boxes = len(stats)
+    positions = np.arange(1, n_boxes + 1, dtype=np.float64)
+    left, right = positions - width / 2, positions + width / 2
+    q1, median, q3 = stats['q1'].to_numpy(), stats['median'].to_numpy(), stats['q3'].to_numpy()
+    whislo, whishi = stats['whislo'].to_numpy(), stats['whishi'].to_numpy()
+
+    boxes = np.stack([
+        np.column_stack([left, q1]), np.column_stack([right, q1]),
+        np.column_stack([right, q3]), np.column_stack([left, q3])
+    ], axis=1)
+    ax.add_collection(PolyCollection(boxes, facecolors='none', edgecolors='black', linewidths=1.0))
+
+    def segments(x0, y0, x1, y1):
+        return np.stack([np.column_stack([x0, y0]), np.column_stack([x1, y1])], axis=1)
+
+    cap_left, cap_right = positions - width / 4, positions + width / 4
+    whiskers = np.concatenate([
+        segments(positions, q1, positions, whislo), segments(positions, q3, positions, whishi),
+        segments(cap_left, whislo, cap_right, whislo), segments(cap_left, whishi, cap_right, whishi)
+    ])
+    ax.add_collection(LineCollection(whiskers, colors='black', linewidths=1.0))
+    ax.add_collection(LineCollection(segments(left, median, right, median), colors='tab:orange', linewidths=1.0))
+
+    finite = np.isfinite(whislo) & np.isfinite(whishi)
+    if finite.any():
+        low, high = whislo[finite].min(), whishi[finite].max()
+        margin = 0.05 * (high - low) or 0.5
+        ax.set_ylim(low - margin, high + margin)
+    ax.set_xlim(0.5, n_boxes + 0.5)
+
+    if n_boxes > DEFAULT_MAX_SAMPLE_LABELS:
+        ax.set_xticks([])
+        ax.set_xlabel(f'{n_boxes} samples')
+    else:
+        ax.set_xticks(positions, [str(label) for label in stats.index], rotation=45)
+    ax.set_title(title)
+    ax.set_ylabel(ylabel)
+
+
+def draw_volcano(fig, data, top_labels=DEFAULT_TOP_GENE_LABELS):
+    ax = fig.add_subplot()
+    x, y, significant = data['log2_fold_change'], data['neg_log10_p'], data['significant']
+    _scatter_layer(ax, x[~significant], y[~significant], marker='.', markersize=3, color='0.6', alpha=0.5)
+    _scatter_layer(ax, x[significant], y[significant], marker='.', markersize=3, color='tab:red', alpha=0.8)
+
+    # 가장 유의한 유전자 이름 표시
+    if top_labels and significant.any():
+        candidates = np.flatnonzero(significant)
+        top = candidates[np.argsort(-y[candidates], kind='stable')[:top_labels]]
+        for i in top:
+            ax.annotate(data['gene_ids'][i], (x[i], y[i]), fontsize=7)
+
+    if np.isfinite(data['threshold']):
+        ax.axhline(data['threshold'], color='0.3', linestyle='--', linewidth=0.8)
+    ax.set_xlabel('log2 fold change')
+    ax.set_ylabel(f"-log10({data['p_column']})")
+    ax.set_title(f'Volcano Plot ({int(significant.sum())} significant)')
+    ax.grid(True, alpha=0.3)
+
+
+def draw_ma(fig, data):
+    ax = fig.add_subplot()
+    a, m, significant = data['average'], data['log2_fold_change'], data['significant']
+    _scatter_layer(ax, a[~significant], m[~significant], marker='.', markersize=3, color='0.6', alpha=0.5)
+    _scatter_layer(ax, a[significant], m[significant], marker='.', markersize=3, color='tab:red', alpha=0.8)
+    ax.axhline(0.0, color='0.3', linewidth=0.8)
+    ax.set_xlabel(data['average_label'])
+    ax.set_ylabel('log2 fold change')
+    ax.set_title('MA Plot')
+    ax.grid(True, alpha=0.3)
+
+
+PLOT_TYPES = {
+    'pca': (draw_pca, (8, 6)),
+    'boxplot': (draw_boxplot, (10, 6)),
+    'volcano': (draw_volcano, (8, 6)),
+    'ma': (draw_ma, (8, 6))
+}
+
+
+def pca_plot_data(pca_df, explained_variance):
+    return {
+        'x': pca_df.iloc[:, 0].to_numpy(dtype=np.float64),
+        'y': pca_df.iloc[:, 1].to_numpy(dtype=np.float64),
+        'labels': [str(label) for label in pca_df.index],
+        'explained_variance': list(explained_variance)
+    }
+
+
+def volcano_plot_data(de_results, fdr_cutoff=0.05, p_column=None):
+    """DE 결과 -> volcano plot 입력 (p_adjusted가 있으면 그것을, 없으면 p_value 사용)"""
+    if p_column is None:
+        p_column = 'p_adjusted' if 'p_adjusted' in de_results else 'p_value'
+    p_values = de_results[p_column].to_numpy(dtype=np.float64)
+    x = de_results['log2_fold_change'].to_numpy(dtype=np.float64)
+    # p = 0 (가장 유의한 유전자)은 버리지 않고 가장 작은 양수 float로 clip해 맨 위에 표시
+    y = -np.log10(np.clip(p_values, np.finfo(np.float64).tiny, None))
+
+    finite = np.isfinite(x) & np.isfinite(y)
+    if 'significant' in de_results:
+        significant = de_results['significant'].to_numpy(dtype=bool)
+    else:
+        significant = p_values < fdr_cutoff
+    return {
+        'log2_fold_change': x[finite],
+        'neg_log10_p': y[finite],
+        'significant': significant[finite],
+        'gene_ids': de_results['gene_id'].to_numpy(dtype=object)[finite],
+        'threshold': -np.log10(fdr_cutoff) if fdr_cutoff > 0 else np.nan,
+        'p_column': p_column
+    }
+
+
+def ma_plot_data(de_results, log_means=True):
+    """DE 결과 -> MA plot 입력
+
+    log_means가 True면 group mean이 이미 log 척도 (log-CPM t-test)이므로 두 평균의
+    산술 평균을, 아니면 (NB GLM의 normalized count) log2(평균 + 1)을 A로 쓴다.
+    """
+    group1 = de_results['group1_mean'].to_numpy(dtype=np.float64)
+    group2 = de_results['group2_mean'].to_numpy(dtype=np.float64)
+    if log_means:
+        average = 0.5 * (group1 + group2)
+        average_label = 'mean log2 expression'
+    else:
+        average = np.log2(0.5 * (group1 + group2) + 1.0)
+        average_label = 'log2(mean normalized count + 1)'
+
+    m = de_results['log2_fold_change'].to_numpy(dtype=np.float64)
+    finite = np.isfinite(average) & np.isfinite(m)
+    significant = de_results['significant'].to_numpy(dtype=bool) if 'significant' in de_results \
+        else np.zeros(len(m), dtype=bool)
+    return {
+        'average': average[finite],
+        'log2_fold_change': m[finite],
+        'significant': significant[finite],
+        'average_label': average_label
+    }
+
+
+def render_plot(kind, path, data, dpi=150, options=None, bbox_inches=None):
+    """plot 하나를 pyplot 전역 상태 없이 Figure로 그려 저장하고 경로 반환"""
+    if kind not in PLOT_TYPES:
+        raise ValueError(f"Unknown plot type: {kind}")
+    draw, figsize = PLOT_TYPES[kind]
+
+    fig = Figure(figsize=figsize)
+    draw(fig, data, **(options or {}))
+    fig.tight_layout()
+    fig.savefig(path, dpi=dpi, bbox_inches=bbox_inches)
+    return path
+
+
+def _render_job(job):
+    return render_plot(**job)
+
+
+def render_plots(jobs, n_workers=1):
+    """render_plot 인자 dict 목록을 저장 (n_workers > 1이면 process pool에서 병렬 렌더링)
+
+    worker에는 미리 계산한 작은 배열 (box 통계량, 좌표)만 전달되며 반환 경로는 jobs 순서이다.
+    """
+    jobs = list(jobs)
+    n_workers = min(n_workers or os.cpu_count(), len(jobs))
+    if n_workers <= 1:
+        return [_render_job(job) for job in jobs]
+
+    with ProcessPoolExecutor(n_workers) as pool:
+        return list(pool.map(_render_job, jobs))
@@ -0,0 +1,210 @@
+"""
+Preprocessing Kernels
+발현 필터링, library size 계산, fused log-CPM 변환 커널과 out-of-core 전처리
+"""
+
+import numpy as np
+
+from count_matrix_io import (
+    DEFAULT_CHUNK_ROWS,
+    iter_count_blocks,
+    read_count_header,
+    write_count_store,
+)
+
+
+# 통계 누적 시 한 번에 다루는 샘플 수 (유전자 블록 x 샘플 블록 임시 배열 크기 제한)
+DEFAULT_CHUNK_COLUMNS = 512
+
+
+def resolve_min_samples(min_samples, n_samples):
+    """min_samples가 1 미만의 비율이면 샘플 수 기준 개수로 변환 (MODERN_FILTERING_CRITERIA 0.5 등)"""
+    if 0 < min_samples < 1:
+        return int(np.ceil(min_samples * n_samples))
+    return min_samples
+
+
+def expression_filter_mask(values, min_count, min_samples):
+    """min_count 이상으로 발현된 샘플 수가 min_samples(개수 또는 비율) 이상인 유전자 mask"""
+    min_samples = resolve_min_samples(min_samples, values.shape[1])
+    return (values >= min_count).sum(axis=1) >= min_samples
+
+
+def _merge_moments(count, mean, m2, block):
+    """유전자별 (n, mean, M2)에 샘플 block을 병렬 Welford (Chan) 방식으로 합침 (in-place)"""
+    n_block = block.shape[1]
+    block_mean = block.mean(axis=1)
+    centered = block - block_mean[:, None]
+    block_m2 = np.einsum('ij,ij->i', centered, centered)
+
+    total = count + n_block
+    delta = block_mean - mean
+    mean += delta * (n_block / total)
+    m2 += block_m2 + delta * delta * (count * n_block / total)
+    count[:] = total
+
+
+def streaming_filter_statistics(values, min_count, cpm_threshold=None, sizes=None,
+                                chunk_rows=DEFAULT_CHUNK_ROWS, chunk_columns=DEFAULT_CHUNK_COLUMNS):
+    """필터 기준 평가용 유전자별 누적 통계 (유전자 x 샘플 블록 1회 순회)
+
+    유전자별로 count가 min_count 이상인 샘플 수, CPM이 cpm_threshold 이상인 샘플 수,
+    count 합, log2(CPM + 1)의 Welford 평균 / 제곱편차합(M2)을 누적한다. CPM 기준은
+    샘플별 count 임계값 (cpm_threshold x library size / 1e6)과의 비교로 바꿔 CPM matrix를
+    만들지 않으며, log-CPM은 블록 크기 임시 배열에서만 계산한다.
+
+    Args:
+        values: 유전자 x 샘플 count 배열 (memmap 포함)
+        sizes: library size (None이면 전체 유전자 열 합)
+
+    Returns:
+        {'n_samples', 'count_passes', 'cpm_passes', 'total', 'mean', 'variance'}
+    """
+    n_genes, n_samples = values.shape
+    if sizes is None:
+        sizes = library_sizes(values)
+    sizes = np.asarray(sizes, dtype=np.float64)
+    cpm_counts = None if cpm_threshold is None else cpm_threshold * sizes / 1e6
+
+    count_passes = np.zeros(n_genes, dtype=np.int64)
+    cpm_passes = np.zeros(n_genes, dtype=np.int64) if cpm_counts is not None else None
+    total = np.zeros(n_genes)
+    mean = np.zeros(n_genes)
+    m2 = np.zeros(n_genes)
+
+    for row_start in range(0, n_genes, chunk_rows):
+        rows = slice(row_start, min(row_start + chunk_rows, n_genes))
+        count = np.zeros(rows.stop - rows.start)
+        for col_start in range(0, n_samples, chunk_columns):
+            columns = slice(col_start, min(col_start + chunk_columns, n_samples))
+            block = np.asarray(values[rows, columns], dtype=np.float64)
+
+            count_passes[rows] += np.count_nonzero(block >= min_count, axis=1)
+            if cpm_counts is not None:
+                cpm_passes[rows] += np.count_nonzero(block >= cpm_counts[columns], axis=1)
+            total[rows] += block.sum(axis=1)
+
+            log_cpm = block / sizes[columns]
+            log_cpm *= 1e6
+            np.log2(log_cpm + 1.0, out=log_cpm)
+            _merge_moments(count, mean[rows], m2[rows], log_cpm)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variance = m2 / (n_samples - 1)
+    return {
+        'n_samples': n_samples,
+        'count_passes': count_passes,
+        'cpm_passes': cpm_passes,
+        'total': total,
+        'mean': mean,
+        'variance': variance
+    }
+
+
+def adaptive_filter_mask(statistics, min_samples, variance_percentile=None):
+    """누적 통계로 모든 필터 기준을 한 번에 평가한 유전자 mask
+
+    count / CPM 기준을 min_samples(개수 또는 비율) 이상 샘플에서 만족하는 유전자 중
+    log-CPM 분산 하위 variance_percentile%를 제외한다 (분위 값은 np.partition으로 선택).
+    """
+    min_samples = resolve_min_samples(min_samples, statistics['n_samples'])
+    keep = statistics['count_passes'] >= min_samples
+    if statistics['cpm_passes'] is not None:
+        keep &= statistics['cpm_passes'] >= min_samples
+
+    if variance_percentile:
+        variance = statistics['variance'][keep]
+        n_removed = int(len(variance) * variance_percentile / 100.0)
+        if n_removed > 0:
+            cutoff = np.partition(variance, n_removed - 1)[n_removed - 1]
+            keep[keep] = variance > cutoff
+    return keep
+
+
+def library_sizes(values):
+    """샘플별 library size (float64 누적)"""
+    return values.sum(axis=0, dtype=np.float64)
+
+
+def total_count_mask(values, min_total):
+    """전체 count 합이 min_total보다 큰 유전자 mask"""
+    return values.sum(axis=1, dtype=np.float64) > min_total
+
+
+def _gather_rows(values, keep, dtype, inplace, block_rows=4096):
+    """keep 행만 dtype 출력 배열 하나에 모으기 (dtype 변환 임시 배열은 블록 크기로 제한)"""
+    if keep is None or keep.all():
+        if inplace and values.dtype == dtype and values.flags.writeable:
+            return values
+        return values.astype(dtype, copy=True)
+
+    rows = np.flatnonzero(keep)
+    if values.dtype == dtype:
+        return values[rows]
+
+    out = np.empty((len(rows), values.shape[1]), dtype=dtype)
+    for start in range(0, len(rows), block_rows):
+        out[start:start + block_rows] = values[rows[start:start + block_rows]]
+    return out
+
+
+def fused_log_cpm(values, keep=None, sizes=None, dtype=np.float64, inplace=False, compute_stats=True, scale=1e6):
+    """filter -> CPM -> log2(CPM + 1) -> 샘플별 mean/std 통합 커널
+
+    keep 행을 출력 배열 하나에 모은 뒤 나머지 연산은 모두 그 배열 위에서
+    in-place로 수행한다. sizes가 없으면 필터 후 library size를 사용한다.
+    inplace=True이고 필터가 없으면 (dtype이 같을 때) 입력 배열을 직접 덮어쓴다.
+    dtype=np.float32로 메모리를 절반으로 줄일 수 있다. scale=1이면 log2(values / sizes + 1).
+
+    Returns:
+        (log_values, sample_mean, sample_std) - compute_stats=False이면 통계는 None
+    """
+    out = _gather_rows(values, keep, np.dtype(dtype), inplace)
+
+    if sizes is None:
+        sizes = library_sizes(out)
+
+    np.divide(out, sizes, out=out, casting='unsafe')
+    if scale != 1:
+        np.multiply(out, scale, out=out)
+    np.add(out, 1, out=out)
+    np.log2(out, out=out)
+
+    if not compute_stats:
+        return out, None, None
+
+    sample_mean = out.mean(axis=0, dtype=np.float64)
+    sample_std = out.std(axis=0, ddof=1, dtype=np.float64)
+    return out, sample_mean, sample_std
+
+
+def chunked_log_cpm(input_path, output_path, min_count, min_samples, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """filter -> CPM -> log2 전처리를 유전자 블록 단위 2-pass로 수행
+
+    1st pass: 필터를 통과한 유전자만으로 library size 누적
+    2nd pass: 블록별 필터링과 log-CPM 변환 후 output_path(.npy store)에 기록
+
+    메모리는 chunk_rows 블록 크기로 제한되며, 정수 count에서는 in-memory
+    경로(filter_low_expression_genes -> normalize_expression)와 같은 결과를 낸다.
+    """
+    index_name, sample_names = read_count_header(input_path)
+    min_samples = resolve_min_samples(min_samples, len(sample_names))
+
+    sizes = np.zeros(len(sample_names), dtype=np.float64)
+    n_retained = 0
+    for _, values in iter_count_blocks(input_path, chunk_rows):
+        keep = expression_filter_mask(values, min_count, min_samples)
+        sizes += library_sizes(values[keep])
+        n_retained += int(keep.sum())
+
+    def normalized_blocks():
+        for gene_ids, values in iter_count_blocks(input_path, chunk_rows):
+            keep = expression_filter_mask(values, min_count, min_samples)
+            log_values, _, _ = fused_log_cpm(values, keep, sizes=sizes, compute_stats=False)
+            yield [g for g, k in zip(gene_ids, keep) if k], log_values
+
+    write_count_store(
+        output_path, normalized_blocks(), n_retained, sample_names,
+        index_name=index_name, dtype=np.float64, source=input_path
+    )
+    return output_path, n_retained
@@ -0,0 +1,128 @@
+"""
+QC Metrics Engine
+샘플별 QC 메트릭을 matrix 한 번 순회로 일괄 계산 (MODERN_QC_METRICS 참조)
+"""
+
+import numpy as np
+import pandas as pd
+
+from sparse_backend import SparseExpressionMatrix
+
+MITOCHONDRIAL_CHROMOSOMES = ('MT', 'M', 'chrM', 'chrMT')
+MITOCHONDRIAL_SYMBOL_PATTERN = r'^MT-'
+RIBOSOMAL_SYMBOL_PATTERN = r'^RP[SL]\d'
+
+# class_sums 순서
+GENE_CLASSES = ('housekeeping', 'mitochondrial', 'ribosomal')
+
+
+def _class_flags(labels, pattern):
+    """label 배열 -> 정규식 pattern 일치 여부 (unique label 단위로 한 번만 검사)"""
+    codes, uniques = pd.factorize(pd.Index(labels, dtype=object))
+    flags = pd.Index(uniques, dtype=object).astype(str).str.contains(pattern, regex=True)
+    return np.asarray(flags, dtype=bool)[codes] & (codes >= 0)
+
+
+def gene_class_masks(gene_ids, housekeeping_genes=(), annotation_table=None):
+    """유전자별 housekeeping / mitochondrial / ribosomal mask
+
+    symbol은 annotation_table에서 찾고, 어노테이션이 없으면 gene_id 자체를 symbol로 본다.
+    mitochondrial은 chromosome이 MT이거나 symbol이 'MT-'로 시작하는 유전자이다.
+    """
+    gene_ids = pd.Index(gene_ids)
+    symbols = pd.Index(gene_ids, dtype=object)
+    on_mito_chromosome = np.zeros(len(gene_ids), dtype=bool)
+
+    if annotation_table is not None:
+        fields = [field for field in ('symbol', 'chromosome') if field in annotation_table.table.columns]
+        annotations = annotation_table.lookup(gene_ids, fields=fields)
+        known = annotation_table.table.index.get_indexer(gene_ids) >= 0
+        if 'symbol' in annotations:
+            symbols = pd.Index(np.where(known, annotations['symbol'].astype(object), symbols), dtype=object)
+        if 'chromosome' in annotations:
+            on_mito_chromosome = np.asarray(annotations['chromosome'].isin(MITOCHONDRIAL_CHROMOSOMES))
+
+    return {
+        'housekeeping': np.asarray(gene_ids.isin(list(housekeeping_genes))),
+        'mitochondrial': on_mito_chromosome | _class_flags(symbols, MITOCHONDRIAL_SYMBOL_PATTERN),
+        'ribosomal': _class_flags(symbols, RIBOSOMAL_SYMBOL_PATTERN)
+    }
+
+
+class QCEngine:
+    """샘플별 QC 메트릭 계산기
+
+    gene class mask는 유전자 index별로 한 번만 만들어 재사용하고, 모든 메트릭은
+    샘플 축 reduction으로 한 번에 계산한다 (샘플 루프 없음).
+    """
+
+    def __init__(self, housekeeping_genes=(), annotation_table=None):
+        self.housekeeping_genes = list(housekeeping_genes)
+        self.annotation_table = annotation_table
+        self._mask_cache = []
+
+    def masks(self, gene_ids):
+        """gene_ids에 대한 gene class mask (최근 사용한 index면 cache 재사용)"""
+        gene_ids = pd.Index(gene_ids)
+        for cached_index, masks in self._mask_cache:
+            if cached_index is gene_ids or cached_index.equals(gene_ids):
+                return masks
+
+        masks = gene_class_masks(gene_ids, self.housekeeping_genes, self.annotation_table)
+        # expression / count matrix index 두 개를 번갈아 쓰는 경우를 위해 최근 2개 유지
+        self._mask_cache = [(gene_ids, masks)] + self._mask_cache[:1]
+        return masks
+
+    def compute(self, expression_matrix, count_matrix=None):
+        """샘플 x QC 메트릭 DataFrame
+
+        expression 메트릭 (검출 유전자 수, mean, median, housekeeping mean)은
+        expression_matrix에서, count 메트릭 (library size, mitochondrial / ribosomal %,
+        complexity = 검출 유전자 수 / library size)은 count_matrix(없으면 expression_matrix)에서
+        계산한다. DataFrame과 SparseExpressionMatrix를 모두 받는다.
+        """
+        expression = self._summarize(expression_matrix)
+        counts = expression if count_matrix is None or count_matrix is expression_matrix \
+            else self._summarize(count_matrix)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            n_housekeeping = self.masks(expression_matrix.index)['housekeeping'].sum()
+            housekeeping_expression = (
+                expression['class_sums'][0] / n_housekeeping if n_housekeeping
+                else np.full(len(expression['total']), np.nan)
+            )
+            library_size = counts['total']
+            qc = {
+                'total_detected_genes': expression['detected'].astype(np.float64),
+                'mean_expression': expression['total'] / expression['n_genes'],
+                'median_expression': expression['median'],
+                'housekeeping_expression': housekeeping_expression,
+                'library_size': library_size,
+                'mitochondrial_percentage': 100.0 * counts['class_sums'][1] / library_size,
+                'ribosomal_percentage': 100.0 * counts['class_sums'][2] / library_size,
+                'complexity': counts['detected'] / library_size
+            }
+
+        return pd.DataFrame(qc, index=expression_matrix.columns)
+
+    def _summarize(self, matrix):
+        """샘플별 합계 / 검출 수 / median / gene class 합계 (class 행만 모아 float64로 합산)"""
+        masks = self.masks(matrix.index)
+
+        if isinstance(matrix, SparseExpressionMatrix):
+            return {
+                'n_genes': matrix.shape[0],
+                'total': matrix.column_sums(),
+                'detected': matrix.column_counts(lambda data: data > 0),
+                'median': matrix.column_medians(),
+                'class_sums': [matrix.filter_rows(masks[name]).column_sums() for name in GENE_CLASSES]
+            }
+
+        values = matrix.to_numpy()
+        return {
+            'n_genes': values.shape[0],
+            'total': values.sum(axis=0, dtype=np.float64),
+            'detected': np.count_nonzero(values > 0, axis=0),
+            'median': np.median(values, axis=0) if values.shape[0] else np.full(values.shape[1], np.nan),
+            'class_sums': [values[masks[name]].sum(axis=0, dtype=np.float64) for name in GENE_CLASSES]
+        }
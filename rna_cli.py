@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+RNA Pipeline CLI
+load / filter / normalize / qc / pca / de / annotate 명령을 제공하는 단일 진입점
+
+무거운 모듈 (numpy, pandas, scipy, sklearn, matplotlib)은 각 명령이 실제로 필요할 때만
+import한다. `--help`와 `load` (shape 조회)는 표준 라이브러리만 사용한다.
+시작 비용 확인: python -X importtime rna_cli.py load counts.tsv
+"""
+
+import argparse
+import sys
+
+from gene_blocks import GENE_BLOCK_BACKENDS
+
+PIPELINE_COMMANDS = ('filter', 'normalize', 'qc', 'pca', 'de')
+
+# pipeline 명령 -> run_stages stage 이름
+_COMMAND_STAGES = {'filter': 'filtered', 'normalize': 'normalized', 'qc': 'qc', 'pca': 'pca'}
+
+
+def _write_table(frame, output, index=True):
+    """TSV 저장 ('-'이면 stdout)"""
+    frame.to_csv(sys.stdout if output == '-' else output, sep='\t', index=index)
+
+
+def _n_components(value):
+    """--n-components: 'auto' 또는 양의 정수"""
+    if value == 'auto':
+        return value
+    try:
+        n_components = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected 'auto' or an integer, got {value!r}") from None
+    if n_components < 1:
+        raise argparse.ArgumentTypeError("n-components must be at least 1")
+    return n_components
+
+
+def _build_pipeline(args):
+    from legacy_rna_pipeline import LegacyRNAAnalysisPipeline
+    from stage_cache import StageCache
+
+    pipeline = LegacyRNAAnalysisPipeline()
+    pipeline.min_count_threshold = args.min_count
+    pipeline.min_samples_expressed = args.min_samples
+    pipeline.min_cpm_threshold = args.min_cpm
+    pipeline.variance_percentile = args.variance_percentile
+    pipeline.normalization_method = args.normalization
+    pipeline.n_jobs = args.n_jobs
+    pipeline.gene_block_backend = args.gene_block_backend
+    if args.cache_dir is not None:
+        pipeline.stage_cache = StageCache(args.cache_dir)
+    return pipeline
+
+
+def _dense(matrix):
+    return matrix.to_frame() if hasattr(matrix, 'to_frame') else matrix
+
+
+def run_load(args):
+    from count_matrix_io import convert_tsv_to_store, count_matrix_shape
+
+    if args.store is not None:
+        convert_tsv_to_store(args.input, args.store)
+        print(f"Wrote count store: {args.store}")
+
+    n_genes, n_samples = count_matrix_shape(args.store or args.input)
+    print(f"{n_genes} genes x {n_samples} samples")
+    return 0
+
+
+def run_pipeline_command(args):
+    pipeline = _build_pipeline(args)
+    instrumentation = _attach_instrumentation(args, pipeline)
+
+    try:
+        if args.command == 'pca':
+            pipeline.pca_method = args.pca_method
+            pipeline.pca_n_components = args.n_components
+            pca_df, explained_variance = pipeline.run_stages(args.input, stages=('pca',))['pca']
+            _write_table(pca_df, args.output)
+            if args.plot_dir is not None:
+                pipeline.generate_legacy_plots(pca_df, explained_variance, output_dir=args.plot_dir)
+        elif args.command == 'de':
+            pipeline.statistical_test = args.test
+            pipeline.fdr_cutoff = args.fdr
+            stages = pipeline.run_stages(args.input, stages=('filtered', 'normalized'))
+            de_results = pipeline.differential_expression_legacy(
+                stages['normalized'], args.group1, args.group2, count_matrix=stages['filtered']
+            )
+            _write_table(de_results, args.output, index=False)
+        else:
+            stage = _COMMAND_STAGES[args.command]
+            _write_table(_dense(pipeline.run_stages(args.input, stages=(stage,))[stage]), args.output)
+    finally:
+        _finish_instrumentation(args, instrumentation)
+    return 0
+
+
+def run_annotate(args):
+    import pandas as pd
+    from gene_annotation_analysis import GeneExpressionAnalyzer
+
+    analyzer = GeneExpressionAnalyzer(annotation_path=args.annotations)
+    instrumentation = _attach_instrumentation(args, analyzer)
+    try:
+        table = pd.read_csv(args.input, sep='\t', index_col=0)
+        _write_table(analyzer.annotate_genes(table), args.output)
+    finally:
+        _finish_instrumentation(args, instrumentation)
+    return 0
+
+
+def _attach_instrumentation(args, target):
+    if args.trace is None:
+        return None
+    from instrumentation import Instrumentation
+
+    target.instrumentation = Instrumentation()
+    return target.instrumentation
+
+
+def _finish_instrumentation(args, instrumentation):
+    if instrumentation is not None:
+        instrumentation.close()
+        instrumentation.write_trace(args.trace)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='rna_cli', description="RNA-seq analysis pipeline")
+    parser.add_argument('-v', '--verbose', action='store_true', help="진행 메시지를 stderr에 출력")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    load = subparsers.add_parser('load', help="count matrix shape 조회 / binary store 변환")
+    load.add_argument('input', help="count TSV(.gz) 또는 .npy store")
+    load.add_argument('--store', help="TSV를 변환해 저장할 .npy store 경로")
+    load.set_defaults(handler=run_load)
+
+    # pipeline 명령 공통 옵션
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('input', help="count TSV(.gz) 또는 .npy store")
+    common.add_argument('-o', '--output', default='-', help="결과 TSV 경로 (기본: stdout)")
+    common.add_argument('--min-count', type=float, default=5)
+    common.add_argument('--min-samples', type=float, default=2, help="샘플 수 또는 1 미만이면 비율")
+    common.add_argument('--min-cpm', type=float, help="CPM 기준 (min-samples 이상 샘플에서 만족)")
+    common.add_argument('--variance-percentile', type=float, help="log-CPM 분산 하위 percentile 제거")
+    common.add_argument('--normalization', default='simple_cpm')
+    common.add_argument('--n-jobs', type=int, default=1)
+    common.add_argument('--gene-block-backend', default='thread', choices=GENE_BLOCK_BACKENDS,
+                        help="n-jobs > 1일 때 유전자별 DE 병렬화 방식")
+    common.add_argument('--cache-dir', help="stage checkpoint 디렉터리")
+    common.add_argument('--trace', help="Chrome trace JSON 저장 경로")
+
+    helps = {
+        'filter': "저발현 유전자 필터링",
+        'normalize': "filter + 정규화",
+        'qc': "샘플별 QC 메트릭",
+        'pca': "샘플 PCA score",
+        'de': "두 그룹 차등 발현 분석"
+    }
+    commands = {name: subparsers.add_parser(name, parents=[common], help=helps[name]) for name in PIPELINE_COMMANDS}
+    for command in commands.values():
+        command.set_defaults(handler=run_pipeline_command)
+
+    commands['pca'].add_argument('--pca-method', default='auto',
+                                 choices=('auto', 'exact', 'randomized', 'incremental'))
+    commands['pca'].add_argument('--n-components', type=_n_components, default=2,
+                                 help="PC 수 또는 auto (누적 설명 분산 기준)")
+    commands['pca'].add_argument('--plot-dir', help="PCA plot 저장 디렉터리")
+
+    commands['de'].add_argument('--group1', nargs='+', required=True)
+    commands['de'].add_argument('--group2', nargs='+', required=True)
+    commands['de'].add_argument('--test', default='t_test', choices=('t_test', 'nb_glm'))
+    commands['de'].add_argument('--fdr', type=float, default=0.05)
+
+    annotate = subparsers.add_parser('annotate', help="gene_id index TSV에 어노테이션 추가")
+    annotate.add_argument('input', help="첫 컬럼이 gene_id인 TSV")
+    annotate.add_argument('-o', '--output', default='-')
+    annotate.add_argument('--annotations', help="updated_gene_annotations.json 형식 파일")
+    annotate.add_argument('--trace', help="Chrome trace JSON 저장 경로")
+    annotate.set_defaults(handler=run_annotate)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.verbose:
+        from instrumentation import configure_console_logging
+
+        configure_console_logging(stream=sys.stderr)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
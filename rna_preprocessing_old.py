@@ -1,25 +1,21 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+from count_matrix_io import load_count_matrix
+from plotting import box_statistics, render_plot
+from preprocessing import fused_log_cpm, total_count_mask
 
-def process_rna_data(file_path):
-    data = pd.read_csv(file_path, sep='\t', index_col=0)
-    
-    filtered_data = data[data.sum(axis=1) > 10]
-    filtered_data = filtered_data[filtered_data.sum(axis=1) > 10]
-    
-    normalized_data = pd.DataFrame()
-    for col in filtered_data.columns:
-        total = filtered_data[col].sum()
-        normalized_data[col] = (filtered_data[col] / total) * 1000000
+MIN_TOTAL_COUNT = 10
+
+def process_rna_data(file_path, dtype=np.float64, inplace=False):
+    # count는 float64로 읽어 정규화 전에 정밀도를 잃지 않도록 함 (기본 float32 아님)
+    data = load_count_matrix(file_path, dtype=np.float64)
     
-    log_data = np.log2(normalized_data + 1)
+    values = data.to_numpy()
     
-    mean_values = []
-    std_values = []
-    for col in log_data.columns:
-        mean_values.append(log_data[col].mean())
-        std_values.append(log_data[col].std())
+    # filter -> CPM -> log2 -> 샘플별 통계를 한 번에 계산
+    keep = total_count_mask(values, MIN_TOTAL_COUNT)
+    log_values, mean_values, std_values = fused_log_cpm(values, keep, dtype=dtype, inplace=inplace)
+    log_data = pd.DataFrame(log_values, index=data.index[keep], columns=data.columns, copy=False)
     
     stats_df = pd.DataFrame({
         'sample': log_data.columns,
@@ -27,14 +23,8 @@ def process_rna_data(file_path):
         'std': std_values
     })
     
-    plt.figure(figsize=(10, 6))
-    plt.boxplot([log_data[col] for col in log_data.columns])
-    plt.xticks(range(1, len(log_data.columns) + 1), log_data.columns, rotation=45)
-    plt.title('RNA Expression Distribution')
-    plt.ylabel('Log2(CPM + 1)')
-    plt.tight_layout()
-    plt.savefig('rna_boxplot.png', dpi=300, bbox_inches='tight')
-    plt.close()
+    # 전체 열 대신 미리 계산한 box 통계량으로 boxplot 렌더링
+    render_plot('boxplot', 'rna_boxplot.png', {'stats': box_statistics(log_data)}, dpi=300, bbox_inches='tight')
     
     return log_data, stats_df
 
@@ -0,0 +1,215 @@
+"""
+Sparse Expression Backend
+0이 대부분인 (single-cell 유사) count matrix를 scipy.sparse CSR로 유지한 채
+filter -> CPM -> QC -> DE를 수행 (MODERN_PERFORMANCE_OPTIMIZATION["memory_optimization"] 참조)
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from de_engine import group_moment_statistics
+from normalizers import matrix_fingerprint
+from preprocessing import resolve_min_samples
+
+# 0 비율이 이 값을 넘으면 pipeline이 sparse backend로 전환
+DEFAULT_SPARSITY_THRESHOLD = 0.9
+
+
+def sparsity(data):
+    """0 원소 비율 (DataFrame, ndarray, scipy.sparse, SparseExpressionMatrix)"""
+    if isinstance(data, SparseExpressionMatrix):
+        data = data.matrix
+    if sparse.issparse(data):
+        n_elements = data.shape[0] * data.shape[1]
+        return 1.0 - data.count_nonzero() / n_elements if n_elements else 0.0
+    values = data.to_numpy() if isinstance(data, pd.DataFrame) else np.asarray(data)
+    return 1.0 - np.count_nonzero(values) / values.size if values.size else 0.0
+
+
+def as_expression_matrix(data, threshold=DEFAULT_SPARSITY_THRESHOLD):
+    """sparsity가 threshold를 넘으면 SparseExpressionMatrix로, 아니면 그대로 반환
+
+    이미 sparse인 입력 (SparseExpressionMatrix, pandas sparse DataFrame)은 그대로 sparse로 둔다.
+    """
+    if isinstance(data, SparseExpressionMatrix):
+        return data
+    if isinstance(data, pd.DataFrame) and len(data.columns) and \
+            all(isinstance(dtype, pd.SparseDtype) for dtype in data.dtypes):
+        return SparseExpressionMatrix(data.sparse.to_coo(), data.index, data.columns)
+    if threshold is not None and sparsity(data) > threshold:
+        return SparseExpressionMatrix.from_frame(data)
+    return data
+
+
+class SparseExpressionMatrix:
+    """gene x sample CSR matrix와 유전자 / 샘플 label"""
+
+    def __init__(self, matrix, index, columns):
+        self.matrix = sparse.csr_matrix(matrix)
+        self.matrix.sum_duplicates()
+        self.index = pd.Index(index)
+        self.columns = pd.Index(columns)
+
+        if self.matrix.shape != (len(self.index), len(self.columns)):
+            raise ValueError(f"Sparse matrix shape {self.matrix.shape} does not match index / columns")
+
+    @classmethod
+    def from_frame(cls, frame):
+        return cls(sparse.csr_matrix(frame.to_numpy()), frame.index, frame.columns)
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    def __len__(self):
+        return self.shape[0]
+
+    def to_frame(self):
+        """dense DataFrame (출력 단계에서만 사용)"""
+        return pd.DataFrame(self.matrix.toarray(), index=self.index, columns=self.columns, copy=False)
+
+    def fingerprint(self):
+        """cache key용 내용 hash"""
+        return (
+            matrix_fingerprint(self.matrix.data, self.index, self.columns),
+            matrix_fingerprint(self.matrix.indices),
+            matrix_fingerprint(self.matrix.indptr)
+        )
+
+    def _row_ids(self):
+        return np.repeat(np.arange(self.shape[0]), np.diff(self.matrix.indptr))
+
+    def filter_rows(self, mask):
+        """mask 행만 남긴 SparseExpressionMatrix"""
+        rows = np.flatnonzero(mask)
+        return SparseExpressionMatrix(self.matrix[rows], self.index[rows], self.columns)
+
+    def subset(self, genes=None, samples=None):
+        """유전자 / 샘플 label로 선택한 SparseExpressionMatrix (요청 순서 유지)"""
+        matrix = self.matrix
+        index = self.index
+        columns = self.columns
+        if genes is not None:
+            rows = self.index.get_indexer_for(genes)
+            if (rows < 0).any():
+                raise KeyError("Requested genes are not in the sparse matrix")
+            matrix, index = matrix[rows], index[rows]
+        if samples is not None:
+            cols = self.columns.get_indexer_for(samples)
+            if (cols < 0).any():
+                raise KeyError("Requested samples are not in the sparse matrix")
+            matrix, columns = matrix[:, cols], columns[cols]
+        return SparseExpressionMatrix(matrix, index, columns)
+
+    def column_sums(self):
+        """샘플별 합 (library size, float64 누적)"""
+        return np.bincount(self.matrix.indices, weights=self.matrix.data, minlength=self.shape[1])
+
+    def column_counts(self, predicate):
+        """샘플별로 predicate(data)를 만족하는 저장 원소 수"""
+        return np.bincount(self.matrix.indices, weights=predicate(self.matrix.data), minlength=self.shape[1])
+
+    def row_counts(self, predicate, zero_passes=False):
+        """유전자별로 predicate를 만족하는 원소 수 (zero_passes면 암묵적 0도 센다)"""
+        counts = np.bincount(self._row_ids(), weights=predicate(self.matrix.data), minlength=self.shape[0])
+        if zero_passes:
+            counts += self.shape[1] - np.diff(self.matrix.indptr)
+        return counts
+
+    def column_medians(self):
+        """샘플별 median (저장 원소만 정렬하고 암묵적 0은 개수로 처리)
+
+        열 안에서 정렬한 저장 원소 배열을 [음수 | 암묵적 0 | 양수] 순서로 보고
+        median 위치의 order statistic을 모든 열에 대해 한 번에 찾는다.
+        """
+        csc = self.matrix.tocsc()
+        n_rows, n_cols = self.shape
+        col_ids = np.repeat(np.arange(n_cols), np.diff(csc.indptr))
+        stored = csc.data[np.lexsort((csc.data, col_ids))]
+
+        starts = csc.indptr[:-1]
+        n_negative = np.bincount(col_ids, weights=stored < 0, minlength=n_cols).astype(np.intp)
+        n_zeros = n_rows - np.diff(csc.indptr)
+
+        def order_statistic(position):
+            stored_position = np.where(position < n_negative, position, position - n_zeros)
+            is_zero = (position >= n_negative) & (position < n_negative + n_zeros)
+            lookup = np.clip(starts + stored_position, 0, max(len(stored) - 1, 0))
+            values = stored[lookup] if len(stored) else np.zeros(n_cols)
+            return np.where(is_zero, 0.0, values)
+
+        if n_rows == 0:
+            return np.full(n_cols, np.nan)
+        return 0.5 * (order_statistic((n_rows - 1) // 2) + order_statistic(n_rows // 2))
+
+    def row_moments(self, samples):
+        """samples 열에 대한 유전자별 평균과 분산(ddof=1)
+
+        분산은 저장 원소의 편차 제곱합에 암묵적 0의 (개수 x 평균^2)을 더하는 2-pass로 계산한다.
+        """
+        matrix = self.matrix[:, self.columns.get_indexer_for(list(samples))]
+        n = matrix.shape[1]
+        row_ids = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.bincount(row_ids, weights=matrix.data, minlength=matrix.shape[0]) / n
+            deviation = matrix.data - mean[row_ids]
+            squares = np.bincount(row_ids, weights=deviation * deviation, minlength=matrix.shape[0])
+            squares += (n - np.diff(matrix.indptr)) * mean ** 2
+            var = squares / (n - 1)
+        return mean, var
+
+
+def sparse_expression_filter_mask(matrix, min_count, min_samples):
+    """expression_filter_mask의 sparse 버전"""
+    passes = matrix.row_counts(lambda data: data >= min_count, zero_passes=min_count <= 0)
+    return passes >= resolve_min_samples(min_samples, matrix.shape[1])
+
+
+def sparse_filter_statistics(matrix, min_count, cpm_threshold=None, sizes=None):
+    """streaming_filter_statistics의 sparse 버전 (저장 원소만 순회, 암묵적 0은 개수로 처리)"""
+    if sizes is None:
+        sizes = matrix.column_sums()
+    stored_columns = matrix.matrix.indices
+
+    cpm_passes = None
+    if cpm_threshold is not None:
+        cpm_counts = cpm_threshold * sizes / 1e6
+        cpm_passes = matrix.row_counts(lambda data: data >= cpm_counts[stored_columns],
+                                       zero_passes=cpm_threshold <= 0)
+
+    mean, variance = sparse_log_cpm(matrix, sizes).row_moments(matrix.columns)
+    return {
+        'n_samples': matrix.shape[1],
+        'count_passes': matrix.row_counts(lambda data: data >= min_count, zero_passes=min_count <= 0),
+        'cpm_passes': cpm_passes,
+        'total': matrix.row_counts(lambda data: data),
+        'mean': mean,
+        'variance': variance
+    }
+
+
+def sparse_log_cpm(matrix, sizes=None, scale=1e6):
+    """log2(values / sizes * scale + 1) - 0은 0으로 남으므로 저장 원소만 변환"""
+    if sizes is None:
+        sizes = matrix.column_sums()
+
+    result = matrix.matrix.astype(np.float64, copy=True)
+    result.data /= sizes[result.indices]
+    if scale != 1:
+        result.data *= scale
+    result.data += 1.0
+    np.log2(result.data, out=result.data)
+    return SparseExpressionMatrix(result, matrix.index, matrix.columns)
+
+
+def sparse_two_group_statistics(matrix, test_samples, reference_samples):
+    """two_group_statistics의 sparse 버전 (같은 컬럼의 DataFrame 반환)"""
+    test_mean, test_var = matrix.row_moments(test_samples)
+    reference_mean, reference_var = matrix.row_moments(reference_samples)
+    return group_moment_statistics(
+        test_mean, test_var, len(list(test_samples)),
+        reference_mean, reference_var, len(list(reference_samples)),
+        matrix.index
+    )
@@ -0,0 +1,145 @@
+"""
+Pipeline Stage Cache
+입력 hash + stage 파라미터로 주소가 정해지는 on-disk checkpoint cache
+(크기 상한을 넘으면 가장 오래 사용하지 않은 entry부터 삭제)
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+
+import pandas as pd
+
+from count_matrix_io import STORE_SIDECAR_SUFFIX
+from normalizers import matrix_fingerprint
+from sparse_backend import SparseExpressionMatrix
+
+CACHE_FORMAT_VERSION = 1
+ENTRY_SUFFIX = '.stage.pkl'
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+
+def _file_digest(file_path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def input_fingerprint(source):
+    """count matrix 입력의 내용 hash (DataFrame, SparseExpressionMatrix, 파일 / store 경로)"""
+    if isinstance(source, pd.DataFrame):
+        return matrix_fingerprint(source.to_numpy(), source.index, source.columns)
+    if isinstance(source, SparseExpressionMatrix):
+        return '-'.join(source.fingerprint())
+
+    # 경로: 파일 내용 (store이면 index sidecar 포함)
+    digests = [_file_digest(source)]
+    sidecar = source + STORE_SIDECAR_SUFFIX
+    if os.path.exists(sidecar):
+        digests.append(_file_digest(sidecar))
+    return '-'.join(digests)
+
+
+def stage_key(stage, parent_key, params):
+    """stage 이름, 상위 stage key, 파라미터로 cache key 생성"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((CACHE_FORMAT_VERSION, stage, parent_key, sorted(params.items()))).encode())
+    return digest.hexdigest()
+
+
+class StageCache:
+    """stage 결과를 pickle(binary, protocol 5)로 저장하는 content-addressed cache
+
+    entry 파일의 mtime을 최근 사용 시각으로 쓰며, put 이후 전체 크기가 max_bytes를
+    넘으면 가장 오래된 entry부터 지운다.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key + ENTRY_SUFFIX)
+
+    def __contains__(self, key):
+        return os.path.exists(self._entry_path(key))
+
+    def get(self, key):
+        """cache된 결과 반환 (없거나 손상되었으면 None)"""
+        path = self._entry_path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            self._remove(path)
+            return None
+
+        if entry.get('version') != CACHE_FORMAT_VERSION or entry.get('key') != key:
+            self._remove(path)
+            return None
+
+        os.utime(path)
+        return entry['value']
+
+    def put(self, key, stage, value):
+        """결과 저장 (임시 파일에 쓴 뒤 rename하여 중간 상태가 보이지 않게 함)"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump({
+                    'version': CACHE_FORMAT_VERSION,
+                    'key': key,
+                    'stage': stage,
+                    'value': value
+                }, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._entry_path(key))
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+
+        self.evict()
+        return value
+
+    def entries(self):
+        """(path, size, mtime) 목록 - 오래된 순"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(ENTRY_SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime_ns))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """전체 크기가 max_bytes 이하가 될 때까지 LRU entry 삭제"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        for path, _, _ in self.entries():
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
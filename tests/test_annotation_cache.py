@@ -0,0 +1,63 @@
+import json
+import os
+
+from annotation_cache import AnnotationProvider
+
+RAW = {
+    'gene_annotations': {'ENSG1': {'symbol': 'TP53', 'biotype': 'protein_coding', 'chromosome': '17'}},
+    'pathway_info': {
+        'apoptosis': {'genes': ['ENSG1', 'ENSG2'], 'description': 'Programmed cell death'},
+        'cell_cycle': ['ENSG3']
+    },
+    'expression_thresholds': {'low': 1.0, 'updated_date': '2024-01-01'},
+    'housekeeping_genes': {'genes': ['ENSG3']}
+}
+
+
+def _write_json(path, raw):
+    with open(path, 'w') as f:
+        json.dump(raw, f)
+
+
+def test_sections_match_source(tmp_path):
+    source = tmp_path / 'annotations.json'
+    _write_json(source, RAW)
+
+    provider = AnnotationProvider(str(source))
+
+    assert provider.gene_annotations == RAW['gene_annotations']
+    assert provider.pathway_info == {'apoptosis': ['ENSG1', 'ENSG2'], 'cell_cycle': ['ENSG3']}
+    assert provider.pathway_descriptions == {'apoptosis': 'Programmed cell death'}
+    assert provider.expression_thresholds == {'low': 1.0}
+    assert provider.housekeeping_genes == ['ENSG3']
+    assert len(provider.annotation_table) == 1
+    assert os.path.exists(provider.cache_path)
+
+
+def test_cache_is_reused_without_parsing_json(tmp_path, monkeypatch):
+    source = tmp_path / 'annotations.json'
+    _write_json(source, RAW)
+    AnnotationProvider(str(source)).refresh()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("JSON parsed although cache is valid")
+
+    monkeypatch.setattr(json, 'load', fail)
+    assert AnnotationProvider(str(source)).pathway_info['cell_cycle'] == ['ENSG3']
+
+
+def test_reload_after_source_change(tmp_path):
+    source = tmp_path / 'annotations.json'
+    _write_json(source, RAW)
+    provider = AnnotationProvider(str(source))
+    assert provider.housekeeping_genes == ['ENSG3']
+    assert provider.refresh() is False
+
+    changed = dict(RAW, housekeeping_genes={'genes': ['ENSG3', 'ENSG4']})
+    _write_json(source, changed)
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert provider.housekeeping_genes == ['ENSG3', 'ENSG4']
+    # 새 provider도 다시 빌드된 cache를 읽는다
+    assert AnnotationProvider(str(source)).housekeeping_genes == ['ENSG3', 'ENSG4']
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from annotation_table import UNKNOWN, AnnotationTable
+
+GENE_ANNOTATIONS = {
+    'ENSG1': {'symbol': 'TP53', 'biotype': 'protein_coding', 'chromosome': '17', 'start': 7661779, 'end': 7687538},
+    'ENSG2': {'symbol': 'MALAT1', 'biotype': 'lncRNA', 'chromosome': '11', 'start': 65497688, 'end': 65506516},
+    'ENSG3': {'symbol': 'GAPDH', 'biotype': 'protein_coding', 'chromosome': '12', 'start': 6534512, 'end': 6538374},
+}
+
+
+def _naive_lookup(gene_ids, field):
+    return [GENE_ANNOTATIONS.get(gene, {}).get(field, UNKNOWN) for gene in gene_ids]
+
+
+def test_from_dict_compiles_categorical_and_integer_fields():
+    table = AnnotationTable.from_dict(GENE_ANNOTATIONS)
+
+    assert len(table) == 3
+    assert isinstance(table.table['symbol'].dtype, pd.CategoricalDtype)
+    assert UNKNOWN in table.table['biotype'].cat.categories
+    assert str(table.table['start'].dtype) == 'Int64'
+
+
+def test_lookup_matches_dict_lookup_with_unknown_for_missing():
+    table = AnnotationTable.from_dict(GENE_ANNOTATIONS)
+    gene_ids = ['ENSG3', 'ENSG_MISSING', 'ENSG1', 'ENSG3']
+
+    result = table.lookup(gene_ids)
+
+    assert list(result.index) == gene_ids
+    for field in ('symbol', 'biotype', 'chromosome'):
+        assert list(result[field].astype(str)) == _naive_lookup(gene_ids, field)
+    assert result['start'].iloc[0] == 6534512
+    assert pd.isna(result['start'].iloc[1])
+
+
+def test_annotate_keeps_expression_values():
+    table = AnnotationTable.from_dict(GENE_ANNOTATIONS)
+    expression = pd.DataFrame({'s1': [1.0, 2.0], 's2': [3.0, 4.0]}, index=['ENSG2', 'ENSG9'])
+
+    annotated = table.annotate(expression)
+
+    pd.testing.assert_frame_equal(annotated[['s1', 's2']], expression)
+    for sample in ('s1', 's2'):
+        assert np.shares_memory(annotated[sample].to_numpy(), expression[sample].to_numpy())
+    assert list(annotated['gene_symbol'].astype(str)) == ['MALAT1', UNKNOWN]
+    assert list(annotated['biotype'].astype(str)) == ['lncRNA', UNKNOWN]
@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch_correction import ComBat, batch_variance_explained
+
+
+def _naive_combat(data, batches, covariates=None, mean_only=False, tol=1e-12, max_iter=10000):
+    """sva::ComBat (parametric)을 유전자 / batch 루프로 옮긴 reference
+
+    mean_only의 사후 평균은 sva (n=1)와 달리 batch 크기 n을 쓴다 (ComBat 클래스와 동일).
+    """
+    y = data.to_numpy(dtype=np.float64)
+    n_genes, n_samples = y.shape
+    names = sorted(set(batches))
+    batch_design = np.array([[float(b == name) for name in names] for b in batches])
+    extra = np.empty((n_samples, 0)) if covariates is None else \
+        pd.get_dummies(covariates, drop_first=True, dtype=np.float64).to_numpy()
+    design = np.hstack([batch_design, extra])
+    n_batch = len(names)
+    sizes = batch_design.sum(axis=0)
+
+    standardized = np.empty_like(y)
+    stand_mean = np.empty_like(y)
+    pooled_sd = np.empty(n_genes)
+    for g in range(n_genes):
+        coef = np.linalg.lstsq(design, y[g], rcond=None)[0]
+        pooled_sd[g] = np.sqrt(np.mean((y[g] - design @ coef) ** 2))
+        stand_mean[g] = sizes @ coef[:n_batch] / n_samples + extra @ coef[n_batch:]
+        standardized[g] = (y[g] - stand_mean[g]) / pooled_sd[g]
+
+    corrected = np.empty_like(y)
+    for j in range(n_batch):
+        columns = batch_design[:, j] == 1
+        s = standardized[:, columns]
+        n = columns.sum()
+        gamma_hat = s.mean(axis=1)
+        gamma_bar = gamma_hat.mean()
+        tau2 = gamma_hat.var(ddof=1)
+        if mean_only:
+            gamma_star = (n * tau2 * gamma_hat + gamma_bar) / (n * tau2 + 1.0)
+            delta_star = np.ones(n_genes)
+        else:
+            delta_hat = s.var(axis=1, ddof=1)
+            m, v = delta_hat.mean(), delta_hat.var(ddof=1)
+            a, b = (2 * v + m ** 2) / v, (m * v + m ** 3) / v
+            gamma_old, delta_old = gamma_hat.copy(), delta_hat.copy()
+            for _ in range(max_iter):
+                gamma_star = (tau2 * n * gamma_hat + delta_old * gamma_bar) / (tau2 * n + delta_old)
+                sum2 = ((s - gamma_star[:, None]) ** 2).sum(axis=1)
+                delta_star = (0.5 * sum2 + b) / (n / 2.0 + a - 1.0)
+                change = max(np.max(np.abs(gamma_star - gamma_old) / np.abs(gamma_old)),
+                             np.max(np.abs(delta_star - delta_old) / delta_old))
+                gamma_old, delta_old = gamma_star, delta_star
+                if change < tol:
+                    break
+        adjusted = (s - gamma_star[:, None]) / np.sqrt(delta_star)[:, None]
+        corrected[:, columns] = adjusted * pooled_sd[:, None] + stand_mean[:, columns]
+
+    return pd.DataFrame(corrected, index=data.index, columns=data.columns)
+
+
+def _batched_data(seed=0, n_genes=150):
+    rng = np.random.default_rng(seed)
+    batches = ['a'] * 4 + ['b'] * 5 + ['c'] * 3
+    condition = pd.Series(['ctl', 'trt'] * 6, name='condition')
+    shift = {'a': 0.0, 'b': 1.5, 'c': -0.8}
+    scale = {'a': 1.0, 'b': 1.8, 'c': 0.6}
+    values = rng.normal(5.0, 1.0, (n_genes, 1)) + rng.normal(size=(n_genes, len(batches)))
+    values += (condition == 'trt').to_numpy() * rng.normal(0.0, 1.0, (n_genes, 1))
+    for j, batch in enumerate(batches):
+        values[:, j] = values[:, j] * scale[batch] + shift[batch] + rng.normal(0, 0.3, n_genes)
+    samples = [f"s{j}" for j in range(len(batches))]
+    condition.index = samples
+    return pd.DataFrame(values, index=[f"g{i}" for i in range(n_genes)], columns=samples), batches, condition
+
+
+@pytest.mark.parametrize('mean_only', [False, True])
+def test_matches_naive_combat(mean_only):
+    data, batches, _ = _batched_data()
+
+    result = ComBat(mean_only=mean_only, tol=1e-12, max_iter=10000).fit_transform(data, batches)
+
+    pd.testing.assert_frame_equal(result, _naive_combat(data, batches, mean_only=mean_only), rtol=1e-8)
+
+
+def test_matches_naive_combat_with_covariates():
+    data, batches, condition = _batched_data(seed=1)
+
+    result = ComBat(tol=1e-12, max_iter=10000).fit_transform(data, batches, covariates=condition)
+
+    pd.testing.assert_frame_equal(result, _naive_combat(data, batches, covariates=condition), rtol=1e-8)
+
+
+def test_chunked_fit_matches_single_block():
+    data, batches, condition = _batched_data(seed=2)
+
+    whole = ComBat().fit_transform(data, batches, covariates=condition)
+    chunked = ComBat(chunk_rows=17).fit_transform(data, batches, covariates=condition)
+
+    pd.testing.assert_frame_equal(chunked, whole, rtol=1e-10)
+
+
+def test_constant_genes_are_left_unchanged():
+    data, batches, _ = _batched_data(seed=3)
+    data.iloc[0] = 4.0
+
+    combat = ComBat().fit(data, batches)
+    result = combat.transform(data)
+
+    assert not combat.valid_genes_[0]
+    np.testing.assert_array_equal(result.iloc[0], data.iloc[0])
+
+
+def test_invalid_batches_raise():
+    data, batches, _ = _batched_data()
+    with pytest.raises(ValueError):
+        ComBat().fit(data, ['a'] * len(batches))
+    with pytest.raises(ValueError):
+        ComBat().fit(data, ['a'] * (len(batches) - 1) + ['b'])
+    ComBat(mean_only=True).fit(data, ['a'] * (len(batches) - 1) + ['b'])
+
+
+def test_batch_variance_explained_matches_anova_r2():
+    rng = np.random.default_rng(4)
+    batches = np.array(['a', 'b', 'c', 'a', 'b', 'c', 'a', 'b'])
+    scores = pd.DataFrame(rng.normal(size=(8, 3)), columns=['PC1', 'PC2', 'PC3'])
+    scores['PC1'] += (batches == 'b') * 3.0
+    ratio = np.array([0.5, 0.3, 0.1])
+
+    report, total = batch_variance_explained(scores, ratio, batches)
+
+    expected = []
+    for column in scores.columns:
+        x = scores[column].to_numpy()
+        between = sum((batches == b).sum() * (x[batches == b].mean() - x.mean()) ** 2 for b in set(batches))
+        expected.append(between / ((x - x.mean()) ** 2).sum())
+    np.testing.assert_allclose(report['batch_r2'], expected)
+    assert total == pytest.approx(float(ratio @ np.array(expected)))
@@ -0,0 +1,50 @@
+import numpy as np
+
+from benchmark import compare_to_baseline, run_benchmark, synthetic_cohort
+
+
+def test_synthetic_cohort_shape_and_sparsity():
+    cohort = synthetic_cohort(500, 10, sparsity=0.6, seed=1)
+
+    assert cohort.counts.shape == (500, 10)
+    assert (cohort.counts.to_numpy() >= 0).all()
+    assert abs((cohort.counts.to_numpy() == 0).mean() - 0.6) < 0.1
+    assert set(cohort.group1).isdisjoint(cohort.group2)
+    assert set(cohort.de_genes) <= set(cohort.counts.index)
+
+
+def test_synthetic_cohort_is_seeded():
+    first = synthetic_cohort(200, 6, seed=3).counts
+    second = synthetic_cohort(200, 6, seed=3).counts
+    np.testing.assert_array_equal(first.to_numpy(), second.to_numpy())
+
+
+def test_run_benchmark_records_time_and_memory_separately():
+    records = run_benchmark(300, 6, stages=('filter', 'de_t_test'), repeats=2)
+
+    assert [record['stage'] for record in records] == ['filter', 'de_t_test']
+    for record in records:
+        assert record['status'] == 'ok'
+        assert record['wall_s'] > 0
+        assert record['peak_memory_mb'] is not None
+
+    # 두 DE 진입점 (legacy pipeline, GeneExpressionAnalyzer) 모두 측정
+    de_records = run_benchmark(300, 6, stages=('de_t_test', 'de_analyzer'), trace_memory=False)
+    assert [(record['stage'], record['status']) for record in de_records] == [
+        ('de_t_test', 'ok'), ('de_analyzer', 'ok')
+    ]
+
+    skipped = run_benchmark(300, 6, stages=('pca',), trace_memory=False, stage_element_limits={'pca': 10})
+    assert skipped[0]['status'] == 'skipped'
+
+
+def test_compare_to_baseline_flags_regressions():
+    def results(*walls):
+        return {'results': [
+            {'n_genes': 10, 'n_samples': 2, 'sparsity': 0.0, 'stage': stage, 'status': 'ok', 'wall_s': wall}
+            for stage, wall in zip(('filter', 'qc', 'pca'), walls)
+        ]}
+
+    comparison = compare_to_baseline(results(0.2, 0.1, 0.001), results(0.1, 0.1, 0.0001), tolerance=0.25)
+    # pca는 baseline이 MIN_COMPARABLE_SECONDS보다 짧아 판정하지 않음
+    assert comparison.set_index('stage')['regression'].to_dict() == {'filter': True, 'qc': False, 'pca': False}
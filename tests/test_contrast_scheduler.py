@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from contrast_scheduler import normalize_contrasts, run_contrast_pool
+from legacy_rna_pipeline import LegacyRNAAnalysisPipeline
+from sparse_backend import SparseExpressionMatrix
+
+SAMPLES = [f"s{j}" for j in range(9)]
+CONTRASTS = {
+    'a_vs_b': (SAMPLES[0:3], SAMPLES[3:6]),
+    'a_vs_c': (SAMPLES[0:3], SAMPLES[6:9]),
+    'b_vs_c': (SAMPLES[3:6], SAMPLES[6:9]),
+}
+
+
+def _counts(sparse_fraction=0.0, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.negative_binomial(5, 0.05, (80, len(SAMPLES))).astype(np.float64)
+    values *= rng.random(values.shape) >= sparse_fraction
+    return pd.DataFrame(values, index=[f"g{i}" for i in range(80)], columns=SAMPLES)
+
+
+def _assert_same_results(parallel, serial):
+    assert [name for name, _ in parallel] == [name for name, _ in serial]
+    for (_, parallel_table), (_, serial_table) in zip(parallel, serial):
+        pd.testing.assert_frame_equal(parallel_table, serial_table)
+
+
+def test_normalize_contrasts_rejects_duplicate_names():
+    assert normalize_contrasts(CONTRASTS)[1] == ('a_vs_c', SAMPLES[0:3], SAMPLES[6:9])
+    with pytest.raises(ValueError):
+        normalize_contrasts([('x', ['s0'], ['s1']), ('x', ['s2'], ['s3'])])
+
+
+@pytest.mark.parametrize('sparse', [False, True])
+def test_process_pool_matches_serial(sparse):
+    pipeline = LegacyRNAAnalysisPipeline()
+    normalized = np.log2(_counts(sparse_fraction=0.8 if sparse else 0.0) + 1.0)
+    if sparse:
+        normalized = SparseExpressionMatrix.from_frame(normalized)
+
+    serial = run_contrast_pool(pipeline, normalized, CONTRASTS, n_workers=1)
+    parallel = run_contrast_pool(pipeline, normalized, CONTRASTS, n_workers=2)
+
+    _assert_same_results(parallel, serial)
+
+
+def test_nb_glm_process_pool_matches_serial():
+    pipeline = LegacyRNAAnalysisPipeline()
+    pipeline.statistical_test = 'nb_glm'
+    counts = _counts(seed=1)
+    normalized = np.log2(counts + 1.0)
+
+    serial = run_contrast_pool(pipeline, normalized, CONTRASTS, count_matrix=counts, n_workers=1)
+    parallel = run_contrast_pool(pipeline, normalized, CONTRASTS, count_matrix=counts, n_workers=3)
+
+    _assert_same_results(parallel, serial)
+
+
+def test_run_contrasts_matches_scipy_per_contrast():
+    pipeline = LegacyRNAAnalysisPipeline()
+    counts = _counts(seed=2)
+
+    result = pipeline.run_contrasts(counts, CONTRASTS, n_workers=2)
+
+    normalized = pipeline.normalize_expression(pipeline.filter_low_expression_genes(counts))
+    for name, (group1, group2) in CONTRASTS.items():
+        table = result[result['contrast'] == name]
+        expected = stats.ttest_ind(normalized[group1], normalized[group2], axis=1)
+        np.testing.assert_allclose(table['p_value'].to_numpy(), expected.pvalue, rtol=1e-10)
+        np.testing.assert_allclose(table['t_statistic'].to_numpy(), expected.statistic, rtol=1e-10)
@@ -0,0 +1,100 @@
+import gzip
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from count_matrix_io import (
+    convert_tsv_to_store,
+    count_matrix_shape,
+    is_count_store,
+    iter_count_blocks,
+    load_count_matrix,
+    open_count_store,
+    read_count_header,
+)
+from legacy_rna_pipeline import LegacyRNAAnalysisPipeline
+
+
+@pytest.fixture
+def counts():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        rng.poisson(20, size=(257, 5)),
+        index=pd.Index([f'ENSG{i:08d}' for i in range(257)], name='gene_id'),
+        columns=[f'Sample_{j}' for j in range(5)]
+    )
+
+
+@pytest.fixture
+def tsv_path(tmp_path, counts):
+    path = tmp_path / 'counts.tsv'
+    counts.to_csv(path, sep='\t')
+    return str(path)
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 16, 100, 10000])
+def test_load_matches_read_csv(tsv_path, counts, chunk_rows):
+    loaded = load_count_matrix(tsv_path, chunk_rows=chunk_rows, dtype=np.float64)
+    pd.testing.assert_frame_equal(loaded, counts.astype(np.float64))
+
+
+def test_gzip_input(tmp_path, tsv_path, counts):
+    gz_path = tmp_path / 'counts.tsv.gz'
+    with open(tsv_path, 'rb') as source, gzip.open(gz_path, 'wb') as target:
+        target.write(source.read())
+
+    loaded = load_count_matrix(str(gz_path), chunk_rows=50)
+    assert loaded.dtypes.unique().tolist() == [np.dtype('float32')]
+    np.testing.assert_array_equal(loaded.to_numpy(), counts.to_numpy())
+
+
+def test_blocks_header_and_shape(tsv_path):
+    blocks = list(iter_count_blocks(tsv_path, chunk_rows=100))
+    assert [len(gene_ids) for gene_ids, _ in blocks] == [100, 100, 57]
+    assert read_count_header(tsv_path) == ('gene_id', [f'Sample_{j}' for j in range(5)])
+    assert count_matrix_shape(tsv_path) == (257, 5)
+
+
+def test_ragged_rows_are_rejected(tmp_path):
+    path = tmp_path / 'bad.tsv'
+    path.write_text("gene\tA\tB\nG1\t1\t2\nG2\t3\n")
+    with pytest.raises(ValueError):
+        load_count_matrix(str(path))
+
+
+def test_store_round_trip_and_select(tmp_path, tsv_path, counts):
+    store_path = convert_tsv_to_store(tsv_path, str(tmp_path / 'counts.npy'), chunk_rows=40)
+    assert is_count_store(store_path)
+    assert count_matrix_shape(store_path) == (257, 5)
+
+    store = open_count_store(store_path)
+    pd.testing.assert_frame_equal(store.to_frame(), counts.astype(np.float32))
+
+    genes = ['ENSG00000010', 'ENSG00000003']
+    selected = store.select(genes=genes, samples=['Sample_4', 'Sample_1'])
+    expected = counts.loc[sorted(genes), ['Sample_4', 'Sample_1']].astype(np.float32)
+    pd.testing.assert_frame_equal(selected, expected)
+
+    mask = np.zeros(257, dtype=bool)
+    mask[[5, 100, 256]] = True
+    pd.testing.assert_frame_equal(store.select(genes=mask), counts.iloc[[5, 100, 256]].astype(np.float32))
+    with pytest.raises(KeyError):
+        store.select(genes=['missing'])
+
+    blocks = list(store.iter_blocks(100))
+    assert [len(gene_ids) for gene_ids, _ in blocks] == [100, 100, 57]
+
+
+def test_pipeline_reads_store_through_select(tmp_path, tsv_path):
+    store_path = convert_tsv_to_store(tsv_path, str(tmp_path / 'counts.npy'))
+    results = {}
+    for source in (tsv_path, store_path):
+        pipeline = LegacyRNAAnalysisPipeline()
+        pipeline.min_count_threshold = 21
+        pipeline.min_samples_expressed = 3
+        results[source] = pipeline.run_stages(source, stages=('filtered', 'normalized', 'qc'))
+
+    for stage in ('filtered', 'normalized', 'qc'):
+        pd.testing.assert_frame_equal(results[tsv_path][stage], results[store_path][stage])
+    assert 0 < len(results[store_path]['filtered']) < 257
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from de_engine import two_group_statistics
+
+
+def _expression(n_genes=200, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.lognormal(2.0, 1.0, size=(n_genes, 9))
+    values[:20, :4] *= 3.0
+    values[-5:, 4:] = 0.0
+    return pd.DataFrame(values, index=[f'G{i}' for i in range(n_genes)], columns=[f'S{j}' for j in range(9)])
+
+
+def test_matches_scipy_ttest_and_fold_change():
+    expression = _expression()
+    test, reference = list(expression.columns[:4]), list(expression.columns[4:])
+    result = two_group_statistics(expression, test, reference)
+
+    ttest = stats.ttest_ind(expression[test], expression[reference], axis=1)
+    np.testing.assert_allclose(result['t_statistic'], ttest.statistic, rtol=1e-10)
+    np.testing.assert_allclose(result['p_value'], ttest.pvalue, rtol=1e-8)
+
+    test_mean, reference_mean = expression[test].mean(axis=1), expression[reference].mean(axis=1)
+    with np.errstate(divide='ignore'):
+        expected_fc = np.where(reference_mean > 0, test_mean / reference_mean, np.inf)
+    np.testing.assert_allclose(result['fold_change'], expected_fc)
+    np.testing.assert_allclose(result['log2_fold_change'], np.log2(expected_fc))
+    assert list(result.index) == list(expression.index)
+    assert np.isinf(result['fold_change'].iloc[-1])
+
+
+@pytest.mark.filterwarnings('ignore:Degrees of freedom')
+def test_single_sample_groups_give_nan_p_values():
+    expression = _expression(10)
+    result = two_group_statistics(expression, ['S0'], ['S1'])
+    assert result['p_value'].isna().all()
+
+
+def test_unknown_samples_raise():
+    with pytest.raises(KeyError):
+        two_group_statistics(_expression(10), ['S0', 'missing'], ['S1'])
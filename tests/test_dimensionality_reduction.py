@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dimensionality_reduction import SamplePCA
+from sparse_backend import SparseExpressionMatrix
+
+
+def _expression(n_genes, n_samples, decay, seed=0):
+    """유전자 x 샘플 matrix: 특이값이 decay 비율로 줄어드는 저차원 신호 + noise"""
+    rng = np.random.default_rng(seed)
+    rank = min(n_samples - 1, 20)
+    strengths = 8.0 * decay ** np.arange(rank)
+    signal = rng.standard_normal((n_genes, rank)) @ (rng.standard_normal((rank, n_samples)) * strengths[:, None])
+    values = signal + rng.standard_normal((n_genes, n_samples))
+    return pd.DataFrame(values, index=[f'G{i}' for i in range(n_genes)],
+                        columns=[f'S{j}' for j in range(n_samples)])
+
+
+def _assert_scores_close(expected, actual, rtol):
+    # 성분 부호는 방법마다 다를 수 있으므로 맞춘 뒤 비교
+    signs = np.sign(np.sum(expected * actual, axis=0))
+    error = np.linalg.norm(expected - actual * signs) / np.linalg.norm(expected)
+    assert error < rtol
+
+
+@pytest.mark.parametrize('method', ['randomized', 'incremental'])
+@pytest.mark.parametrize('shape, decay', [((3000, 40), 0.6), ((3000, 40), 0.95), ((5000, 12), 0.85),
+                                          ((2000, 100), 0.9)])
+def test_streaming_modes_match_exact(method, shape, decay):
+    data = _expression(*shape, decay)
+    exact = SamplePCA(n_components=3, method='exact').fit(data)
+    # chunk_rows를 작게 잡아 여러 블록 / 여러 샘플 batch를 거치게 함
+    approx = SamplePCA(n_components=3, method=method, chunk_rows=500).fit(data)
+
+    _assert_scores_close(exact.scores_, approx.scores_, rtol=1e-2)
+    np.testing.assert_allclose(approx.explained_variance_ratio_, exact.explained_variance_ratio_, rtol=1e-3)
+
+
+@pytest.mark.parametrize('method', ['randomized', 'incremental'])
+def test_flat_spectrum_explained_variance(method):
+    # 순수 noise에서는 성분 방향이 정해지지 않으므로 설명 분산만 비교
+    data = pd.DataFrame(np.random.default_rng(1).standard_normal((3000, 40)))
+    exact = SamplePCA(n_components=2, method='exact').fit(data)
+    approx = SamplePCA(n_components=2, method=method, chunk_rows=500).fit(data)
+
+    np.testing.assert_allclose(approx.explained_variance_ratio_, exact.explained_variance_ratio_, rtol=0.05)
+
+
+def test_sparse_input_matches_dense():
+    data = _expression(1000, 30, 0.7, seed=2).clip(lower=0.5) - 0.5
+    sparse = SparseExpressionMatrix.from_frame(data)
+    for method in ('exact', 'randomized'):
+        dense_fit = SamplePCA(n_components=2, method=method, chunk_rows=300).fit(data)
+        sparse_fit = SamplePCA(n_components=2, method=method, chunk_rows=300).fit(sparse)
+        np.testing.assert_allclose(sparse_fit.scores_, dense_fit.scores_, atol=1e-8)
+
+
+def test_auto_components_reach_variance_target():
+    data = _expression(2000, 30, 0.5, seed=3)
+    pca = SamplePCA(n_components='auto', method='exact', variance_target=0.8).fit(data)
+    cumulative = np.cumsum(pca.explained_variance_ratio_)
+
+    assert cumulative[-1] >= 0.8
+    assert pca.n_components_ == 2 or cumulative[-2] < 0.8
+    assert list(pca.to_frame().columns) == [f'PC{i + 1}' for i in range(pca.n_components_)]
+
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError):
+        SamplePCA(method='kernel')
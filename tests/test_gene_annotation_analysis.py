@@ -0,0 +1,45 @@
+import pandas as pd
+
+from gene_annotation_analysis import GeneExpressionAnalyzer
+
+
+def _expression():
+    return pd.DataFrame({'s1': [1.0, 2.0], 's2': [3.0, 4.0]}, index=['ENSG00000141510', 'ENSG_NEW'])
+
+
+def test_annotate_genes_follows_gene_annotation_changes():
+    analyzer = GeneExpressionAnalyzer()
+    assert list(analyzer.annotate_genes(_expression())['gene_symbol'].astype(str)) == ['TP53', 'Unknown']
+
+    # 제자리 수정
+    analyzer.gene_annotations['ENSG_NEW'] = {'symbol': 'NEW1', 'biotype': 'lncRNA', 'chromosome': '2'}
+    analyzer.gene_annotations['ENSG00000141510']['symbol'] = 'TP53_RENAMED'
+    assert list(analyzer.annotate_genes(_expression())['gene_symbol'].astype(str)) == ['TP53_RENAMED', 'NEW1']
+
+    # 재할당
+    analyzer.gene_annotations = {'ENSG_NEW': {'symbol': 'NEW2', 'biotype': 'lncRNA', 'chromosome': '2'}}
+    assert list(analyzer.annotate_genes(_expression())['gene_symbol'].astype(str)) == ['Unknown', 'NEW2']
+
+
+def test_annotation_table_is_reused_while_unchanged():
+    analyzer = GeneExpressionAnalyzer()
+
+    assert analyzer.annotation_table is analyzer.annotation_table
+
+
+def test_identify_pathway_genes_follows_pathway_info_changes():
+    analyzer = GeneExpressionAnalyzer()
+    genes = ['ENSG00000141510', 'ENSG00000134086']
+    assert analyzer.identify_pathway_genes(genes)['CELL_CYCLE'] == ['ENSG00000141510']
+
+    # 제자리 수정
+    analyzer.pathway_info['CELL_CYCLE'].append('ENSG00000134086')
+    analyzer.pathway_info['HYPOXIA'] = ['ENSG00000134086']
+    membership = analyzer.identify_pathway_genes(genes)
+    assert membership['CELL_CYCLE'] == genes
+    assert membership['HYPOXIA'] == ['ENSG00000134086']
+
+    # 재할당
+    analyzer.pathway_info = {'ONLY': ['ENSG00000134086']}
+    assert analyzer.identify_pathway_genes(genes) == {'ONLY': ['ENSG00000134086']}
+    assert analyzer.pathway_index is analyzer.pathway_index
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from de_engine import two_group_statistics
+from gene_blocks import GeneBlockExecutor, gene_blocks, merge_blocks
+
+
+def _row_summary(rows, values, weights, offset):
+    """블록별 (행 합, 가중 평균) - process backend용 module 수준 함수"""
+    block = values[rows]
+    return block.sum(axis=1) + offset, block @ weights / weights.sum()
+
+
+def _row_frame(rows, values):
+    return pd.DataFrame({'row_max': values[rows].max(axis=1)}, index=np.arange(len(values))[rows])
+
+
+def test_gene_blocks_cover_all_rows():
+    blocks = gene_blocks(10, 4)
+
+    assert blocks == [slice(0, 4), slice(4, 8), slice(8, 10)]
+    assert gene_blocks(0, 4) == []
+
+
+def test_merge_blocks_keeps_block_order():
+    merged = merge_blocks([(np.array([1, 2]), np.array([[1.0]])), (np.array([3]), np.array([[2.0]]))])
+
+    np.testing.assert_array_equal(merged[0], [1, 2, 3])
+    np.testing.assert_array_equal(merged[1], [[1.0], [2.0]])
+
+
+@pytest.mark.parametrize('backend', ['serial', 'thread', 'process'])
+def test_backends_match_unblocked_result(backend):
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(103, 7))
+    weights = rng.uniform(size=7)
+
+    totals, weighted = GeneBlockExecutor(n_workers=3, backend=backend, block_rows=10).map_merged(
+        _row_summary, (values,), (weights, 1.0)
+    )
+    frame = GeneBlockExecutor(n_workers=3, backend=backend, block_rows=10).map_merged(_row_frame, (values,))
+
+    expected_totals, expected_weighted = _row_summary(slice(None), values, weights, 1.0)
+    np.testing.assert_array_equal(totals, expected_totals)
+    np.testing.assert_array_equal(weighted, expected_weighted)
+    np.testing.assert_array_equal(frame.index, np.arange(103))
+    np.testing.assert_array_equal(frame['row_max'], values.max(axis=1))
+
+
+@pytest.mark.parametrize('backend', ['thread', 'process'])
+def test_two_group_statistics_with_executor(backend):
+    rng = np.random.default_rng(1)
+    data = pd.DataFrame(rng.normal(size=(250, 8)), columns=[f"s{j}" for j in range(8)])
+    test_samples, reference_samples = ['s0', 's1', 's2', 's3'], ['s4', 's5', 's6', 's7']
+
+    expected = two_group_statistics(data, test_samples, reference_samples)
+    result = two_group_statistics(data, test_samples, reference_samples,
+                                  executor=GeneBlockExecutor(n_workers=2, backend=backend, block_rows=60))
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_invalid_configuration_raises():
+    with pytest.raises(ValueError):
+        GeneBlockExecutor(backend='gpu')
+    with pytest.raises(ValueError):
+        GeneBlockExecutor(block_rows=0)
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+
+import gsea
+from gsea import GSEAEngine, _GeneSets, _ranking, enrichment_scores
+
+
+def _naive_enrichment_score(scores, members, weight=1.0):
+    """전체 순위를 한 단계씩 걷는 running-sum ES (Subramanian et al. 2005)"""
+    order = np.argsort(-scores, kind='stable')
+    hits = np.isin(order, members)
+    hit_weights = np.where(hits, np.abs(scores[order]) ** weight, 0.0)
+    running = np.cumsum(hit_weights / hit_weights.sum() - (~hits) / (~hits).sum())
+    return running.max() if running.max() >= -running.min() else running.min()
+
+
+def _ranked_scores(n_genes=300, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.Series(rng.standard_normal(n_genes), index=[f'G{i}' for i in range(n_genes)])
+
+
+def _pathways(scores, n_sets=12, seed=1):
+    rng = np.random.default_rng(seed)
+    genes = scores.index.to_numpy()
+    pathways = {f'P{i}': list(rng.choice(genes, size=rng.integers(5, 40), replace=False)) for i in range(n_sets)}
+    # 상위 유전자에 몰린 set (강한 enrichment)
+    pathways['TOP'] = list(scores.sort_values(ascending=False).index[:20])
+    return pathways
+
+
+def test_enrichment_scores_match_running_sum():
+    scores = _ranked_scores()
+    pathways = _pathways(scores)
+    gene_sets = _GeneSets(pathways, pd.Index(scores.index, dtype=object))
+
+    for weight in (0.0, 1.0, 2.0):
+        gene_rank, sorted_weights = _ranking(scores.to_numpy(), weight)
+        es = enrichment_scores(gene_rank, sorted_weights, gene_sets)
+        expected = [
+            _naive_enrichment_score(scores.to_numpy(), scores.index.get_indexer(pathways[name]), weight)
+            for name in gene_sets.names
+        ]
+        np.testing.assert_allclose(es, expected, rtol=1e-12, atol=1e-12)
+
+
+def test_results_do_not_depend_on_worker_count():
+    scores = _ranked_scores()
+    pathways = _pathways(scores)
+    options = dict(n_permutations=1200, seed=7, batch_size=100, early_stop_pvalue=0.2, min_permutations=200)
+
+    serial = GSEAEngine(n_workers=1, **options).run(scores, pathways)
+    parallel = GSEAEngine(n_workers=4, **options).run(scores, pathways)
+
+    pdt.assert_frame_equal(serial, parallel)
+    # early stop이 실제로 일부 set에만 적용되었는지 확인
+    assert serial['n_permutations'].min() < 1200
+    assert serial.set_index('pathway').loc['TOP', 'n_permutations'] == 1200
+
+
+def test_sample_permutation_is_deterministic_across_workers():
+    rng = np.random.default_rng(3)
+    expression = pd.DataFrame(rng.normal(size=(200, 8)), index=[f'G{i}' for i in range(200)],
+                              columns=[f'S{i}' for i in range(8)])
+    expression.iloc[:15, :4] += 2.0
+    pathways = {'UP': [f'G{i}' for i in range(15)], 'RANDOM': [f'G{i}' for i in range(100, 130)]}
+    options = dict(n_permutations=60, seed=11, batch_size=20)
+
+    serial = GSEAEngine(n_workers=1, **options).run_sample_permutation(
+        expression, expression.columns[:4], expression.columns[4:], pathways)
+    parallel = GSEAEngine(n_workers=2, **options).run_sample_permutation(
+        expression, expression.columns[:4], expression.columns[4:], pathways)
+
+    pdt.assert_frame_equal(serial, parallel)
+    assert serial.iloc[0]['pathway'] == 'UP'
+
+
+def test_serial_run_releases_worker_state():
+    scores = _ranked_scores()
+
+    GSEAEngine(n_workers=1, n_permutations=50, batch_size=20).run(scores, _pathways(scores))
+
+    assert gsea._WORKER_STATE == {}
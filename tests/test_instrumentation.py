@@ -0,0 +1,61 @@
+import json
+import logging
+
+from instrumentation import Instrumentation, instrumented_stage, logger
+
+
+class _Stages:
+    def __init__(self, instrumentation=None):
+        self.instrumentation = instrumentation
+
+    @instrumented_stage("outer")
+    def outer(self, values):
+        logger.info("running outer on %d values", len(values))
+        return self.inner(values) + [0]
+
+    @instrumented_stage("inner")
+    def inner(self, values):
+        return [value * 2 for value in values]
+
+
+def test_logger_level_is_restored_on_close():
+    previous = logger.level
+    logger.setLevel(logging.WARNING)
+    try:
+        with Instrumentation():
+            assert logger.isEnabledFor(logging.INFO)
+        assert logger.level == logging.WARNING
+
+        instrumentation = Instrumentation()
+        instrumentation.close()
+        assert logger.level == logging.WARNING
+        assert not any(handler for handler in logger.handlers if getattr(handler, 'instrumentation', None))
+    finally:
+        logger.setLevel(previous)
+
+
+def test_enabled_logger_level_is_left_alone():
+    previous = logger.level
+    logger.setLevel(logging.DEBUG)
+    try:
+        Instrumentation().close()
+        assert logger.level == logging.DEBUG
+    finally:
+        logger.setLevel(previous)
+
+
+def test_nested_stages_are_recorded(tmp_path):
+    with Instrumentation(trace_memory=True) as instrumentation:
+        assert _Stages(instrumentation).outer([1, 2, 3]) == [2, 4, 6, 0]
+
+    summary = instrumentation.stage_summary()
+    assert [row['stage'] for row in summary] == ['outer', 'inner']
+    assert summary[0]['wall_s'] >= summary[1]['wall_s']
+    assert all('tracemalloc_peak_delta_mb' in row for row in summary)
+
+    trace = json.loads(open(instrumentation.write_trace(tmp_path / 'trace.json')).read())
+    assert any(event['cat'] == 'log' and 'outer' in event['name'] for event in trace['traceEvents'])
+
+
+def test_no_instrumentation_calls_method_directly():
+    assert _Stages().outer([1]) == [2, 0]
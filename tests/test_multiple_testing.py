@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+from multiple_testing import adjust_p_values, benjamini_hochberg
+
+
+def _naive_bh(p_values):
+    """정의 그대로의 BH: p_(i) * m / i 의 뒤쪽 누적 최솟값"""
+    p = np.asarray(p_values, dtype=np.float64)
+    m = len(p)
+    order = np.argsort(p)
+    adjusted = np.empty(m)
+    running = 1.0
+    for rank in range(m, 0, -1):
+        index = order[rank - 1]
+        running = min(running, p[index] * m / rank)
+        adjusted[index] = running
+    return adjusted
+
+
+def test_bh_matches_naive_and_scipy():
+    rng = np.random.default_rng(0)
+    p = np.concatenate([rng.uniform(size=200), rng.uniform(0, 1e-3, 50), [0.01, 0.01, 0.01]])
+
+    adjusted = adjust_p_values(p)
+
+    np.testing.assert_allclose(adjusted, _naive_bh(p), rtol=1e-12)
+    np.testing.assert_allclose(adjusted, stats.false_discovery_control(p, method='bh'), rtol=1e-12)
+
+
+def test_nan_is_excluded_from_test_count():
+    p = np.array([0.01, np.nan, 0.04, 0.03, np.nan])
+
+    adjusted = adjust_p_values(p)
+
+    assert np.isnan(adjusted[[1, 4]]).all()
+    np.testing.assert_allclose(adjusted[[0, 2, 3]], _naive_bh(p[[0, 2, 3]]))
+    np.testing.assert_allclose(adjust_p_values(p, 'bonferroni')[[0, 2, 3]], [0.03, 0.12, 0.09])
+
+
+def test_groups_are_adjusted_independently():
+    rng = np.random.default_rng(1)
+    p = rng.uniform(0, 0.2, 90)
+    groups = rng.choice(['a', 'b', 'c'], size=90)
+
+    for method in ('BH_FDR', 'bonferroni', 'qvalue'):
+        adjusted = adjust_p_values(p, method, groups=groups)
+        for group in 'abc':
+            mask = groups == group
+            np.testing.assert_allclose(adjusted[mask], adjust_p_values(p[mask], method), rtol=1e-12)
+
+
+def test_qvalue_scales_bh_by_pi0():
+    rng = np.random.default_rng(2)
+    p = np.concatenate([rng.uniform(size=300), rng.uniform(0, 1e-4, 100)])
+
+    pi0 = np.mean(p > 0.5) / 0.5
+    np.testing.assert_allclose(adjust_p_values(p, 'qvalue'), _naive_bh(p) * pi0, rtol=1e-12)
+
+
+def test_benjamini_hochberg_along_axis():
+    rng = np.random.default_rng(3)
+    p = rng.uniform(size=(4, 6, 5))
+
+    for axis in (0, 1, -1):
+        expected = np.apply_along_axis(_naive_bh, axis, p)
+        np.testing.assert_allclose(benjamini_hochberg(p, axis=axis), expected, rtol=1e-12)
+
+
+def test_unknown_method_raises():
+    with pytest.raises(ValueError):
+        adjust_p_values([0.1], method='holm')
+
+
+def test_qvalue_falls_back_to_bh_without_null_p_values():
+    # lambda_ (0.5)보다 큰 p-value가 없으면 pi0 추정치가 0
+    p = np.array([0.3, 0.2, 0.4, 0.45, 0.1])
+
+    np.testing.assert_allclose(adjust_p_values(p, 'qvalue'), _naive_bh(p))
+    np.testing.assert_allclose(adjust_p_values(p, 'qvalue'), 0.45)
+
+    groups = np.array(['a'] * 5 + ['b'] * 4)
+    mixed = np.concatenate([p, [0.9, 0.8, 0.01, 0.02]])
+    adjusted = adjust_p_values(mixed, 'qvalue', groups=groups)
+    np.testing.assert_allclose(adjusted[:5], 0.45)
+    np.testing.assert_allclose(adjusted[5:], _naive_bh(mixed[5:]))
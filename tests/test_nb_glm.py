@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+from scipy import optimize
+from scipy.special import gammaln
+
+from nb_glm import (
+    MAX_DISPERSION,
+    MIN_DISPERSION,
+    NegativeBinomialGLM,
+    _cox_reid_log_likelihood,
+    _maximize_dispersion,
+    irls_fit,
+)
+
+
+def _simulate(n_genes=60, n_per_group=4, seed=0):
+    rng = np.random.default_rng(seed)
+    design = np.column_stack([np.ones(2 * n_per_group), np.repeat([0.0, 1.0], n_per_group)])
+    size_factors = rng.uniform(0.7, 1.4, 2 * n_per_group)
+    base = rng.lognormal(4.0, 1.0, n_genes)
+    lfc = rng.normal(0.0, 1.0, n_genes) * (rng.random(n_genes) < 0.3)
+    dispersion = rng.uniform(0.02, 0.3, n_genes)
+    mu = base[:, None] * np.exp(lfc[:, None] * design[:, 1]) * size_factors
+    counts = rng.negative_binomial(1.0 / dispersion[:, None], 1.0 / (1.0 + dispersion[:, None] * mu))
+    return counts.astype(np.float64), design, size_factors, dispersion
+
+
+def _nb_negative_log_likelihood(beta, y, design, size_factors, alpha):
+    mu = np.exp(design @ beta) * size_factors
+    inv_alpha = 1.0 / alpha
+    return -np.sum(
+        gammaln(y + inv_alpha) - gammaln(inv_alpha) - gammaln(y + 1.0)
+        - inv_alpha * np.log1p(alpha * mu) + y * (np.log(alpha * mu) - np.log1p(alpha * mu))
+    )
+
+
+def test_irls_matches_per_gene_mle():
+    counts, design, size_factors, dispersion = _simulate(n_genes=20)
+
+    beta, covariance, mu, converged = irls_fit(counts, design, size_factors, dispersion, tol=1e-10, ridge=0.0)
+
+    assert converged.all()
+    for gene in range(len(counts)):
+        start = np.array([np.log(counts[gene].mean() + 1.0), 0.0])
+        reference = optimize.minimize(
+            _nb_negative_log_likelihood, start, args=(counts[gene], design, size_factors, dispersion[gene]),
+            method='BFGS', options={'gtol': 1e-8}
+        )
+        np.testing.assert_allclose(beta[gene], reference.x, atol=1e-4)
+    np.testing.assert_allclose(mu, np.exp(beta @ design.T) * size_factors)
+    assert np.all(np.linalg.eigvalsh(covariance) > 0)
+
+
+def test_dispersion_matches_scalar_optimization():
+    counts, design, size_factors, dispersion = _simulate(n_genes=15, seed=1)
+    _, _, mu, _ = irls_fit(counts, design, size_factors, dispersion)
+
+    estimate = _maximize_dispersion(counts, mu, design)
+
+    for gene in range(len(counts)):
+        def objective(log_alpha):
+            return -_cox_reid_log_likelihood(counts[gene:gene + 1], mu[gene:gene + 1], design, np.array([[log_alpha]]))[0, 0]
+
+        reference = optimize.minimize_scalar(
+            objective, bounds=(np.log(MIN_DISPERSION), np.log(MAX_DISPERSION)), method='bounded',
+            options={'xatol': 1e-8}
+        )
+        # grid 재탐색 해상도 이내에서 일치하고, objective는 사실상 최적값
+        assert abs(np.log(estimate[gene]) - reference.x) < 0.03
+        assert objective(np.log(estimate[gene])) - reference.fun < 1e-3
+
+
+@pytest.mark.parametrize('backend', ['thread', 'process'])
+def test_fit_is_identical_for_parallel_backends(backend):
+    counts, design, _, _ = _simulate(n_genes=90, seed=2)
+    counts[5] = 0.0
+
+    serial = NegativeBinomialGLM(n_jobs=1, chunk_size=25).fit(counts, design)
+    parallel = NegativeBinomialGLM(n_jobs=2, chunk_size=25, backend=backend).fit(counts, design)
+
+    for name in ('dispersion_gene_', 'dispersion_', 'coef_', 'covariance_', 'converged_'):
+        np.testing.assert_array_equal(getattr(parallel, name), getattr(serial, name))
+    assert np.isnan(serial.coef_[5]).all()
+
+
+def test_fit_does_not_depend_on_chunk_size():
+    counts, design, _, _ = _simulate(n_genes=90, seed=3)
+
+    whole = NegativeBinomialGLM(chunk_size=1000).fit(counts, design).wald_test('x1')
+    chunked = NegativeBinomialGLM(chunk_size=7).fit(counts, design).wald_test('x1')
+
+    np.testing.assert_allclose(chunked.to_numpy(), whole.to_numpy(), rtol=1e-8, atol=1e-12)
+
+
+def test_extreme_dispersion_gene_keeps_gene_wise_estimate():
+    rng = np.random.default_rng(4)
+    design = np.column_stack([np.ones(6), np.repeat([0.0, 1.0], 3)])
+    mu = rng.lognormal(5.0, 0.5, (300, 1)) * np.ones(6)
+    dispersion = np.full((300, 1), 0.05)
+    dispersion[0] = 4.0
+    counts = rng.negative_binomial(1.0 / dispersion, 1.0 / (1.0 + dispersion * mu)).astype(np.float64)
+
+    model = NegativeBinomialGLM().fit(counts, design)
+
+    log_residual = np.log(model.dispersion_gene_) - np.log(model.dispersion_trend_)
+    outlier = log_residual > 2.0 * np.sqrt(model.var_log_dispersion_)
+    assert outlier[0]
+    assert model.dispersion_[0] == model.dispersion_gene_[0]
+    np.testing.assert_array_equal(model.dispersion_[outlier], model.dispersion_gene_[outlier])
+    # prior 분산 기준으로만 outlier인 유전자는 shrink된다
+    prior_only = ~outlier & (log_residual > 2.0 * np.sqrt(model.prior_var_))
+    assert prior_only.any()
+    assert np.all(model.dispersion_[prior_only] < model.dispersion_gene_[prior_only])
@@ -0,0 +1,127 @@
+import numpy as np
+import pytest
+from scipy import sparse, stats
+
+from normalizers import get_normalizer, median_of_ratios_size_factors, poscounts_size_factors, tmm_factors
+
+
+def _edger_factor_tmm(obs, ref, logratio_trim=0.3, sum_trim=0.05):
+    """edgeR .calcFactorTMM을 R 코드 그대로 옮긴 reference (rank()는 평균 순위)"""
+    n_obs, n_ref = obs.sum(), ref.sum()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_r = np.log2((obs / n_obs) / (ref / n_ref))
+        abs_e = (np.log2(obs / n_obs) + np.log2(ref / n_ref)) / 2
+        v = (n_obs - obs) / n_obs / obs + (n_ref - ref) / n_ref / ref
+    fin = np.isfinite(log_r) & np.isfinite(abs_e)
+    log_r, abs_e, v = log_r[fin], abs_e[fin], v[fin]
+    if np.max(np.abs(log_r)) < 1e-6:
+        return 1.0
+
+    n = len(log_r)
+    lo_l = np.floor(n * logratio_trim) + 1
+    hi_l = n + 1 - lo_l
+    lo_s = np.floor(n * sum_trim) + 1
+    hi_s = n + 1 - lo_s
+    rank_r, rank_e = stats.rankdata(log_r), stats.rankdata(abs_e)
+    keep = (rank_r >= lo_l) & (rank_r <= hi_l) & (rank_e >= lo_s) & (rank_e <= hi_s)
+    return 2 ** (np.sum(log_r[keep] / v[keep]) / np.sum(1 / v[keep]))
+
+
+def _edger_calc_norm_factors(counts):
+    """edgeR calcNormFactors(method="TMM") reference"""
+    lib_size = counts.sum(axis=0)
+    f75 = np.quantile(counts / lib_size, 0.75, axis=0)
+    ref_column = int(np.argmin(np.abs(f75 - f75.mean())))
+    factors = np.array([
+        _edger_factor_tmm(counts[:, i], counts[:, ref_column]) for i in range(counts.shape[1])
+    ])
+    return factors / np.exp(np.mean(np.log(factors)))
+
+
+def _nb_counts(n_genes, n_samples, mean, seed):
+    rng = np.random.default_rng(seed)
+    means = rng.lognormal(np.log(mean), 1.5, size=n_genes)[:, None] * rng.uniform(0.5, 2.0, size=n_samples)
+    return rng.poisson(rng.gamma(5.0, means / 5.0)).astype(np.float64)
+
+
+@pytest.mark.parametrize('mean, seed', [(200.0, 0), (2.0, 1), (0.5, 2)])
+def test_tmm_matches_edger(mean, seed):
+    # mean이 작을수록 동점 (같은 count 비율)이 많은 matrix
+    counts = _nb_counts(2000, 6, mean, seed)
+    np.testing.assert_allclose(tmm_factors(counts), _edger_calc_norm_factors(counts), rtol=1e-10)
+
+
+def test_tmm_identical_libraries_give_unit_factors():
+    counts = _nb_counts(500, 1, 50.0, 3)
+    np.testing.assert_allclose(tmm_factors(np.hstack([counts, counts, 2 * counts])), 1.0)
+
+
+def test_median_of_ratios_matches_per_gene_loop():
+    counts = _nb_counts(1000, 5, 50.0, 4)
+    counts[::7, 2] = 0
+
+    geo_means = np.array([
+        np.exp(np.mean(np.log(row))) if (row > 0).all() else 0.0 for row in counts
+    ])
+    usable = geo_means > 0
+    expected = [np.median(counts[usable, j] / geo_means[usable]) for j in range(counts.shape[1])]
+
+    np.testing.assert_allclose(median_of_ratios_size_factors(counts), expected, rtol=1e-12)
+
+
+def test_median_of_ratios_requires_a_zero_free_gene():
+    with pytest.raises(ValueError):
+        median_of_ratios_size_factors(np.array([[0.0, 1.0], [2.0, 0.0]]))
+
+
+def test_normalizer_transforms():
+    counts = _nb_counts(300, 4, 100.0, 5)
+    lengths = np.random.default_rng(6).uniform(500, 5000, size=300)
+
+    cpm = get_normalizer('simple_cpm')
+    np.testing.assert_allclose(
+        cpm.transform(counts, cpm.compute_factors(counts)), np.log2(counts / counts.sum(axis=0) * 1e6 + 1)
+    )
+    tpm = get_normalizer('TPM')
+    rates = counts / (lengths[:, None] / 1e3)
+    np.testing.assert_allclose(
+        tpm.transform(counts, tpm.compute_factors(counts, lengths), lengths),
+        np.log2(rates / rates.sum(axis=0) * 1e6 + 1)
+    )
+    with pytest.raises(ValueError):
+        get_normalizer('RPKM')
+
+
+def _dropout(counts, fraction, seed):
+    rng = np.random.default_rng(seed)
+    return counts * (rng.random(counts.shape) >= fraction)
+
+
+def test_poscounts_matches_deseq2_reference():
+    counts = _dropout(_nb_counts(800, 6, 20.0, 7), 0.6, 8)
+    counts[np.arange(800), np.arange(800) % 6] = 0.0
+
+    # DESeq2 estimateSizeFactors(type="poscounts"): geoMeanNZ, 양수 count만의 median, geometric mean 1
+    n_samples = counts.shape[1]
+    log_geo_means = np.array([np.log(row[row > 0]).sum() / n_samples for row in counts])
+    factors = np.array([
+        np.exp(np.median(np.log(counts[counts[:, j] > 0, j]) - log_geo_means[counts[:, j] > 0]))
+        for j in range(n_samples)
+    ])
+    expected = factors / np.exp(np.mean(np.log(factors)))
+
+    np.testing.assert_allclose(poscounts_size_factors(counts), expected, rtol=1e-12)
+    np.testing.assert_allclose(poscounts_size_factors(sparse.csr_matrix(counts)), expected, rtol=1e-12)
+
+
+def test_sparse_factors_match_dense_factors():
+    counts = _dropout(_nb_counts(1500, 6, 50.0, 9), 0.3, 10)
+    lengths = np.random.default_rng(11).uniform(500, 5000, size=1500)
+    csr = sparse.csr_matrix(counts)
+
+    for name in ('simple_cpm', 'TMM', 'DESeq2', 'TPM'):
+        normalizer = get_normalizer(name)
+        np.testing.assert_allclose(
+            normalizer.compute_sparse_factors(csr, lengths), normalizer.compute_factors(counts, lengths),
+            rtol=1e-10, err_msg=name
+        )
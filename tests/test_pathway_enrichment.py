@@ -0,0 +1,49 @@
+import numpy as np
+from scipy import stats
+
+from multiple_testing import adjust_p_values
+from pathway_enrichment import hypergeom_sf, hypergeometric_enrichment
+from pathway_index import PathwayIndex
+
+
+def test_hypergeom_sf_matches_scipy_on_grid():
+    M, n, N = np.meshgrid([20, 200, 5000], [1, 7, 60], [1, 15, 120], indexing='ij')
+    M, n, N = (a.ravel() for a in (M, n, N))
+    keep = (n <= M) & (N <= M)
+    M, n, N = M[keep], n[keep], N[keep]
+
+    for k in range(0, 62, 3):
+        expected = stats.hypergeom.sf(k - 1, M, n, N)
+        np.testing.assert_allclose(hypergeom_sf(k, M, n, N), expected, rtol=1e-9, atol=1e-14)
+
+
+def test_hypergeom_sf_extreme_tail_relative_accuracy():
+    # 아주 작은 p-value도 상대 오차로 맞아야 함
+    k = np.array([40, 55, 60])
+    expected = stats.hypergeom.sf(k - 1, 20000, 60, 300)
+    np.testing.assert_allclose(hypergeom_sf(k, 20000, 60, 300), expected, rtol=1e-9)
+
+
+def test_enrichment_matches_per_pathway_scipy_loop():
+    rng = np.random.default_rng(0)
+    genes = [f"g{i}" for i in range(300)]
+    pathway_info = {f"p{j}": list(rng.choice(genes, size=rng.integers(5, 40), replace=False)) for j in range(12)}
+    pathway_info['empty'] = ['absent_gene']
+    gene_lists = [list(rng.choice(genes, size=30, replace=False)) + pathway_info['p0'][:10], genes[:50]]
+    background = genes[:250]
+
+    result = hypergeometric_enrichment(PathwayIndex(pathway_info), gene_lists, background, list_names=['a', 'b'])
+
+    universe = set(background)
+    for name, gene_list in zip(['a', 'b'], gene_lists):
+        rows = result[result['gene_list'] == name].set_index('pathway')
+        selected = set(gene_list) & universe
+        p_values = []
+        for pathway, members in pathway_info.items():
+            members = set(members) & universe
+            k = len(selected & members)
+            p_value = stats.hypergeom.sf(k - 1, len(universe), len(members), len(selected)) if members else np.nan
+            assert rows.loc[pathway, 'overlap'] == k
+            p_values.append(p_value)
+        np.testing.assert_allclose(rows['p_value'].to_numpy(), p_values, rtol=1e-9)
+        np.testing.assert_allclose(rows['p_adjusted'].to_numpy(), adjust_p_values(np.array(p_values)), rtol=1e-9)
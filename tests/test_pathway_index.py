@@ -0,0 +1,60 @@
+import numpy as np
+
+from pathway_index import PathwayIndex
+
+PATHWAY_INFO = {
+    'p1': ['g1', 'g2', 'g3', 'g2'],
+    'p2': ['g3', 'g4'],
+    'p3': ['g5'],
+    'p4': []
+}
+GENE_LISTS = [['g3', 'g1', 'g9', 'g3'], ['g4', 'g5', 'g2'], [], ['g9']]
+
+
+def _naive_overlap(gene_list):
+    return [len(set(gene_list) & set(genes)) for genes in PATHWAY_INFO.values()]
+
+
+def test_pathways_for_gene():
+    index = PathwayIndex(PATHWAY_INFO)
+
+    assert index.pathways_for_gene('g3') == ['p1', 'p2']
+    assert index.pathways_for_gene('g9') == []
+    assert list(index.pathway_sizes) == [3, 2, 1, 0]
+
+
+def test_batch_overlap_counts_matches_set_intersection():
+    index = PathwayIndex(PATHWAY_INFO)
+
+    expected = np.array([_naive_overlap(gene_list) for gene_list in GENE_LISTS])
+    np.testing.assert_array_equal(index.batch_overlap_counts(GENE_LISTS), expected)
+    np.testing.assert_array_equal(index.overlap_counts(GENE_LISTS[1]), expected[1])
+
+
+def test_membership_keeps_input_order():
+    index = PathwayIndex(PATHWAY_INFO)
+    gene_list = ['g3', 'g9', 'g2', 'g4', 'g1']
+
+    expected = {
+        pathway: [gene for gene in gene_list if gene in genes]
+        for pathway, genes in PATHWAY_INFO.items()
+    }
+    assert index.membership(gene_list) == expected
+    assert index.batch_membership([gene_list, []])[1] == {pathway: [] for pathway in PATHWAY_INFO}
+
+
+def test_enrichment_counts_restricted_to_background():
+    index = PathwayIndex(PATHWAY_INFO)
+    background = ['g1', 'g3', 'g4', 'g5', 'g9', 'g1']
+
+    hits, pathway_sizes, list_sizes, background_size = index.enrichment_counts(GENE_LISTS, background)
+
+    universe = set(background)
+    expected_hits = [
+        [len(set(gene_list) & set(genes) & universe) for genes in PATHWAY_INFO.values()]
+        for gene_list in GENE_LISTS
+    ]
+    np.testing.assert_array_equal(hits, expected_hits)
+    np.testing.assert_array_equal(pathway_sizes, [len(set(genes) & universe) for genes in PATHWAY_INFO.values()])
+    np.testing.assert_array_equal(list_sizes, [len(set(gene_list) & universe) for gene_list in GENE_LISTS])
+    assert background_size == 5
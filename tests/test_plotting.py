@@ -0,0 +1,68 @@
+import os
+
+import numpy as np
+import pandas as pd
+from matplotlib import cbook
+
+from plotting import box_statistics, ma_plot_data, render_plots, volcano_plot_data
+from sparse_backend import SparseExpressionMatrix
+
+
+def _matrix(seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.lognormal(1.0, 1.0, size=(400, 7))
+    values[rng.random(values.shape) < 0.5] = 0.0
+    return pd.DataFrame(values, columns=[f'S{j}' for j in range(7)])
+
+
+def test_box_statistics_match_matplotlib():
+    matrix = _matrix()
+    stats = box_statistics(matrix, block_size=3)
+
+    for column, expected in zip(matrix.columns, cbook.boxplot_stats(matrix.to_numpy())):
+        row = stats.loc[column]
+        for name in ('q1', 'med', 'q3', 'whislo', 'whishi', 'mean'):
+            np.testing.assert_allclose(row['median' if name == 'med' else name], expected[name])
+        assert row['n_fliers'] == len(expected['fliers'])
+
+
+def test_box_statistics_sparse_matches_dense():
+    matrix = _matrix(1)
+    sparse = SparseExpressionMatrix.from_frame(matrix)
+    pd.testing.assert_frame_equal(box_statistics(sparse, block_size=2), box_statistics(matrix))
+
+
+def test_volcano_keeps_zero_p_values():
+    de = pd.DataFrame({
+        'gene_id': ['A', 'B', 'C', 'D'],
+        'log2_fold_change': [3.0, -1.0, np.nan, 0.1],
+        'p_value': [0.0, 1e-3, 0.01, np.nan],
+    })
+    data = volcano_plot_data(de)
+
+    assert list(data['gene_ids']) == ['A', 'B']
+    assert np.isfinite(data['neg_log10_p']).all()
+    assert data['neg_log10_p'][0] > data['neg_log10_p'][1]
+    assert list(data['significant']) == [True, True]
+
+
+def test_ma_plot_data_scales():
+    de = pd.DataFrame({'group1_mean': [1.0, 3.0], 'group2_mean': [3.0, 5.0],
+                       'log2_fold_change': [-1.0, np.inf], 'significant': [True, False]})
+    log_scale = ma_plot_data(de)
+    np.testing.assert_allclose(log_scale['average'], [2.0])
+    np.testing.assert_allclose(ma_plot_data(de, log_means=False)['average'], [np.log2(3.0)])
+
+
+def test_render_plots_serial_and_parallel(tmp_path):
+    stats = box_statistics(_matrix(2))
+    jobs = [{'kind': 'boxplot', 'path': str(tmp_path / f'box{i}.png'), 'data': {'stats': stats}, 'dpi': 50}
+            for i in range(3)]
+
+    serial = render_plots(jobs, n_workers=1)
+    parallel = render_plots([dict(job, path=job['path'].replace('box', 'pbox')) for job in jobs], n_workers=2)
+
+    assert serial == [job['path'] for job in jobs]
+    for serial_path, parallel_path in zip(serial, parallel):
+        assert open(serial_path, 'rb').read()[:8] == b'\x89PNG\r\n\x1a\n'
+        assert os.path.getsize(parallel_path) > 0
@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from count_matrix_io import convert_tsv_to_store, open_count_store
+from legacy_rna_pipeline import LegacyRNAAnalysisPipeline
+from preprocessing import (
+    adaptive_filter_mask,
+    chunked_log_cpm,
+    fused_log_cpm,
+    streaming_filter_statistics,
+    total_count_mask,
+)
+from rna_preprocessing_old import process_rna_data
+
+
+def _counts(n_genes=500, n_samples=6, seed=0):
+    rng = np.random.default_rng(seed)
+    means = rng.lognormal(1.5, 1.5, size=(n_genes, 1))
+    return pd.DataFrame(
+        rng.poisson(means * rng.uniform(0.5, 2.0, size=n_samples)).astype(np.int64),
+        index=pd.Index([f'G{i}' for i in range(n_genes)], name='gene_id'),
+        columns=[f'S{j}' for j in range(n_samples)]
+    )
+
+
+@pytest.mark.parametrize('chunk_rows', [7, 64, 10000])
+def test_out_of_core_matches_in_memory(tmp_path, chunk_rows):
+    counts = _counts()
+    tsv_path = tmp_path / 'counts.tsv'
+    counts.to_csv(tsv_path, sep='\t')
+
+    pipeline = LegacyRNAAnalysisPipeline()
+    expected = pipeline.normalize_expression(pipeline.filter_low_expression_genes(counts))
+
+    output_path, n_retained = chunked_log_cpm(str(tsv_path), str(tmp_path / 'out.npy'), 5, 2, chunk_rows)
+    result = open_count_store(output_path).to_frame()
+
+    assert n_retained == len(expected)
+    pd.testing.assert_frame_equal(result, expected, check_names=False)
+
+
+def _naive_log_cpm(values, keep):
+    kept = values[keep].astype(np.float64)
+    log_values = np.log2(kept / kept.sum(axis=0) * 1e6 + 1)
+    return log_values, log_values.mean(axis=0), log_values.std(axis=0, ddof=1)
+
+
+def test_fused_log_cpm_matches_naive_steps():
+    values = _counts().to_numpy()
+    keep = total_count_mask(values, 10)
+    log_values, mean, std = fused_log_cpm(values, keep)
+    expected = _naive_log_cpm(values, keep)
+
+    np.testing.assert_allclose(log_values, expected[0], rtol=1e-12)
+    np.testing.assert_allclose(mean, expected[1], rtol=1e-12)
+    np.testing.assert_allclose(std, expected[2], rtol=1e-12)
+
+    log32, _, _ = fused_log_cpm(values, keep, dtype=np.float32)
+    assert log32.dtype == np.float32
+    np.testing.assert_allclose(log32, expected[0], rtol=1e-5)
+
+
+def test_fused_log_cpm_inplace_reuses_input():
+    values = _counts().to_numpy().astype(np.float64)
+    expected = _naive_log_cpm(values, np.ones(len(values), dtype=bool))[0]
+    log_values, _, _ = fused_log_cpm(values, inplace=True)
+
+    assert log_values is values
+    np.testing.assert_allclose(log_values, expected, rtol=1e-12)
+
+
+def test_process_rna_data_reads_float64(tmp_path, monkeypatch):
+    counts = _counts(200, 4).astype(np.float64)
+    counts.iloc[:, 0] += 1e-3
+    path = tmp_path / 'counts.tsv'
+    counts.to_csv(path, sep='\t')
+    monkeypatch.chdir(tmp_path)
+
+    log_data, stats_df = process_rna_data(str(path))
+    keep = total_count_mask(counts.to_numpy(), 10)
+    expected = _naive_log_cpm(counts.to_numpy(), keep)
+
+    np.testing.assert_allclose(log_data.to_numpy(), expected[0], rtol=1e-12)
+    np.testing.assert_allclose(stats_df['std'], expected[2], rtol=1e-12)
+    assert (tmp_path / 'rna_boxplot.png').exists()
+
+
+@pytest.mark.parametrize('chunk_rows, chunk_columns', [(7, 4), (64, 1), (10000, 10000)])
+def test_streaming_filter_statistics_match_numpy(chunk_rows, chunk_columns):
+    values = _counts(n_samples=9).to_numpy(dtype=np.float64)
+    sizes = values.sum(axis=0)
+    log_cpm = np.log2(values / sizes * 1e6 + 1.0)
+
+    result = streaming_filter_statistics(values, 5, cpm_threshold=50.0,
+                                         chunk_rows=chunk_rows, chunk_columns=chunk_columns)
+
+    np.testing.assert_array_equal(result['count_passes'], (values >= 5).sum(axis=1))
+    np.testing.assert_array_equal(result['cpm_passes'], (values / sizes * 1e6 >= 50.0).sum(axis=1))
+    np.testing.assert_allclose(result['total'], values.sum(axis=1))
+    np.testing.assert_allclose(result['mean'], log_cpm.mean(axis=1), rtol=1e-12)
+    np.testing.assert_allclose(result['variance'], log_cpm.var(axis=1, ddof=1), rtol=1e-10, atol=1e-12)
+
+
+def test_streaming_filter_statistics_on_memmap(tmp_path):
+    values = _counts().to_numpy(dtype=np.float32)
+    path = tmp_path / 'counts.npy'
+    np.save(path, values)
+
+    result = streaming_filter_statistics(np.load(path, mmap_mode='r'), 5, chunk_rows=50, chunk_columns=4)
+    expected = streaming_filter_statistics(values.astype(np.float64), 5)
+
+    assert result['cpm_passes'] is None
+    for key in ('count_passes', 'total', 'mean', 'variance'):
+        np.testing.assert_allclose(result[key], expected[key], rtol=1e-12)
+
+
+@pytest.mark.parametrize('min_samples', [2, 0.5])
+def test_adaptive_filter_mask_matches_naive(min_samples):
+    values = _counts(n_samples=8, seed=1).to_numpy(dtype=np.float64)
+    statistics = streaming_filter_statistics(values, 5, cpm_threshold=20.0)
+
+    required = int(np.ceil(min_samples * 8)) if min_samples < 1 else min_samples
+    cpm = values / values.sum(axis=0) * 1e6
+    expected = ((values >= 5).sum(axis=1) >= required) & ((cpm >= 20.0).sum(axis=1) >= required)
+    kept_variance = np.sort(statistics['variance'][expected])
+    cutoff = kept_variance[int(len(kept_variance) * 0.25) - 1]
+    expected &= statistics['variance'] > cutoff
+
+    np.testing.assert_array_equal(adaptive_filter_mask(statistics, min_samples, variance_percentile=25), expected)
+
+
+def test_store_filter_matches_in_memory_filter(tmp_path):
+    counts = _counts(seed=2)
+    tsv_path = tmp_path / 'counts.tsv'
+    counts.to_csv(tsv_path, sep='\t')
+    store_path = convert_tsv_to_store(str(tsv_path), str(tmp_path / 'counts.npy'), chunk_rows=37)
+
+    pipeline = LegacyRNAAnalysisPipeline()
+    pipeline.min_cpm_threshold = 10.0
+    pipeline.variance_percentile = 20
+    pipeline.min_samples_expressed = 0.5
+
+    expected = pipeline.filter_low_expression_genes(pipeline.load_count_matrix(str(tsv_path)))
+    result = pipeline.filter_low_expression_genes(open_count_store(store_path))
+
+    pd.testing.assert_frame_equal(result, expected, check_names=False)
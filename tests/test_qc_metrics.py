@@ -0,0 +1,80 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from annotation_table import AnnotationTable
+from qc_metrics import QCEngine
+from sparse_backend import SparseExpressionMatrix
+
+GENE_IDS = ['ENSG1', 'ENSG2', 'ENSG3', 'ENSG4', 'RPL11', 'MT-CO1', 'GAPDH', 'ENSG8']
+ANNOTATIONS = AnnotationTable.from_dict({
+    'ENSG1': {'symbol': 'MT-ND1', 'chromosome': '1'},
+    'ENSG2': {'symbol': 'RPS6', 'chromosome': '9'},
+    'ENSG3': {'symbol': 'ND6', 'chromosome': 'MT'},
+    'ENSG4': {'symbol': 'ACTB', 'chromosome': '7'},
+})
+HOUSEKEEPING = ['GAPDH', 'ENSG4']
+
+
+def _naive_qc(expression, counts):
+    """샘플 루프로 메트릭을 하나씩 계산하는 reference"""
+    symbols = [ANNOTATIONS.table['symbol'].get(gene, gene) for gene in GENE_IDS]
+    chromosomes = [ANNOTATIONS.table['chromosome'].get(gene, None) for gene in GENE_IDS]
+    mito = [bool(re.match(r'^MT-', str(s))) or c == 'MT' for s, c in zip(symbols, chromosomes)]
+    ribo = [bool(re.match(r'^RP[SL]\d', str(s))) for s in symbols]
+    housekeeping = [gene in HOUSEKEEPING for gene in GENE_IDS]
+
+    rows = {}
+    for sample in expression.columns:
+        e = expression[sample].to_numpy()
+        c = counts[sample].to_numpy()
+        library = c.sum()
+        rows[sample] = {
+            'total_detected_genes': float(np.sum(e > 0)),
+            'mean_expression': e.mean(),
+            'median_expression': np.median(e),
+            'housekeeping_expression': e[housekeeping].mean(),
+            'library_size': library,
+            'mitochondrial_percentage': 100.0 * c[mito].sum() / library,
+            'ribosomal_percentage': 100.0 * c[ribo].sum() / library,
+            'complexity': np.sum(c > 0) / library
+        }
+    return pd.DataFrame.from_dict(rows, orient='index')
+
+
+def _matrices(seed=0):
+    rng = np.random.default_rng(seed)
+    counts = pd.DataFrame(
+        rng.poisson(30, (len(GENE_IDS), 5)) * (rng.random((len(GENE_IDS), 5)) < 0.7),
+        index=GENE_IDS, columns=[f"s{j}" for j in range(5)]
+    ).astype(np.float64)
+    counts.iloc[0] += 1.0
+    expression = np.log2(counts / counts.sum(axis=0) * 1e6 + 1.0)
+    return expression, counts
+
+
+def test_compute_matches_naive_per_sample_loop():
+    expression, counts = _matrices()
+    engine = QCEngine(HOUSEKEEPING, annotation_table=ANNOTATIONS)
+
+    result = engine.compute(expression, counts)
+
+    pd.testing.assert_frame_equal(result, _naive_qc(expression, counts)[result.columns], rtol=1e-12)
+
+
+def test_sparse_input_matches_dense():
+    expression, counts = _matrices(seed=1)
+    engine = QCEngine(HOUSEKEEPING, annotation_table=ANNOTATIONS)
+
+    dense = engine.compute(expression, counts)
+    sparse = engine.compute(SparseExpressionMatrix.from_frame(expression), SparseExpressionMatrix.from_frame(counts))
+
+    pd.testing.assert_frame_equal(sparse, dense, rtol=1e-12)
+
+
+def test_without_count_matrix_uses_expression():
+    _, counts = _matrices(seed=2)
+    engine = QCEngine(HOUSEKEEPING, annotation_table=ANNOTATIONS)
+
+    pd.testing.assert_frame_equal(engine.compute(counts), engine.compute(counts, counts))
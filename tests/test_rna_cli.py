@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+import rna_cli
+from benchmark import synthetic_cohort
+from gene_blocks import GENE_BLOCK_BACKENDS
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def count_file(tmp_path):
+    cohort = synthetic_cohort(400, 8, seed=4)
+    path = tmp_path / 'counts.tsv'
+    cohort.counts.to_csv(path, sep='\t')
+    return cohort, str(path)
+
+
+def test_n_components_accepts_auto_or_positive_int():
+    parser = rna_cli.build_parser()
+    assert parser.parse_args(['pca', 'x.tsv', '--n-components', 'auto']).n_components == 'auto'
+    assert parser.parse_args(['pca', 'x.tsv', '--n-components', '3']).n_components == 3
+    for value in ('0', 'two'):
+        with pytest.raises(SystemExit):
+            parser.parse_args(['pca', 'x.tsv', '--n-components', value])
+
+
+def test_gene_block_backend_choices():
+    parser = rna_cli.build_parser()
+    for backend in GENE_BLOCK_BACKENDS:
+        assert parser.parse_args(['filter', 'x.tsv', '--gene-block-backend', backend]).gene_block_backend == backend
+
+
+def test_pca_auto_components(count_file, tmp_path):
+    _, path = count_file
+    output = tmp_path / 'pca.tsv'
+    assert rna_cli.main(['pca', path, '--n-components', 'auto', '-o', str(output)]) == 0
+    scores = pd.read_csv(output, sep='\t', index_col=0)
+    assert len(scores) == 8 and scores.shape[1] >= 2
+
+
+def test_de_backends_agree(count_file, tmp_path):
+    cohort, path = count_file
+    tables = []
+    for backend, n_jobs in (('serial', '1'), ('process', '2')):
+        output = tmp_path / f'de_{backend}.tsv'
+        rna_cli.main(['de', path, '--group1', *cohort.group1, '--group2', *cohort.group2, '--test', 'nb_glm',
+                      '--n-jobs', n_jobs, '--gene-block-backend', backend, '-o', str(output)])
+        tables.append(pd.read_csv(output, sep='\t'))
+    pd.testing.assert_frame_equal(*tables)
+
+
+def test_help_does_not_import_numpy():
+    code = "import sys, rna_cli; rna_cli.build_parser(); print('numpy' in sys.modules, 'pandas' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', code], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ['False', 'False']
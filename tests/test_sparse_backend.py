@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from de_engine import two_group_statistics
+from legacy_rna_pipeline import LegacyRNAAnalysisPipeline
+from nb_glm import NegativeBinomialGLM
+from normalizers import poscounts_size_factors
+from preprocessing import expression_filter_mask, streaming_filter_statistics
+from sparse_backend import (
+    SparseExpressionMatrix,
+    as_expression_matrix,
+    sparse_expression_filter_mask,
+    sparse_filter_statistics,
+    sparse_log_cpm,
+    sparse_two_group_statistics,
+    sparsity,
+)
+
+
+def _sparse_counts(n_genes=120, n_samples=10, density=0.08, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.poisson(20, (n_genes, n_samples)) * (rng.random((n_genes, n_samples)) < density)
+    values[:, 0] += 1  # library size 0 방지
+    return pd.DataFrame(
+        values.astype(np.float64),
+        index=[f"g{i}" for i in range(n_genes)],
+        columns=[f"s{j}" for j in range(n_samples)]
+    )
+
+
+def test_as_expression_matrix_switches_on_sparsity():
+    frame = _sparse_counts()
+
+    assert sparsity(frame) == pytest.approx(np.mean(frame.to_numpy() == 0))
+    assert isinstance(as_expression_matrix(frame, threshold=0.5), SparseExpressionMatrix)
+    assert as_expression_matrix(frame, threshold=0.99) is frame
+    pd.testing.assert_frame_equal(as_expression_matrix(frame, threshold=0.5).to_frame(), frame)
+
+
+@pytest.mark.parametrize('min_count, min_samples', [(1, 2), (0, 3), (10, 0.25)])
+def test_filter_mask_matches_dense(min_count, min_samples):
+    frame = _sparse_counts()
+    matrix = SparseExpressionMatrix.from_frame(frame)
+
+    np.testing.assert_array_equal(
+        sparse_expression_filter_mask(matrix, min_count, min_samples),
+        expression_filter_mask(frame.to_numpy(), min_count, min_samples)
+    )
+
+
+def test_log_cpm_matches_dense():
+    frame = _sparse_counts()
+    expected = np.log2(frame / frame.sum(axis=0) * 1e6 + 1.0)
+
+    result = sparse_log_cpm(SparseExpressionMatrix.from_frame(frame)).to_frame()
+
+    pd.testing.assert_frame_equal(result, expected, rtol=1e-12)
+
+
+def test_filter_statistics_match_streaming_dense():
+    frame = _sparse_counts(seed=1)
+    matrix = SparseExpressionMatrix.from_frame(frame)
+
+    result = sparse_filter_statistics(matrix, min_count=5, cpm_threshold=1000.0)
+    expected = streaming_filter_statistics(frame.to_numpy(), min_count=5, cpm_threshold=1000.0)
+
+    assert result['n_samples'] == expected['n_samples']
+    for key in ('count_passes', 'cpm_passes', 'total'):
+        np.testing.assert_array_equal(result[key], expected[key])
+    for key in ('mean', 'variance'):
+        np.testing.assert_allclose(result[key], expected[key], rtol=1e-10, atol=1e-12)
+
+
+def test_two_group_statistics_match_dense():
+    frame = np.log2(_sparse_counts(seed=2) + 1.0)
+    matrix = SparseExpressionMatrix.from_frame(frame)
+    test_samples, reference_samples = ['s0', 's3', 's5', 's7'], ['s1', 's2', 's9']
+
+    result = sparse_two_group_statistics(matrix, test_samples, reference_samples)
+    expected = two_group_statistics(frame, test_samples, reference_samples)
+
+    pd.testing.assert_frame_equal(result, expected, rtol=1e-9, atol=1e-12)
+
+
+def test_column_medians_with_negative_values():
+    rng = np.random.default_rng(3)
+    values = rng.normal(size=(9, 6)) * (rng.random((9, 6)) < 0.4)
+    values[:, 5] = 0.0
+    matrix = SparseExpressionMatrix(values, range(9), range(6))
+
+    np.testing.assert_allclose(matrix.column_medians(), np.median(values, axis=0))
+    np.testing.assert_allclose(matrix.column_sums(), values.sum(axis=0))
+
+
+def test_subset_keeps_requested_order():
+    frame = _sparse_counts()
+    matrix = SparseExpressionMatrix.from_frame(frame)
+
+    subset = matrix.subset(genes=['g5', 'g1'], samples=['s3', 's0'])
+
+    pd.testing.assert_frame_equal(subset.to_frame(), frame.loc[['g5', 'g1'], ['s3', 's0']])
+    with pytest.raises(KeyError):
+        matrix.subset(genes=['missing'])
+
+
+@pytest.mark.parametrize('method', ['simple_cpm', 'TMM', 'DESeq2', 'TPM'])
+def test_pipeline_normalizes_sparse_input_like_dense(method):
+    frame = _sparse_counts(n_genes=400, density=0.12, seed=4)
+    frame.iloc[:30] += 3.0  # DESeq2 median-of-ratios용 0 없는 유전자
+
+    def normalized(sparse_threshold):
+        pipeline = LegacyRNAAnalysisPipeline()
+        pipeline.normalization_method = method
+        pipeline.min_count_threshold = 1
+        pipeline.min_samples_expressed = 1
+        pipeline.sparse_threshold = sparse_threshold
+        pipeline.gene_lengths = pd.Series(np.linspace(500.0, 5000.0, len(frame)), index=frame.index)
+        return pipeline.normalize_expression(pipeline.filter_low_expression_genes(frame))
+
+    result = normalized(0.5)
+    expected = normalized(None)
+
+    assert isinstance(result, SparseExpressionMatrix)
+    pd.testing.assert_frame_equal(result.to_frame(), expected, rtol=1e-10)
+
+
+def test_pipeline_nb_glm_on_sparse_input_uses_poscounts():
+    frame = _sparse_counts(n_genes=300, density=0.3, seed=5)
+    values = frame.to_numpy(copy=True)
+    values[np.arange(300), np.arange(300) % 10] = 0.0  # 모든 유전자에 0
+    frame = pd.DataFrame(values, index=frame.index, columns=frame.columns)
+    pipeline = LegacyRNAAnalysisPipeline()
+    pipeline.statistical_test = 'nb_glm'
+    pipeline.min_count_threshold = 1
+    pipeline.min_samples_expressed = 3
+    pipeline.sparse_threshold = 0.5
+    group1, group2 = list(frame.columns[:5]), list(frame.columns[5:])
+
+    filtered = pipeline.filter_low_expression_genes(frame)
+    normalized = pipeline.normalize_expression(filtered)
+    result = pipeline.differential_expression_legacy(normalized, group1, group2, count_matrix=filtered)
+
+    assert isinstance(filtered, SparseExpressionMatrix)
+    counts = filtered.to_frame()[group1 + group2]
+    design = pd.DataFrame({'intercept': 1.0, 'group1': [1.0] * 5 + [0.0] * 5}, index=group1 + group2)
+    expected = NegativeBinomialGLM().fit(counts, design, size_factors=poscounts_size_factors(counts.to_numpy()))
+    np.testing.assert_allclose(result['p_value'], expected.wald_test('group1')['p_value'], rtol=1e-10)
+    assert np.isfinite(result['p_value']).all()
@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from legacy_rna_pipeline import LegacyRNAAnalysisPipeline
+from stage_cache import StageCache, input_fingerprint, stage_key
+
+
+def _counts(seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        rng.poisson(50, (200, 6)).astype(np.float64),
+        index=[f"g{i}" for i in range(200)], columns=[f"s{j}" for j in range(6)]
+    )
+
+
+def test_put_get_round_trip_and_corrupt_entry(tmp_path):
+    cache = StageCache(str(tmp_path))
+    frame = _counts()
+
+    cache.put('k1', 'normalized', frame)
+
+    assert 'k1' in cache
+    pd.testing.assert_frame_equal(cache.get('k1'), frame)
+    assert cache.get('missing') is None
+
+    with open(cache._entry_path('k1'), 'wb') as f:
+        f.write(b'not a pickle')
+    assert cache.get('k1') is None
+    assert 'k1' not in cache
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = StageCache(str(tmp_path), max_bytes=10 ** 9)
+    payload = np.zeros(10_000)
+    for i, key in enumerate(('a', 'b', 'c')):
+        cache.put(key, 'stage', payload)
+        os.utime(cache._entry_path(key), ns=(i * 10 ** 9, i * 10 ** 9))
+    cache.get('a')  # a를 최근 사용으로 갱신
+
+    cache.max_bytes = 2 * cache.entries()[0][1]
+    cache.evict()
+
+    assert 'b' not in cache
+    assert 'a' in cache and 'c' in cache
+
+
+def test_keys_change_with_inputs_and_params():
+    frame = _counts()
+    changed = frame.copy()
+    changed.iloc[0, 0] += 1.0
+
+    assert input_fingerprint(frame) == input_fingerprint(frame.copy())
+    assert input_fingerprint(frame) != input_fingerprint(changed)
+
+    key = stage_key('filtered', ('input',), {'min_count': 5, 'min_samples': 2})
+    assert key == stage_key('filtered', ('input',), {'min_samples': 2, 'min_count': 5})
+    assert key != stage_key('filtered', ('input',), {'min_count': 6, 'min_samples': 2})
+    assert key != stage_key('filtered', ('other',), {'min_count': 5, 'min_samples': 2})
+
+
+def _fail(*args, **kwargs):
+    raise AssertionError("stage recomputed although checkpoint exists")
+
+
+def test_run_stages_resumes_from_checkpoints(tmp_path, monkeypatch):
+    frame = _counts(seed=1)
+    pipeline = LegacyRNAAnalysisPipeline()
+    expected = pipeline.run_stages(frame, stages=("normalized", "qc"))
+
+    pipeline.stage_cache = StageCache(str(tmp_path))
+    first = pipeline.run_stages(frame, stages=("normalized", "qc"))
+
+    resumed = LegacyRNAAnalysisPipeline()
+    resumed.stage_cache = StageCache(str(tmp_path))
+    monkeypatch.setattr(resumed, 'filter_low_expression_genes', _fail)
+    monkeypatch.setattr(resumed, 'normalize_expression', _fail)
+    monkeypatch.setattr(resumed, 'quality_control_analysis', _fail)
+    second = resumed.run_stages(frame, stages=("normalized", "qc"))
+
+    for stage in ("normalized", "qc"):
+        pd.testing.assert_frame_equal(first[stage], expected[stage])
+        pd.testing.assert_frame_equal(second[stage], expected[stage])
+
+
+def test_parameter_change_recomputes_only_downstream(tmp_path, monkeypatch):
+    frame = _counts(seed=2)
+    pipeline = LegacyRNAAnalysisPipeline()
+    pipeline.stage_cache = StageCache(str(tmp_path))
+    pipeline.run_stages(frame, stages=("normalized",))
+
+    changed = LegacyRNAAnalysisPipeline()
+    changed.stage_cache = StageCache(str(tmp_path))
+    changed.normalization_method = 'TMM'
+    monkeypatch.setattr(changed, 'filter_low_expression_genes', _fail)
+    result = changed.run_stages(frame, stages=("normalized",))["normalized"]
+
+    reference = LegacyRNAAnalysisPipeline()
+    reference.normalization_method = 'TMM'
+    pd.testing.assert_frame_equal(result, reference.run_stages(frame, stages=("normalized",))["normalized"])